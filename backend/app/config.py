@@ -13,9 +13,139 @@ if not GROQ_API_KEY:
 # File upload settings
 UPLOAD_DIR = "uploads"
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+# PDF/DOCX parsing runs in a process pool so it never blocks the event loop;
+# 0 workers parses inline. The queue bounds pending plus running files, and
+# each worker process is replaced after EXTRACTION_MAX_TASKS_PER_CHILD files.
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+EXTRACTION_QUEUE_SIZE = int(os.getenv("EXTRACTION_QUEUE_SIZE", str(4 * (os.cpu_count() or 1))))
+EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "60"))
+EXTRACTION_MAX_TASKS_PER_CHILD = int(os.getenv("EXTRACTION_MAX_TASKS_PER_CHILD", "50"))
+# PDFs with at least this many pages are split into page ranges extracted
+# in parallel across the pool; 0 always extracts a file in one worker
+EXTRACTION_PARALLEL_PAGE_THRESHOLD = int(os.getenv("EXTRACTION_PARALLEL_PAGE_THRESHOLD", "100"))
 
 # AI settings
 CHAT_MODEL = "llama3-8b-8192"
+# Model for short, fixed-size steps such as the executive summary
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", CHAT_MODEL)
+# Optional JSON overrides of the per-step routing table in app/services/step_routing.py
+LLM_STEP_ROUTES = os.getenv("LLM_STEP_ROUTES")
+
+# LLM backend: "groq" calls the Groq API; "fake" is a deterministic offline stand-in for load tests
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+LLM_FAKE_LATENCY_MEDIAN_MS = float(os.getenv("LLM_FAKE_LATENCY_MEDIAN_MS", "300"))
+LLM_FAKE_LATENCY_SIGMA = float(os.getenv("LLM_FAKE_LATENCY_SIGMA", "0.5"))
+LLM_FAKE_TOKENS_PER_SECOND = float(os.getenv("LLM_FAKE_TOKENS_PER_SECOND", "500"))
+# Optional JSON list of {"match": "...", "response": "..."} canned responses
+LLM_FAKE_RESPONSES_PATH = os.getenv("LLM_FAKE_RESPONSES_PATH")
+LLM_FAKE_SEED = int(os.getenv("LLM_FAKE_SEED", "0"))
+
+# Cassettes: "record" saves every exchange with the provider, "replay" serves them back offline
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off")
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "llm_cassette.jsonl")
+# Replay timing: "real" recorded latencies, "scaled" divided by LLM_REPLAY_SPEED, or "instant"
+LLM_REPLAY_TIMING = os.getenv("LLM_REPLAY_TIMING", "instant")
+LLM_REPLAY_SPEED = float(os.getenv("LLM_REPLAY_SPEED", "1"))
+
+# LLM transport settings
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+# Connections opened on startup so the first requests skip TLS setup
+LLM_WARM_CONNECTIONS = int(os.getenv("LLM_WARM_CONNECTIONS", "2"))
+
+# LLM rate limits (0 disables a bucket); set them to your Groq plan's limits for CHAT_MODEL,
+# e.g. 30 and 30000 on the free tier. Off by default so paid keys are not throttled
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+# Fraction of each bucket that batch work may not use, kept free for interactive calls
+LLM_BATCH_RESERVE = float(os.getenv("LLM_BATCH_RESERVE", "0.2"))
+# Speculative work (explanation prefetch) only runs while this fraction is still free
+LLM_SPECULATIVE_RESERVE = float(os.getenv("LLM_SPECULATIVE_RESERVE", "0.5"))
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "3"))
+LLM_RATE_LIMIT_BACKOFF_SECONDS = float(os.getenv("LLM_RATE_LIMIT_BACKOFF_SECONDS", "2"))
+LLM_RATE_LIMIT_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_RATE_LIMIT_BACKOFF_MAX_SECONDS", "60"))
+
+# LLM resilience settings
+# Consecutive provider failures that open the circuit breaker (0 disables it)
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+# Send a duplicate request when one is slower than this (0 disables hedging)
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))
+# Deadline for a single workflow step, in place of the full transport timeout
+LLM_STEP_TIMEOUT_SECONDS = float(os.getenv("LLM_STEP_TIMEOUT_SECONDS", "45"))
+
+# LLM response cache settings
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_DB_PATH = os.getenv("LLM_CACHE_DB_PATH", "llm_cache.db")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1000"))
+LLM_CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", "50000"))
+
+# Document analysis settings
+# Documents are split into clause-aligned chunks that are analyzed concurrently
+ANALYSIS_CHUNK_CHARS = int(os.getenv("ANALYSIS_CHUNK_CHARS", "6000"))
+ANALYSIS_MAP_CONCURRENCY = int(os.getenv("ANALYSIS_MAP_CONCURRENCY", "8"))
+ANALYSIS_REDUCE_CHARS = int(os.getenv("ANALYSIS_REDUCE_CHARS", "12000"))
+# "staged" runs clause, risk and insight steps; "fused" asks for one JSON response
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "staged")
+
+# Background analysis job settings
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", "3"))
+ANALYSIS_JOB_LEASE_SECONDS = int(os.getenv("ANALYSIS_JOB_LEASE_SECONDS", "900"))
+ANALYSIS_JOB_RETRY_DELAY_SECONDS = int(os.getenv("ANALYSIS_JOB_RETRY_DELAY_SECONDS", "15"))
+ANALYSIS_JOB_POLL_SECONDS = float(os.getenv("ANALYSIS_JOB_POLL_SECONDS", "2"))
+# A job that only got the degraded keyword analysis (provider circuit open) is
+# re-queued with exponential backoff up to this many times, without using an attempt
+ANALYSIS_JOB_MAX_DEFERRALS = int(os.getenv("ANALYSIS_JOB_MAX_DEFERRALS", "20"))
+ANALYSIS_JOB_MAX_DEFER_SECONDS = int(os.getenv("ANALYSIS_JOB_MAX_DEFER_SECONDS", "600"))
+# Comma-separated hosts (subdomains included) job webhooks may be sent to; empty
+# allows any host. Webhooks to private, loopback or link-local addresses are always refused.
+ANALYSIS_WEBHOOK_ALLOWED_HOSTS = [
+    host.strip().lower()
+    for host in os.getenv("ANALYSIS_WEBHOOK_ALLOWED_HOSTS", "").split(",")
+    if host.strip()
+]
+# Answer uploads at once with a local heuristic report; the LLM analysis replaces it later
+ANALYSIS_FAST_PATH = os.getenv("ANALYSIS_FAST_PATH", "true").lower() == "true"
+# The report's TF-IDF key terms and summary only read this much of the text
+PRELIMINARY_ANALYSIS_MAX_CHARS = int(os.getenv("PRELIMINARY_ANALYSIS_MAX_CHARS", "200000"))
+# Revisions re-review only new or edited clauses, until this share of the
+# document has changed since its last full analysis
+INCREMENTAL_ANALYSIS_MAX_CHANGE = float(os.getenv("INCREMENTAL_ANALYSIS_MAX_CHANGE", "0.5"))
+
+# Speculative explanation prefetch after upload (opt-in); explanations of the
+# riskiest clauses are generated at low priority so the first click hits the cache
+EXPLANATION_PREFETCH_ENABLED = os.getenv("EXPLANATION_PREFETCH_ENABLED", "false").lower() == "true"
+EXPLANATION_PREFETCH_TOP_N = int(os.getenv("EXPLANATION_PREFETCH_TOP_N", "5"))
+EXPLANATION_PREFETCH_MIN_RISK = float(os.getenv("EXPLANATION_PREFETCH_MIN_RISK", "0.5"))
+EXPLANATION_PREFETCH_TYPES = os.getenv("EXPLANATION_PREFETCH_TYPES", "eli5")
+EXPLANATION_PREFETCH_CONCURRENCY = int(os.getenv("EXPLANATION_PREFETCH_CONCURRENCY", "2"))
+EXPLANATION_PREFETCH_USER_DAILY_LIMIT = int(os.getenv("EXPLANATION_PREFETCH_USER_DAILY_LIMIT", "50"))
+EXPLANATION_PREFETCH_DAILY_LIMIT = int(os.getenv("EXPLANATION_PREFETCH_DAILY_LIMIT", "1000"))
+
+# Batch clause endpoints: short clauses share packed prompts, the rest run concurrently
+CLAUSE_BATCH_MAX_ITEMS = int(os.getenv("CLAUSE_BATCH_MAX_ITEMS", "200"))
+CLAUSE_BATCH_CONCURRENCY = int(os.getenv("CLAUSE_BATCH_CONCURRENCY", "6"))
+CLAUSE_BATCH_PACK_TOKENS = int(os.getenv("CLAUSE_BATCH_PACK_TOKENS", "1200"))
+CLAUSE_BATCH_PACK_MAX_ITEMS = int(os.getenv("CLAUSE_BATCH_PACK_MAX_ITEMS", "8"))
+CLAUSE_BATCH_SHORT_CLAUSE_TOKENS = int(os.getenv("CLAUSE_BATCH_SHORT_CLAUSE_TOKENS", "250"))
+
+# Workflow graph checkpoints; a failed draft or analysis resumes from its last completed node
+WORKFLOW_CHECKPOINTS_ENABLED = os.getenv("WORKFLOW_CHECKPOINTS_ENABLED", "true").lower() == "true"
+WORKFLOW_CHECKPOINT_PATH = os.getenv("WORKFLOW_CHECKPOINT_PATH", "workflow_checkpoints.db")
+# Checkpoints of threads left unfinished this long are deleted (0 keeps them forever)
+WORKFLOW_CHECKPOINT_TTL_HOURS = float(os.getenv("WORKFLOW_CHECKPOINT_TTL_HOURS", "24"))
+WORKFLOW_CHECKPOINT_SWEEP_INTERVAL_SECONDS = int(os.getenv("WORKFLOW_CHECKPOINT_SWEEP_INTERVAL_SECONDS", "3600"))
+
+# Draft generation settings
+# "single" writes the contract in one call; "parallel" writes each outline section concurrently
+DRAFT_MODE = os.getenv("DRAFT_MODE", "single")
+DRAFT_SECTION_CONCURRENCY = int(os.getenv("DRAFT_SECTION_CONCURRENCY", "6"))
+# "extractive" summarizes drafts locally with TF-IDF; "llm" asks the model for the summary
+DRAFT_SUMMARY_MODE = os.getenv("DRAFT_SUMMARY_MODE", "extractive")
+DRAFT_SUMMARY_SENTENCES = int(os.getenv("DRAFT_SUMMARY_SENTENCES", "3"))
 
 # Environment
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+from typing import List
+
+from sqlalchemy import Table, create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import DATABASE_URL
@@ -17,4 +19,29 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def add_missing_columns(table: Table) -> List[str]:
+    """Add columns declared on ``table`` that an existing database lacks.
+
+    ``create_all`` only creates missing tables, so columns added to a model
+    later never reach databases created before them. New columns must be
+    nullable. Returns the names of the columns added.
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table(table.name):
+        return []
+    existing = {column["name"] for column in inspector.get_columns(table.name)}
+    added = []
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            added.append(column.name)
+        for index in table.indexes:
+            if any(column.name in added for column in index.columns):
+                index.create(bind=conn, checkfirst=True)
+    return added
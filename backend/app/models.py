@@ -79,6 +79,10 @@ class Clause(Base):
     variables = Column(JSON)
     risk_score = Column(Float)
     tags = Column(JSON)
+    # Fingerprint of the normalized text; unchanged clauses keep their analysis on revision
+    content_hash = Column(String, index=True, nullable=True)
+    position = Column(Integer, nullable=True)
+    analysis = Column(JSON, nullable=True)
     last_updated = Column(DateTime(timezone=True), server_default=func.now())
 
     document = relationship("Document", back_populates="clauses")
@@ -151,3 +155,32 @@ class FileStorage(Base):
     created_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
 
     created_by = relationship("User")
+
+
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String, primary_key=True, index=True)  # UUID
+    document_id = Column(String, index=True, nullable=False)
+    status = Column(String, default="queued", index=True)  # queued, running, completed, failed
+    stage = Column(String, default="queued")
+    progress = Column(Float, default=0.0)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    # Times the job was put back because the provider was unavailable
+    deferrals = Column(Integer, default=0)
+    analysis_mode = Column(String, nullable=True)
+    # Earlier upload this one revises; its clause analyses are reused where unchanged
+    previous_document_id = Column(String, nullable=True)
+    webhook_url = Column(String, nullable=True)
+    # Daily budget key for explanation prefetch; None skips the prefetch
+    prefetch_user = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+    # Earliest time a worker may claim the job; doubles as the lease while running
+    available_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set on every claim; a run whose lease was taken over can no longer write the job
+    lease_id = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
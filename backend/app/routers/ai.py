@@ -3,22 +3,38 @@ from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models import User
-from app.schemas import ExplainClauseRequest, ExplainClauseResponse, SimulateClauseRequest, SimulateClauseResponse
+from app.config import CLAUSE_BATCH_MAX_ITEMS
+from app.schemas import (
+    ClauseBatchRequest,
+    ClauseBatchResponse,
+    ExplainClauseRequest,
+    ExplainClauseResponse,
+    SimulateClauseRequest,
+    SimulateClauseResponse,
+)
 from app.routers.auth import get_current_user
-from app.services.langgraph_ai_service import LangGraphAIService
+from app.services.clause_batches import clause_batches
+from app.services.explanation_prefetch import explanation_prefetcher
+from app.services.langgraph_ai_service import LangGraphAIService, get_ai_service
+from app.services.llm_cache import llm_cache
+from app.services.llm_client import llm_client
+from app.services.prompt_compression import context_compressor
+from app.services.workflow_graphs import workflow_checkpointer
 
 router = APIRouter()
 
 @router.post("/explain", response_model=ExplainClauseResponse)
 async def explain_clause(
     request: ExplainClauseRequest,
+    cache: bool = True,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    ai_service: LangGraphAIService = Depends(get_ai_service)
 ):
-    ai_service = LangGraphAIService()
     explanation = await ai_service.explain_clause(
         request.clause_text,
-        request.explanation_type
+        request.explanation_type,
+        use_cache=cache
     )
     return explanation
 
@@ -26,9 +42,9 @@ async def explain_clause(
 async def simulate_clause_change(
     request: SimulateClauseRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    ai_service: LangGraphAIService = Depends(get_ai_service)
 ):
-    ai_service = LangGraphAIService()
     simulation = await ai_service.simulate_clause_change(
         request.original_clause,
         request.modified_clause
@@ -38,29 +54,91 @@ async def simulate_clause_change(
 @router.post("/redline")
 async def suggest_redline(
     redline_request: dict,
+    cache: bool = True,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    ai_service: LangGraphAIService = Depends(get_ai_service)
 ):
-    ai_service = LangGraphAIService()
-    suggestions = await ai_service.suggest_redline(redline_request)
+    suggestions = await ai_service.suggest_redline(redline_request, use_cache=cache)
     return suggestions
 
 @router.post("/alternatives")
 async def generate_alternatives(
     alternatives_request: dict,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    ai_service: LangGraphAIService = Depends(get_ai_service)
 ):
-    ai_service = LangGraphAIService()
     alternatives = await ai_service.generate_alternatives(alternatives_request)
     return alternatives
 
 @router.post("/risk-analysis")
 async def analyze_risk(
     risk_request: dict,
+    cache: bool = True,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    ai_service: LangGraphAIService = Depends(get_ai_service)
 ):
-    ai_service = LangGraphAIService()
-    risk_analysis = await ai_service.analyze_risk(risk_request)
-    return risk_analysis
\ No newline at end of file
+    risk_analysis = await ai_service.analyze_risk(risk_request, use_cache=cache)
+    return risk_analysis
+
+async def _run_batch(operation: str, batch: ClauseBatchRequest, cache: bool) -> dict:
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="At least one clause is required")
+    if len(batch.items) > CLAUSE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many clauses. Maximum per batch: {CLAUSE_BATCH_MAX_ITEMS}",
+        )
+    return await clause_batches.run(operation, batch.items, use_cache=cache)
+
+@router.post("/explain/batch", response_model=ClauseBatchResponse)
+async def explain_clauses_batch(
+    batch: ClauseBatchRequest,
+    cache: bool = True,
+    current_user: User = Depends(get_current_user),
+):
+    """Explain many clauses at once; results are in request order with per-item errors"""
+    return await _run_batch("explain", batch, cache)
+
+@router.post("/redline/batch", response_model=ClauseBatchResponse)
+async def suggest_redlines_batch(
+    batch: ClauseBatchRequest,
+    cache: bool = True,
+    current_user: User = Depends(get_current_user),
+):
+    return await _run_batch("redline", batch, cache)
+
+@router.post("/alternatives/batch", response_model=ClauseBatchResponse)
+async def generate_alternatives_batch(
+    batch: ClauseBatchRequest,
+    cache: bool = True,
+    current_user: User = Depends(get_current_user),
+):
+    return await _run_batch("alternatives", batch, cache)
+
+@router.post("/risk-analysis/batch", response_model=ClauseBatchResponse)
+async def analyze_risk_batch(
+    batch: ClauseBatchRequest,
+    cache: bool = True,
+    current_user: User = Depends(get_current_user),
+):
+    return await _run_batch("risk", batch, cache)
+
+@router.get("/cache/stats")
+async def get_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    return llm_cache.stats()
+
+@router.get("/llm/stats")
+async def get_llm_stats(
+    current_user: User = Depends(get_current_user)
+):
+    return {
+        **llm_client.stats(),
+        "steps": context_compressor.stats(),
+        "workflows": workflow_checkpointer.stats(),
+        "prefetch": explanation_prefetcher.stats(),
+    }
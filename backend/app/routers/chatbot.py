@@ -1,15 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
-from app.services.langgraph_ai_service import LangGraphAIService
+from app.services.langgraph_ai_service import LangGraphAIService, get_ai_service
+from app.services.llm_resilience import CircuitOpenError
 from app.routers.auth import get_current_user
 from app.schemas import User
+from app.services.sse import sse_response
 
 router = APIRouter(prefix="/api/chatbot", tags=["chatbot"])
 
-# Initialize the LangGraph AI service
-ai_service = LangGraphAIService()
-
 
 class ChatMessage(BaseModel):
     message: str
@@ -36,7 +35,8 @@ chat_conversations: Dict[str, List[Dict[str, Any]]] = {}
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_ai(
     chat_message: ChatMessage,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    ai_service: LangGraphAIService = Depends(get_ai_service)
 ):
     """
     Chat with the AI legal assistant
@@ -81,10 +81,50 @@ async def chat_with_ai(
             conversation_id=conversation_id
         )
         
+    except CircuitOpenError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat message: {str(e)}")
 
 
+@router.post("/chat/stream")
+async def stream_chat_with_ai(
+    chat_message: ChatMessage,
+    current_user: User = Depends(get_current_user),
+    ai_service: LangGraphAIService = Depends(get_ai_service)
+):
+    """
+    Chat with the AI legal assistant, streaming the response as server-sent events
+    """
+    conversation_id = f"user_{current_user.id}_conv_{len(chat_conversations) + 1}"
+    chat_conversations.setdefault(conversation_id, []).append({
+        "role": "user",
+        "content": chat_message.message,
+        "timestamp": "2025-01-21T12:00:00Z"  # In production, use actual timestamp
+    })
+
+    async def events():
+        async for event in ai_service.stream_chat_response(
+            user_message=chat_message.message,
+            context=chat_message.context
+        ):
+            if event["event"] == "done":
+                result = event["data"]
+                chat_conversations[conversation_id].append({
+                    "role": "assistant",
+                    "content": result.get('response', ''),
+                    "timestamp": "2025-01-21T12:00:01Z",
+                    "metadata": {
+                        "query_type": result.get('query_type', ''),
+                        "intent": result.get('intent', '')
+                    }
+                })
+                event = {"event": "done", "data": {**result, "conversation_id": conversation_id}}
+            yield event
+
+    return sse_response(events())
+
+
 @router.get("/conversations/{conversation_id}", response_model=ChatHistory)
 async def get_conversation_history(
     conversation_id: str,
@@ -205,7 +245,8 @@ async def get_quick_help(
 @router.post("/knowledge-base")
 async def query_knowledge_base(
     query: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    ai_service: LangGraphAIService = Depends(get_ai_service)
 ):
     """
     Query the legal knowledge base for specific information
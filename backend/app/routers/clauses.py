@@ -6,6 +6,7 @@ from app.database import get_db
 from app.models import Clause, User
 from app.schemas import Clause as ClauseSchema, ClauseCreate, ClauseUpdate
 from app.routers.auth import get_current_user
+from app.services.clause_fingerprints import clause_fingerprint
 
 router = APIRouter()
 
@@ -47,7 +48,7 @@ async def create_clause(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    db_clause = Clause(**clause.dict())
+    db_clause = Clause(**clause.dict(), content_hash=clause_fingerprint(clause.text))
     db.add(db_clause)
     db.commit()
     db.refresh(db_clause)
@@ -66,6 +67,12 @@ async def update_clause(
     
     for field, value in clause_update.dict(exclude_unset=True).items():
         setattr(clause, field, value)
+    if clause_update.text is not None:
+        fingerprint = clause_fingerprint(clause_update.text)
+        if fingerprint != clause.content_hash:
+            # The stored analysis described the old wording
+            clause.content_hash = fingerprint
+            clause.analysis = None
     
     db.commit()
     db.refresh(clause)
@@ -1,15 +1,19 @@
 # app/api/documents.py
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Header, Response
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+import asyncio
 import os
 import uuid
 from pathlib import Path
 
 # Project services - adjust import paths to match your project structure
 from app.services.file_storage import file_storage
-from app.services.document_processor import document_processor
-from app.services.langgraph_ai_service import LangGraphAIService
+from app.services.document_processor import ExtractionQueueFull, document_processor
+from app.services.langgraph_ai_service import LangGraphAIService, get_ai_service
+from app.services.analysis_jobs import analysis_jobs, resolve_webhook
+from app.config import ALGORITHM, ANALYSIS_FAST_PATH, EXPLANATION_PREFETCH_ENABLED, SECRET_KEY
+from jose import jwt, JWTError
 
 # --- Optional DB dependencies / schemas (replace with your actual implementations) ---
 # from app.dependencies import get_db, get_current_user
@@ -31,7 +35,6 @@ from app.services.langgraph_ai_service import LangGraphAIService
 # ------------------------------------------------------------------------------
 
 router = APIRouter()
-ai_service = LangGraphAIService()
 
 # File upload config
 SUPPORTED_FILE_TYPES = {"pdf", "docx", "doc", "txt"}
@@ -41,6 +44,17 @@ UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "uploads"))
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def _requester_key(authorization: Optional[str]) -> str:
+    """Budget key for the caller: the token's subject, or "anonymous" without a valid token"""
+    if not authorization or not authorization.startswith("Bearer "):
+        return "anonymous"
+    try:
+        payload = jwt.decode(authorization.split(" ", 1)[1], SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return "anonymous"
+    return payload.get("sub") or "anonymous"
+
+
 # -----------------------
 # File-storage endpoints
 # Prefix: /files
@@ -69,9 +83,30 @@ async def get_file(document_id: str):
 
 
 @files_router.post("/upload")
-async def upload_file(file: UploadFile = File(...), analyze: bool = Form(True)):
+async def upload_file(
+    response: Response,
+    file: UploadFile = File(...),
+    analyze: bool = Form(True),
+    analysis_mode: Optional[str] = Form(None),
+    webhook_url: Optional[str] = Form(None),
+    previous_document_id: Optional[str] = Form(None),
+    prefetch_explanations: Optional[bool] = Form(None),
+    authorization: Optional[str] = Header(default=None, alias="Authorization"),
+    ai_service: LangGraphAIService = Depends(get_ai_service),
+):
     """
-    Upload a file, optionally run AI analysis, and save it to file_storage.
+    Upload a file and save it to file_storage. When ``analyze`` is set, text
+    extraction and AI analysis run as a background job and the response is a
+    202 carrying the job id to poll, sent as soon as the file is stored. With
+    ANALYSIS_FAST_PATH the job's first stage stores a preliminary local
+    report, also shown as the job's result; the deep analysis then replaces
+    it and bumps the document's ``analysis_version``.
+    ``previous_document_id`` marks the upload as a revision of an earlier
+    document: the job reuses that document's clause analyses and sends only
+    new or edited clauses to the LLM.
+    ``prefetch_explanations`` (default EXPLANATION_PREFETCH_ENABLED) explains
+    the riskiest clauses in the background within the caller's daily budget,
+    so opening them later is served from the response cache.
     """
     if not file.filename:
         raise HTTPException(status_code=400, detail="No filename provided")
@@ -83,6 +118,15 @@ async def upload_file(file: UploadFile = File(...), analyze: bool = Form(True)):
             detail=f"Unsupported file type. Supported types: {', '.join(SUPPORTED_FILE_TYPES)}",
         )
 
+    if previous_document_id and not file_storage.get_document(previous_document_id):
+        raise HTTPException(status_code=404, detail="Previous document not found")
+
+    if webhook_url:
+        try:
+            await resolve_webhook(webhook_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     file_content = await file.read()
     if len(file_content) > MAX_FILE_SIZE:
         raise HTTPException(
@@ -90,49 +134,58 @@ async def upload_file(file: UploadFile = File(...), analyze: bool = Form(True)):
             detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB",
         )
 
-    # Extract text
-    try:
-        document_text = await document_processor.extract_text(
-            file_content, file.filename
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=400, detail=f"Error processing document: {str(e)}"
-        )
-
-    # Optionally analyze
-    analysis = None
-    if analyze and document_text:
-        try:
-            analysis = await ai_service.analyze_document(document_text, file.filename)
-        except Exception as e:
-            # Non-fatal: continue and save with analysis error
-            analysis = {"error": f"Analysis failed: {str(e)}"}
-
     # Save file to file_storage (assuming save_document is async)
     try:
         doc_id = await file_storage.save_document(
             file_content=file_content,
             filename=file.filename,
             file_type=file_extension,
-            analysis=analysis,
             uploaded_at=datetime.utcnow().isoformat(),
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving document: {str(e)}")
 
+    if not analyze:
+        return {
+            "message": "Document uploaded successfully",
+            "document_id": doc_id,
+            "filename": file.filename,
+            "analyzed": False,
+            "analysis": None,
+        }
+
+    if prefetch_explanations is None:
+        prefetch_explanations = EXPLANATION_PREFETCH_ENABLED
+    prefetch_user = _requester_key(authorization) if prefetch_explanations else None
+    try:
+        job = await asyncio.to_thread(
+            analysis_jobs.enqueue, doc_id, analysis_mode, webhook_url, previous_document_id, prefetch_user
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error queueing analysis: {str(e)}"
+        )
+
+    response.status_code = 202
     return {
-        "message": "Document uploaded successfully",
+        "message": "Document uploaded; analysis queued",
         "document_id": doc_id,
         "filename": file.filename,
-        "analyzed": analysis is not None and "error" not in analysis,
-        "text_extracted": bool(document_text),
-        "analysis": analysis,
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/api/documents/jobs/{job['job_id']}",
+        "analysis": None,
+        "preliminary": ANALYSIS_FAST_PATH,
+        "prefetch": prefetch_explanations,
     }
 
 
 @files_router.post("/{document_id}/analyze")
-async def analyze_file(document_id: str):
+async def analyze_file(
+    document_id: str,
+    mode: Optional[str] = None,
+    ai_service: LangGraphAIService = Depends(get_ai_service),
+):
     """
     Analyze an already-uploaded file (reads from storage, extracts text, calls AI).
     """
@@ -158,7 +211,7 @@ async def analyze_file(document_id: str):
             file_content, document.get("filename", "")
         )
         analysis = await ai_service.analyze_document(
-            document_text, document.get("filename", "")
+            document_text, document.get("filename", ""), mode=mode
         )
         await file_storage.update_document_analysis(document_id, analysis)
 
@@ -167,7 +220,7 @@ async def analyze_file(document_id: str):
             "document_id": document_id,
             "analysis": analysis,
         }
-    except HTTPException:
+    except (HTTPException, ExtractionQueueFull):
         raise
     except Exception as e:
         raise HTTPException(
@@ -242,6 +295,33 @@ async def get_file_suggestions(document_id: str):
     }
 
 
+@files_router.get("/{document_id}/jobs")
+async def get_file_jobs(document_id: str):
+    """
+    List analysis jobs for a document, newest first.
+    """
+    return await asyncio.to_thread(analysis_jobs.list_jobs, document_id)
+
+
+# -----------------------
+# Analysis job endpoints
+# Prefix: /jobs
+# -----------------------
+jobs_router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@jobs_router.get("/{job_id}")
+async def get_job(job_id: str):
+    """
+    Return the status, stage and progress of an analysis job, plus its
+    result once completed.
+    """
+    job = await asyncio.to_thread(analysis_jobs.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 # -----------------------
 # DB-backed CRUD endpoints
 # These are kept at root-level ("/") and assume you have DB models & deps.
@@ -347,4 +427,5 @@ async def get_document_obligations_db(
 
 # Register sub-routers on main router
 router.include_router(files_router)
+router.include_router(jobs_router)
 router.include_router(db_router)
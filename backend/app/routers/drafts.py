@@ -4,28 +4,27 @@ from typing import List
 import uuid
 
 from app.database import get_db
-from app.models import User, Document, Clause
-from app.schemas import DraftRequest, DraftResponse
+from app.models import User, Document, Clause, Obligation, Version
+from app.schemas import DraftRequest, DraftResponse, DraftUpdate
 from app.routers.auth import get_current_user
-from app.services.langgraph_ai_service import LangGraphAIService
+from app.services.clause_fingerprints import clause_fingerprint
+from app.services.langgraph_ai_service import LangGraphAIService, get_ai_service
 from app.services.file_storage import file_storage
+from app.services.sse import sse_response
 from app.config import ENVIRONMENT, SECRET_KEY, ALGORITHM
 from jose import jwt, JWTError
 
 router = APIRouter()
 
 
-@router.post("/", response_model=DraftResponse)
-async def create_draft(
+def _persist_draft(
     draft_request: DraftRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-):
-    ai_service = LangGraphAIService()
-
-    # Generate draft using AI
-    draft_content = await ai_service.generate_draft(draft_request)
-
+    draft_content: dict,
+    current_user: User,
+    db: Session,
+    ai_service: LangGraphAIService,
+) -> DraftResponse:
+    """Store a generated draft and its extracted clauses"""
     # Create document record
     document = Document(
         title=f"{draft_request.contract_type} - {draft_request.parties.get('partyA', 'Unknown')}",
@@ -43,13 +42,15 @@ async def create_draft(
     clauses = ai_service.extract_clauses(draft_content["content"])
     clause_records = []
 
-    for clause_data in clauses:
+    for position, clause_data in enumerate(clauses):
         clause = Clause(
             document_id=document.id,
             clause_type=clause_data.get("type"),
             text=clause_data.get("text"),
             variables=clause_data.get("variables"),
             risk_score=clause_data.get("risk_score", 0.5),
+            content_hash=clause_fingerprint(clause_data.get("text")),
+            position=position,
         )
         db.add(clause)
         clause_records.append(clause)
@@ -72,6 +73,43 @@ async def create_draft(
     )
 
 
+@router.post("/", response_model=DraftResponse)
+async def create_draft(
+    draft_request: DraftRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    ai_service: LangGraphAIService = Depends(get_ai_service),
+):
+    # Generate draft using AI
+    draft_content = await ai_service.generate_draft(draft_request)
+
+    return _persist_draft(draft_request, draft_content, current_user, db, ai_service)
+
+
+@router.post("/stream", summary="Generate a draft, streaming tokens as server-sent events")
+async def stream_draft(
+    draft_request: DraftRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    ai_service: LangGraphAIService = Depends(get_ai_service),
+):
+    """
+    Emits step_start/token/step_end events for each workflow step, then a
+    done event carrying the saved DraftResponse.
+    """
+
+    async def events():
+        async for event in ai_service.stream_draft(draft_request):
+            if event["event"] == "done":
+                draft = _persist_draft(
+                    draft_request, event["data"], current_user, db, ai_service
+                )
+                event = {"event": "done", "data": draft.model_dump()}
+            yield event
+
+    return sse_response(events())
+
+
 @router.get("/{draft_id}")
 async def get_draft(
     draft_id: int,
@@ -87,7 +125,12 @@ async def get_draft(
     if not document:
         raise HTTPException(status_code=404, detail="Draft not found")
 
-    clauses = db.query(Clause).filter(Clause.document_id == document.id).all()
+    clauses = (
+        db.query(Clause)
+        .filter(Clause.document_id == document.id)
+        .order_by(Clause.position, Clause.id)
+        .all()
+    )
 
     return {"document": document, "clauses": clauses}
 
@@ -95,10 +138,18 @@ async def get_draft(
 @router.put("/{draft_id}")
 async def update_draft(
     draft_id: int,
-    content: dict,
+    draft_update: DraftUpdate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    ai_service: LangGraphAIService = Depends(get_ai_service),
 ):
+    """
+    Replace a draft's text and re-analyze only the clauses that changed.
+    Clauses are matched to the stored ones by content fingerprint: matches
+    keep their row and analysis, new or edited clauses get one LLM review
+    each, and clauses no longer present are deleted. Each update is
+    recorded as a new Version.
+    """
     document = (
         db.query(Document)
         .filter(Document.id == draft_id, Document.owner_id == current_user.id)
@@ -108,10 +159,83 @@ async def update_draft(
     if not document:
         raise HTTPException(status_code=404, detail="Draft not found")
 
-    # Update document content logic here
-    # This would typically involve updating the document's storage
+    stored = {}
+    for clause in db.query(Clause).filter(Clause.document_id == document.id).order_by(Clause.id):
+        # Rows saved before fingerprints existed are hashed on the fly
+        fingerprint = clause.content_hash or clause_fingerprint(clause.text)
+        stored.setdefault(fingerprint, []).append(clause)
+
+    clauses = ai_service.extract_clauses(draft_update.content)
+    entries = await ai_service.review_clauses(
+        [clause_data["text"] for clause_data in clauses],
+        {fingerprint: rows[0].analysis for fingerprint, rows in stored.items()},
+    )
+
+    version = Version(document_id=document.id, created_by_id=current_user.id)
+    db.add(version)
+    db.flush()
+
+    clause_records = []
+    reviewed = 0
+    for position, (clause_data, entry) in enumerate(zip(clauses, entries)):
+        rows = stored.get(entry["hash"])
+        if rows:
+            clause = rows.pop(0)
+        else:
+            clause = Clause(
+                document_id=document.id,
+                version_id=version.id,
+                clause_type=entry["type"],
+                variables=clause_data.get("variables"),
+                risk_score=entry["risk_score"],
+                analysis=entry["review"],
+            )
+            db.add(clause)
+            reviewed += 0 if entry["reused"] else 1
+        # Renumbering or re-wrapping keeps the fingerprint but not the text
+        clause.text = clause_data["text"]
+        clause.content_hash = entry["hash"]
+        clause.position = position
+        clause_records.append(clause)
+
+    removed = [clause for rows in stored.values() for clause in rows]
+    if removed:
+        db.query(Obligation).filter(
+            Obligation.clause_id.in_([clause.id for clause in removed])
+        ).update({Obligation.clause_id: None}, synchronize_session=False)
+        for clause in removed:
+            db.delete(clause)
+
+    revision = {
+        "clauses": len(clause_records),
+        "reused": len(clause_records) - reviewed,
+        "reviewed": reviewed,
+        "removed": len(removed),
+    }
+    version.diff_summary = (
+        f"{reviewed} clauses new or edited, {revision['reused']} unchanged, {len(removed)} removed"
+    )
+    if draft_update.title:
+        document.title = draft_update.title
+    document.version_id = str(uuid.uuid4())
+    db.commit()
 
-    return {"message": "Draft updated successfully"}
+    return {
+        "message": "Draft updated successfully",
+        "draft_id": str(document.id),
+        "version_id": version.id,
+        "revision": revision,
+        "clauses": [
+            {
+                "id": clause.id,
+                "type": clause.clause_type,
+                "text": clause.text,
+                "risk_score": clause.risk_score,
+                "analysis": clause.analysis,
+            }
+            for clause in clause_records
+        ],
+    }
 
 
 @router.post("/{draft_id}/simulate")
@@ -120,6 +244,7 @@ async def simulate_draft(
     simulation_request: dict,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    ai_service: LangGraphAIService = Depends(get_ai_service),
 ):
     document = (
         db.query(Document)
@@ -130,7 +255,6 @@ async def simulate_draft(
     if not document:
         raise HTTPException(status_code=404, detail="Draft not found")
 
-    ai_service = LangGraphAIService()
     simulation_result = await ai_service.simulate_changes(simulation_request)
 
     return simulation_result
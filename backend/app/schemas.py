@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import AliasChoices, BaseModel, EmailStr, Field
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from enum import Enum
@@ -84,6 +84,8 @@ class Clause(ClauseBase):
     document_id: Optional[int] = None
     version_id: Optional[int] = None
     risk_score: Optional[float] = None
+    content_hash: Optional[str] = None
+    analysis: Optional[Dict[str, Any]] = None
     last_updated: datetime
     
     class Config:
@@ -97,6 +99,12 @@ class DraftRequest(BaseModel):
     scope_short: str
     payment_terms: str
     risk_profile: str = "balanced"
+    draft_mode: Optional[str] = None  # single, parallel
+    summary_mode: Optional[str] = None  # extractive, llm
+
+class DraftUpdate(BaseModel):
+    content: str
+    title: Optional[str] = None
 
 class DraftResponse(BaseModel):
     draft_id: str
@@ -123,6 +131,67 @@ class SimulateClauseResponse(BaseModel):
     risk_assessment: float
     recommendations: List[str]
 
+# Fused document analysis schemas
+class FusedClause(BaseModel):
+    clause_type: str
+    risk_level: str  # Low, Medium, High
+    summary: str
+    key_terms: List[str] = []
+
+class FusedDocumentAnalysis(BaseModel):
+    clauses: List[FusedClause]
+    risk_score: float = Field(ge=0.0, le=1.0)
+    risks: List[str]
+    insights: List[str]
+
+class OutlineSection(BaseModel):
+    title: str
+    outline: List[str] = []
+
+class ContractOutline(BaseModel):
+    sections: List[OutlineSection]
+
+class ClauseReview(BaseModel):
+    clause_type: str
+    risk_level: str  # Low, Medium, High
+    risk_score: float = Field(ge=0.0, le=1.0)
+    summary: str
+    issues: List[str] = []
+
+class ClauseBatchItem(BaseModel):
+    # Single-clause risk requests call the field "text"
+    clause_text: str = Field(validation_alias=AliasChoices("clause_text", "text"))
+    explanation_type: str = "eli5"  # eli5, technical, legalese
+    risk_profile: str = "balanced"
+    instructions: str = ""
+
+class ClauseBatchRequest(BaseModel):
+    items: List[ClauseBatchItem]
+
+class ClauseBatchResult(BaseModel):
+    index: int
+    ok: bool
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class ClauseBatchResponse(BaseModel):
+    results: List[ClauseBatchResult]
+    stats: Dict[str, int]
+
+class PackedClauseResult(BaseModel):
+    id: int
+    explanation: Optional[str] = None
+    redline_text: Optional[str] = None
+    rationale: Optional[str] = None
+    alternatives: Optional[str] = None
+    analysis: Optional[str] = None
+    risk_score: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    risk_level: Optional[str] = None
+    recommendations: List[str] = []
+
+class PackedClauseResults(BaseModel):
+    results: List[PackedClauseResult]
+
 # Auth schemas
 class Token(BaseModel):
     access_token: str
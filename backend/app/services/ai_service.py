@@ -1,15 +1,28 @@
 import os
-from groq import Groq
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import json
-from app.config import GROQ_API_KEY
+from datetime import datetime
+from app.config import (
+    CHAT_MODEL,
+    ANALYSIS_CHUNK_CHARS,
+    ANALYSIS_MAP_CONCURRENCY,
+    ANALYSIS_REDUCE_CHARS,
+    DRAFT_SUMMARY_MODE,
+    DRAFT_SUMMARY_SENTENCES,
+)
+from app.services.document_analyzer import DocumentAnalyzer
+from app.services.llm_client import LLMClient, llm_client
+from app.services.llm_resilience import CircuitOpenError
+from app.services.map_reduce import map_concurrently, reduce_hierarchically
+from app.services.text_segmenter import chunk_text
 from app.schemas import DraftRequest, ExplainClauseResponse, SimulateClauseResponse
 
 
 class AIService:
-    def __init__(self):
-        self.client = Groq(api_key=GROQ_API_KEY)
-        self.model = "llama3-8b-8192"
+    def __init__(self, llm: Optional[LLMClient] = None):
+        self.llm = llm or llm_client
+        self.model = CHAT_MODEL
+        self.document_analyzer = DocumentAnalyzer()
 
     async def generate_draft(self, request: DraftRequest) -> Dict[str, Any]:
         """Generate a contract draft using Groq AI"""
@@ -29,38 +42,27 @@ class AIService:
         """
 
         try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert legal document drafting assistant. Create professional, comprehensive legal documents with proper structure, clear language, and appropriate legal provisions.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+            content = await self.llm.complete(
+                prompt,
+                system_prompt="You are an expert legal document drafting assistant. Create professional, comprehensive legal documents with proper structure, clear language, and appropriate legal provisions.",
                 model=self.model,
                 temperature=0.3,
                 max_tokens=4000,
             )
 
-            content = response.choices[0].message.content
-
-            # Generate a summary
-            summary_prompt = f"Provide a 3-line executive summary of this contract:\n\n{content[:1000]}..."
-
-            summary_response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a legal expert. Provide concise, accurate summaries of legal documents.",
-                    },
-                    {"role": "user", "content": summary_prompt},
-                ],
-                model=self.model,
-                temperature=0.2,
-                max_tokens=200,
-            )
+            # Generate a summary locally from the whole draft unless an LLM summary is requested
+            if (request.summary_mode or DRAFT_SUMMARY_MODE) == "llm":
+                summary_prompt = f"Provide a 3-line executive summary of this contract:\n\n{content[:1000]}..."
 
-            summary = summary_response.choices[0].message.content
+                summary = await self.llm.complete(
+                    summary_prompt,
+                    system_prompt="You are a legal expert. Provide concise, accurate summaries of legal documents.",
+                    model=self.model,
+                    temperature=0.2,
+                    max_tokens=200,
+                )
+            else:
+                summary = self.document_analyzer.summarize(content, DRAFT_SUMMARY_SENTENCES)
 
             return {"content": content, "summary": summary}
 
@@ -164,21 +166,14 @@ class AIService:
         prompt = f"{style_prompts.get(explanation_type, style_prompts['eli5'])}\n\n{clause_text}"
 
         try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a legal expert who can explain complex legal concepts clearly. Always provide accurate, helpful explanations with appropriate citations when possible.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+            explanation = await self.llm.complete(
+                prompt,
+                system_prompt="You are a legal expert who can explain complex legal concepts clearly. Always provide accurate, helpful explanations with appropriate citations when possible.",
                 model=self.model,
                 temperature=0.2,
                 max_tokens=1000,
             )
 
-            explanation = response.choices[0].message.content
-
             return ExplainClauseResponse(
                 explanation=explanation,
                 confidence=0.85,  # Would be calculated based on model certainty
@@ -211,21 +206,14 @@ class AIService:
         """
 
         try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a legal risk analyst. Provide thorough, accurate analysis of legal clause changes and their implications.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+            analysis_text = await self.llm.complete(
+                prompt,
+                system_prompt="You are a legal risk analyst. Provide thorough, accurate analysis of legal clause changes and their implications.",
                 model=self.model,
                 temperature=0.2,
                 max_tokens=1500,
             )
 
-            analysis_text = response.choices[0].message.content
-
             # Parse the response (simplified)
             impact_analysis = {"analysis": analysis_text}
             risk_assessment = 0.5  # Would extract from response
@@ -263,21 +251,14 @@ class AIService:
         """
 
         try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a legal negotiation expert. Provide specific, actionable redline suggestions with clear rationale.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+            redline_text = await self.llm.complete(
+                prompt,
+                system_prompt="You are a legal negotiation expert. Provide specific, actionable redline suggestions with clear rationale.",
                 model=self.model,
                 temperature=0.3,
                 max_tokens=1000,
             )
 
-            redline_text = response.choices[0].message.content
-
             return {
                 "redline_text": redline_text,
                 "rationale": "AI-generated redline based on risk profile and instructions",
@@ -307,21 +288,14 @@ class AIService:
         """
 
         try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a legal drafting expert. Create clause alternatives that vary in risk profile while maintaining legal validity.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+            alternatives_text = await self.llm.complete(
+                prompt,
+                system_prompt="You are a legal drafting expert. Create clause alternatives that vary in risk profile while maintaining legal validity.",
                 model=self.model,
                 temperature=0.4,
                 max_tokens=1500,
             )
 
-            alternatives_text = response.choices[0].message.content
-
             return {
                 "alternatives": alternatives_text,
                 "variants": ["safe", "balanced", "aggressive"],
@@ -348,21 +322,14 @@ class AIService:
         """
 
         try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a legal risk assessment expert. Provide thorough, accurate risk analysis with actionable recommendations.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+            risk_analysis = await self.llm.complete(
+                prompt,
+                system_prompt="You are a legal risk assessment expert. Provide thorough, accurate risk analysis with actionable recommendations.",
                 model=self.model,
                 temperature=0.2,
                 max_tokens=1000,
             )
 
-            risk_analysis = response.choices[0].message.content
-
             return {
                 "analysis": risk_analysis,
                 "risk_score": 0.6,  # Would extract from response
@@ -381,13 +348,18 @@ class AIService:
     ) -> Dict[str, Any]:
         """Analyze uploaded legal document and provide insights"""
 
-        prompt = f"""
-        Analyze this legal document and provide comprehensive insights:
+        system_prompt = "You are a senior legal analyst specializing in document review and analysis. Provide thorough, accurate analysis with actionable insights."
+        chunks = chunk_text(document_text, ANALYSIS_CHUNK_CHARS)
+
+        async def analyze_chunk(index: int, chunk: str) -> str:
+            part_label = f" (part {index + 1} of {len(chunks)})" if len(chunks) > 1 else ""
+            prompt = f"""
+        Analyze this legal document{part_label} and provide comprehensive insights:
         
         DOCUMENT: {filename}
         
         TEXT:
-        {document_text[:4000]}  # Limit to first 4000 chars to avoid token limits
+        {chunk}
         
         Please provide:
         1. Document type and classification
@@ -400,22 +372,43 @@ class AIService:
         
         Format your response as structured JSON with clear sections.
         """
+            return await self.llm.complete(
+                prompt,
+                system_prompt=system_prompt,
+                model=self.model,
+                temperature=0.2,
+                max_tokens=2000,
+            )
 
-        try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a senior legal analyst specializing in document review and analysis. Provide thorough, accurate analysis with actionable insights.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+        async def merge_analyses(partials: List[str]) -> str:
+            sections = "\n\n".join(
+                f"--- Analysis of part {i + 1} ---\n{partial}"
+                for i, partial in enumerate(partials)
+            )
+            prompt = f"""
+        Merge these analyses of consecutive parts of the legal document {filename}
+        into one comprehensive analysis with the same sections. Combine duplicate
+        findings, keep every distinct risk, and give one overall risk assessment.
+        
+        {sections}
+        
+        Format your response as structured JSON with clear sections.
+        """
+            return await self.llm.complete(
+                prompt,
+                system_prompt=system_prompt,
                 model=self.model,
                 temperature=0.2,
                 max_tokens=2000,
             )
 
-            analysis_text = response.choices[0].message.content
+        try:
+            partials = await map_concurrently(
+                chunks, analyze_chunk, ANALYSIS_MAP_CONCURRENCY
+            )
+            analysis_text = await reduce_hierarchically(
+                partials, merge_analyses, ANALYSIS_REDUCE_CHARS, ANALYSIS_MAP_CONCURRENCY
+            )
 
             # Extract key information and structure it
             return {
@@ -426,9 +419,24 @@ class AIService:
                 "recommendations": self._generate_recommendations(analysis_text),
                 "summary": self._generate_summary(analysis_text),
                 "word_count": len(document_text.split()),
-                "analyzed_at": "2025-01-21",  # Would use actual timestamp
+                "chunks_analyzed": len(chunks),
+                "analyzed_at": datetime.now().isoformat(),
             }
 
+        except CircuitOpenError:
+            # Provider unavailable: serve the keyword heuristics on their own
+            return {
+                "document_type": self._extract_document_type(document_text),
+                "analysis": "AI analysis is temporarily unavailable; showing an automated keyword review.",
+                "risk_level": self._assess_overall_risk(document_text),
+                "key_clauses": self._identify_key_clauses(document_text),
+                "recommendations": self._generate_recommendations(""),
+                "summary": "Preliminary keyword analysis; re-run the analysis for full insights.",
+                "word_count": len(document_text.split()),
+                "chunks_analyzed": len(chunks),
+                "degraded": True,
+                "analyzed_at": datetime.now().isoformat(),
+            }
         except Exception as e:
             raise Exception(f"Error analyzing document: {str(e)}")
 
@@ -0,0 +1,498 @@
+import asyncio
+import ipaddress
+import logging
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+from sqlalchemy import or_
+
+from app.config import (
+    ANALYSIS_FAST_PATH,
+    ANALYSIS_WORKERS,
+    ANALYSIS_JOB_MAX_ATTEMPTS,
+    ANALYSIS_JOB_LEASE_SECONDS,
+    ANALYSIS_JOB_RETRY_DELAY_SECONDS,
+    ANALYSIS_JOB_POLL_SECONDS,
+    ANALYSIS_JOB_MAX_DEFERRALS,
+    ANALYSIS_JOB_MAX_DEFER_SECONDS,
+    ANALYSIS_WEBHOOK_ALLOWED_HOSTS,
+)
+from app.database import SessionLocal, add_missing_columns, engine
+from app.models import AnalysisJob
+from app.services.document_processor import document_processor, locate_pages
+from app.services.explanation_prefetch import explanation_prefetcher
+from app.services.file_storage import file_storage
+from app.services.langgraph_ai_service import ai_service
+from app.services.llm_scheduler import llm_priority
+from app.services.text_segmenter import segment_clauses
+from app.services.workflow_graphs import workflow_checkpointer
+
+logger = logging.getLogger(__name__)
+
+
+async def resolve_webhook(url: str) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+    """Check a webhook URL and pin it to the public address it resolves to.
+
+    Only http(s) URLs on ANALYSIS_WEBHOOK_ALLOWED_HOSTS (any host when
+    unset) whose every address is public are accepted; anything else raises
+    ValueError. Returns the URL rewritten to that address with the Host
+    header and TLS server name to send, so a DNS answer that changes after
+    the check cannot point the request at an internal service.
+    """
+    parsed = urlsplit(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("Webhook URL must be an absolute http(s) URL")
+    host = parsed.hostname.lower()
+    if ANALYSIS_WEBHOOK_ALLOWED_HOSTS and not any(
+        host == allowed or host.endswith(f".{allowed}") for allowed in ANALYSIS_WEBHOOK_ALLOWED_HOSTS
+    ):
+        raise ValueError(f"Webhook host {host} is not allowed")
+
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (ValueError, OSError):
+        raise ValueError(f"Webhook host {host} could not be resolved")
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global:
+            raise ValueError(f"Webhook host {host} resolves to a non-public address")
+
+    netloc = f"[{addresses[0]}]" if ":" in addresses[0] else addresses[0]
+    if parsed.port:
+        netloc += f":{parsed.port}"
+    pinned = urlunsplit((parsed.scheme, netloc, parsed.path or "/", parsed.query, ""))
+    headers = {"Host": parsed.netloc.rsplit("@", 1)[-1]}
+    extensions = {"sni_hostname": host} if parsed.scheme == "https" else {}
+    return pinned, headers, extensions
+
+
+class _LeaseLost(Exception):
+    """The job's lease passed to another claim; this attempt must not write it"""
+
+
+class AnalysisJobQueue:
+    """Database-backed queue that runs document analysis in background workers.
+
+    Jobs live in the ``analysis_jobs`` table, so any replica can report their
+    status. Database calls run in worker threads, off the event loop.
+    Workers claim jobs with a conditional UPDATE, which makes claiming
+    safe across processes; a claimed job is leased until ``available_at``,
+    which a heartbeat pushes forward while it runs, and is picked up again
+    if its worker dies before finishing. Every claim gets a new lease id
+    and a run only writes the job while its id is current, so a run that
+    lost its lease cannot overwrite the new owner's state. While the LLM
+    provider is unavailable a job is deferred with backoff rather than
+    completed with the degraded keyword analysis.
+    """
+
+    def __init__(
+        self,
+        workers: int = ANALYSIS_WORKERS,
+        max_attempts: int = ANALYSIS_JOB_MAX_ATTEMPTS,
+        lease_seconds: int = ANALYSIS_JOB_LEASE_SECONDS,
+        retry_delay_seconds: int = ANALYSIS_JOB_RETRY_DELAY_SECONDS,
+        poll_seconds: float = ANALYSIS_JOB_POLL_SECONDS,
+        max_deferrals: int = ANALYSIS_JOB_MAX_DEFERRALS,
+        max_defer_seconds: int = ANALYSIS_JOB_MAX_DEFER_SECONDS,
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.retry_delay_seconds = retry_delay_seconds
+        self.poll_seconds = poll_seconds
+        self.max_deferrals = max_deferrals
+        self.max_defer_seconds = max_defer_seconds
+        self._tasks: List[asyncio.Task] = []
+        self._notifications: Set[asyncio.Task] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def start(self):
+        """Create the jobs table if needed and launch the worker pool"""
+        AnalysisJob.__table__.create(bind=engine, checkfirst=True)
+        add_missing_columns(AnalysisJob.__table__)
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"analysis-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(
+        self,
+        document_id: str,
+        analysis_mode: Optional[str] = None,
+        webhook_url: Optional[str] = None,
+        previous_document_id: Optional[str] = None,
+        prefetch_user: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Persist a new job and wake an idle worker.
+
+        With ``previous_document_id`` the document is analyzed as a revision
+        of that earlier upload, re-reviewing only the clauses that changed.
+        With ``prefetch_user`` the riskiest clauses are explained in the
+        background once the text is extracted, within that user's budget.
+        """
+        db = SessionLocal()
+        try:
+            job = AnalysisJob(
+                id=str(uuid.uuid4()),
+                document_id=document_id,
+                status="queued",
+                stage="queued",
+                progress=0.0,
+                attempts=0,
+                max_attempts=self.max_attempts,
+                deferrals=0,
+                analysis_mode=analysis_mode,
+                previous_document_id=previous_document_id,
+                webhook_url=webhook_url,
+                prefetch_user=prefetch_user,
+                available_at=datetime.utcnow(),
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            job_data = self._serialize(job)
+        finally:
+            db.close()
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_data
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+            return self._serialize(job) if job else None
+        finally:
+            db.close()
+
+    def list_jobs(self, document_id: str) -> List[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            jobs = (
+                db.query(AnalysisJob)
+                .filter(AnalysisJob.document_id == document_id)
+                .order_by(AnalysisJob.created_at.desc())
+                .all()
+            )
+            return [self._serialize(job, include_result=False) for job in jobs]
+        finally:
+            db.close()
+
+    def _serialize(self, job: AnalysisJob, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": job.id,
+            "document_id": job.document_id,
+            "status": job.status,
+            "stage": job.stage,
+            "progress": job.progress,
+            "attempts": job.attempts,
+            "max_attempts": job.max_attempts,
+            "deferrals": job.deferrals or 0,
+            "error": job.error,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        }
+        if include_result:
+            data["result"] = job.result
+        return data
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest available job, or return None"""
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            candidates = (
+                db.query(AnalysisJob.id, AnalysisJob.status)
+                .filter(
+                    or_(AnalysisJob.status == "queued", AnalysisJob.status == "running"),
+                    AnalysisJob.available_at <= now,
+                )
+                .order_by(AnalysisJob.created_at)
+                .limit(5)
+                .all()
+            )
+            for job_id, status in candidates:
+                lease_id = str(uuid.uuid4())
+                claimed = (
+                    db.query(AnalysisJob)
+                    .filter(
+                        AnalysisJob.id == job_id,
+                        AnalysisJob.status == status,
+                        AnalysisJob.available_at <= now,
+                    )
+                    .update(
+                        {
+                            AnalysisJob.status: "running",
+                            AnalysisJob.stage: "starting",
+                            AnalysisJob.attempts: AnalysisJob.attempts + 1,
+                            AnalysisJob.available_at: now + timedelta(seconds=self.lease_seconds),
+                            AnalysisJob.lease_id: lease_id,
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+                if claimed:
+                    job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+                    return {
+                        "id": job.id,
+                        "document_id": job.document_id,
+                        "attempts": job.attempts,
+                        "max_attempts": job.max_attempts,
+                        "deferrals": job.deferrals or 0,
+                        "analysis_mode": job.analysis_mode,
+                        "previous_document_id": job.previous_document_id,
+                        "webhook_url": job.webhook_url,
+                        "prefetch_user": job.prefetch_user,
+                        "lease_id": lease_id,
+                    }
+            return None
+        finally:
+            db.close()
+
+    def _update(self, job_id: str, lease: Optional[str] = None, **fields):
+        """Write job fields; with ``lease``, only while that claim still holds the job"""
+        db = SessionLocal()
+        try:
+            query = db.query(AnalysisJob).filter(AnalysisJob.id == job_id)
+            if lease is not None:
+                query = query.filter(AnalysisJob.lease_id == lease)
+            updated = query.update(
+                {getattr(AnalysisJob, name): value for name, value in fields.items()},
+                synchronize_session=False,
+            )
+            db.commit()
+        finally:
+            db.close()
+        if lease is not None and not updated:
+            raise _LeaseLost(job_id)
+
+    async def _write(self, job: Dict[str, Any], **fields):
+        """Update the job a worker is running, as long as its lease holds"""
+        await asyncio.to_thread(self._update, job["id"], lease=job["lease_id"], **fields)
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                logger.warning("Could not claim analysis job: %s", e)
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]):
+        """Run one claimed attempt, renewing its lease until it ends.
+
+        If the lease is lost anyway (the worker stalled, or another replica
+        took the job over), the attempt is stopped and leaves the job to
+        its new owner.
+        """
+        attempt = asyncio.create_task(self._attempt(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job, attempt))
+        try:
+            await attempt
+        except _LeaseLost:
+            logger.warning("Lost the lease on analysis job %s; leaving it to its new owner", job["id"])
+        except asyncio.CancelledError:
+            if job.get("lease_lost") and not asyncio.current_task().cancelling():
+                logger.warning("Lost the lease on analysis job %s; stopped its attempt", job["id"])
+                return
+            raise
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job: Dict[str, Any], attempt: asyncio.Task):
+        """Push the lease forward while ``attempt`` runs; stop it if the lease is gone"""
+        interval = max(self.lease_seconds / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._write(
+                    job, available_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+                )
+            except _LeaseLost:
+                job["lease_lost"] = True
+                attempt.cancel()
+                return
+            except Exception as e:
+                logger.warning("Could not renew the lease on analysis job %s: %s", job["id"], e)
+
+    async def _attempt(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        if job["attempts"] > job["max_attempts"]:
+            await self._finish(job, "failed", error="Job exceeded its retry budget")
+            return
+
+        try:
+            await self._write(job, stage="extracting", progress=0.1)
+            file_data = await file_storage.get_file_from_db(job["document_id"])
+            if not file_data:
+                await self._finish(job, "failed", error="Stored file not found")
+                return
+            document_text, page_offsets = await document_processor.extract_pages(
+                file_data["file_content"], file_data["filename"]
+            )
+            if not document_text:
+                await self._finish(job, "failed", error="No text could be extracted")
+                return
+            if job["attempts"] == 1 and not job["deferrals"]:
+                await self._preliminary(job, document_text, file_data["filename"])
+
+            previous = None
+            if job["previous_document_id"]:
+                previous = await asyncio.to_thread(
+                    file_storage.get_document_analysis, job["previous_document_id"]
+                )
+
+            await self._write(job, stage="analyzing", progress=0.3)
+            # Background work yields provider capacity to interactive requests
+            with llm_priority("batch"):
+                # Keyed by job, so a retried attempt resumes the workflow where it failed
+                analysis = await ai_service.analyze_document(
+                    document_text,
+                    file_data["filename"],
+                    mode=job["analysis_mode"],
+                    thread_id=self._thread_id(job_id),
+                    previous=previous,
+                )
+
+            if analysis.get("degraded") and job["deferrals"] < self.max_deferrals:
+                await self._defer(job)
+                return
+
+            # Let clauses, and anything citing them, point at the page they came from
+            analysis.pop("page_offsets", None)
+            if page_offsets:
+                analysis["page_offsets"] = page_offsets
+                pages = locate_pages(document_text, segment_clauses(document_text), page_offsets)
+                for clause, page in zip(analysis.get("clauses") or [], pages):
+                    clause["page"] = page
+
+            await self._write(job, stage="saving", progress=0.9)
+            await file_storage.update_document_analysis(job["document_id"], analysis)
+            await self._finish(job, "completed", result=analysis)
+        except asyncio.CancelledError:
+            # Shutting down: release the lease so another worker can resume the job.
+            # Written inline, since a cancelled task should not suspend again
+            if not job.get("lease_lost"):
+                try:
+                    self._update(
+                        job_id, lease=job["lease_id"], status="queued", stage="queued",
+                        available_at=datetime.utcnow(),
+                    )
+                except _LeaseLost:
+                    pass
+            raise
+        except _LeaseLost:
+            raise
+        except Exception as e:
+            if job["attempts"] < job["max_attempts"]:
+                await self._write(
+                    job,
+                    status="queued",
+                    stage="retrying",
+                    error=str(e),
+                    available_at=datetime.utcnow()
+                    + timedelta(seconds=self.retry_delay_seconds * job["attempts"]),
+                )
+            else:
+                await self._finish(job, "failed", error=str(e))
+
+    async def _preliminary(self, job: Dict[str, Any], document_text: str, filename: str):
+        """First answer for a new upload: the local report, and explanation prefetch.
+
+        The report is stored as the document's preliminary analysis and as
+        the job's result until the deep analysis replaces it. Best effort.
+        """
+        try:
+            if ANALYSIS_FAST_PATH:
+                preliminary = await asyncio.to_thread(
+                    ai_service.preliminary_analysis, document_text, filename
+                )
+                await file_storage.update_document_analysis(job["document_id"], preliminary)
+                await self._write(job, stage="preliminary_ready", progress=0.2, result=preliminary)
+            if job["prefetch_user"]:
+                explanation_prefetcher.schedule(document_text, job["prefetch_user"])
+        except _LeaseLost:
+            raise
+        except Exception as e:
+            logger.warning("Preliminary analysis of %s failed: %s", filename, e)
+
+    @staticmethod
+    def _thread_id(job_id: str) -> str:
+        return f"analysis-job-{job_id}"
+
+    async def _defer(self, job: Dict[str, Any]):
+        """Put a job back until the provider recovers; the attempt it used is returned"""
+        delay = min(self.retry_delay_seconds * 2 ** job["deferrals"], self.max_defer_seconds)
+        logger.info("LLM provider unavailable; deferring analysis job %s by %ss", job["id"], delay)
+        await self._write(
+            job,
+            status="queued",
+            stage="waiting_for_provider",
+            attempts=job["attempts"] - 1,
+            deferrals=job["deferrals"] + 1,
+            available_at=datetime.utcnow() + timedelta(seconds=delay),
+        )
+
+    async def _finish(
+        self,
+        job: Dict[str, Any],
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ):
+        fields = {"status": status, "stage": status, "error": error, "finished_at": datetime.utcnow()}
+        if status == "completed":
+            fields.update(progress=1.0, result=result)
+        await self._write(job, **fields)
+        # The job will not run again, so its workflow has nothing left to resume
+        await workflow_checkpointer.forget(self._thread_id(job["id"]))
+        if job.get("webhook_url"):
+            task = asyncio.create_task(self._notify(job, status, error))
+            self._notifications.add(task)
+            task.add_done_callback(self._notifications.discard)
+
+    async def _notify(self, job: Dict[str, Any], status: str, error: Optional[str]):
+        payload = {
+            "job_id": job["id"],
+            "document_id": job["document_id"],
+            "status": status,
+            "error": error,
+        }
+        try:
+            url, headers, extensions = await resolve_webhook(job["webhook_url"])
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                await client.post(url, json=payload, headers=headers, extensions=extensions)
+        except Exception as e:
+            logger.warning("Analysis webhook to %s failed: %s", job["webhook_url"], e)
+
+
+# Global job queue instance
+analysis_jobs = AnalysisJobQueue()
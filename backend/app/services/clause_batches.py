@@ -0,0 +1,237 @@
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import (
+    CLAUSE_BATCH_CONCURRENCY,
+    CLAUSE_BATCH_PACK_MAX_ITEMS,
+    CLAUSE_BATCH_PACK_TOKENS,
+    CLAUSE_BATCH_SHORT_CLAUSE_TOKENS,
+)
+from app.schemas import ClauseBatchItem, PackedClauseResult, PackedClauseResults
+from app.services.clause_fingerprints import clause_fingerprint
+from app.services.langgraph_ai_service import LangGraphAIService, ai_service
+from app.services.llm_resilience import StructuredOutputError
+from app.services.map_reduce import map_concurrently
+from app.services.prompt_compression import count_tokens
+
+logger = logging.getLogger(__name__)
+
+EXPLANATION_STYLES = {
+    "eli5": "explain it as if to a 5-year-old",
+    "technical": "give a detailed technical explanation",
+}
+DEFAULT_EXPLANATION_STYLE = "explain it using precise legal terminology"
+
+# Per operation: the item fields that change the answer, the instruction for
+# a packed prompt, the JSON fields each packed result carries, and how a
+# packed result becomes the single endpoint's response
+OPERATIONS: Dict[str, Dict[str, Any]] = {
+    "explain": {
+        "params": ("explanation_type",),
+        "task": "explain the clause in the style given for it",
+        "fields": '"explanation": string',
+        "required": "explanation",
+        "label": lambda item: EXPLANATION_STYLES.get(item.explanation_type, DEFAULT_EXPLANATION_STYLE),
+        "shape": lambda r: {"explanation": r.explanation, "confidence": 0.85, "citations": []},
+    },
+    "redline": {
+        "params": ("risk_profile", "instructions"),
+        "task": "suggest redline changes for the risk profile and instructions given for it",
+        "fields": '"redline_text": string, "rationale": string',
+        "required": "redline_text",
+        "label": lambda item: f"risk profile: {item.risk_profile}"
+        + (f"; instructions: {item.instructions}" if item.instructions else ""),
+        "shape": lambda r: {
+            "redline_text": r.redline_text,
+            "rationale": r.rationale or "Redline based on risk profile and instructions",
+            "confidence": 0.82,
+        },
+    },
+    "alternatives": {
+        "params": (),
+        "task": "provide 3 variants (safe, balanced, aggressive) of the clause",
+        "fields": '"alternatives": string',
+        "required": "alternatives",
+        "label": lambda item: "",
+        "shape": lambda r: {"alternatives": r.alternatives, "variants": ["safe", "balanced", "aggressive"]},
+    },
+    "risk": {
+        "params": (),
+        "task": "analyze its legal and business risks",
+        "fields": '"analysis": string, "risk_score": number from 0 to 1, "risk_level": "Low" | "Medium" | "High", "recommendations": [string]',
+        "required": "analysis",
+        "label": lambda item: "",
+        "shape": lambda r: {
+            "analysis": r.analysis,
+            "risk_score": r.risk_score if r.risk_score is not None else 0.6,
+            "risk_level": r.risk_level or "Medium",
+            "recommendations": r.recommendations or ["Review with legal counsel"],
+        },
+    },
+}
+
+
+class ClauseBatchProcessor:
+    """Run one clause operation over many clauses with as few LLM calls as possible.
+
+    Identical clauses (same fingerprint and options) are answered once.
+    Short clauses are packed into shared prompts of up to
+    CLAUSE_BATCH_PACK_TOKENS tokens and CLAUSE_BATCH_PACK_MAX_ITEMS clauses,
+    answered as one JSON object; long clauses, and any packed clause the
+    model's reply leaves out, go through the single-clause service method.
+    Calls run at most CLAUSE_BATCH_CONCURRENCY at a time. Results come back
+    in request order, each with its own error.
+    """
+
+    def __init__(
+        self,
+        service: Optional[LangGraphAIService] = None,
+        concurrency: int = CLAUSE_BATCH_CONCURRENCY,
+        pack_tokens: int = CLAUSE_BATCH_PACK_TOKENS,
+        pack_max_items: int = CLAUSE_BATCH_PACK_MAX_ITEMS,
+        short_clause_tokens: int = CLAUSE_BATCH_SHORT_CLAUSE_TOKENS,
+    ):
+        self.service = service or ai_service
+        self.concurrency = concurrency
+        self.pack_tokens = pack_tokens
+        self.pack_max_items = pack_max_items
+        self.short_clause_tokens = short_clause_tokens
+
+    def _pack(
+        self, keys: List[Tuple], unique: Dict[Tuple, ClauseBatchItem]
+    ) -> Tuple[List[List[Tuple]], List[Tuple]]:
+        """Group short clauses into packs within the token budget; return packs and singles"""
+        packs: List[List[Tuple]] = []
+        singles: List[Tuple] = []
+        current: List[Tuple] = []
+        used = 0
+        for key in keys:
+            tokens = count_tokens(unique[key].clause_text)
+            if tokens > self.short_clause_tokens:
+                singles.append(key)
+                continue
+            if current and (used + tokens > self.pack_tokens or len(current) >= self.pack_max_items):
+                packs.append(current)
+                current, used = [], 0
+            current.append(key)
+            used += tokens
+        if current:
+            packs.append(current)
+        # A pack of one saves nothing over the single-clause call
+        singles.extend(pack[0] for pack in packs if len(pack) == 1)
+        return [pack for pack in packs if len(pack) > 1], singles
+
+    def _packed_prompt(self, operation: str, items: List[ClauseBatchItem]) -> str:
+        spec = OPERATIONS[operation]
+        listing = "\n\n".join(
+            f"[{index}]" + (f" ({spec['label'](item)})" if spec["label"](item) else "") + f"\n{item.clause_text}"
+            for index, item in enumerate(items)
+        )
+        return f"""
+        For each numbered clause below, {spec['task']}.
+        Respond with a single JSON object of the form
+        {{"results": [{{"id": <clause number>, {spec['fields']}}}]}}
+        with exactly one entry per clause.
+
+        {listing}
+        """
+
+    async def _run_packed(
+        self, operation: str, items: List[ClauseBatchItem], use_cache: bool
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Answer a pack in one call; clauses missing from the reply come back as None"""
+        spec = OPERATIONS[operation]
+        try:
+            packed = await self.service._execute_structured_step(
+                self._packed_prompt(operation, items),
+                "clause_batch",
+                PackedClauseResults,
+                use_cache=use_cache,
+            )
+        except StructuredOutputError as e:
+            logger.warning("Packed %s reply failed validation: %s", operation, e)
+            return [None] * len(items)
+        by_id: Dict[int, PackedClauseResult] = {r.id: r for r in packed.results if getattr(r, spec["required"])}
+        return [spec["shape"](by_id[index]) if index in by_id else None for index in range(len(items))]
+
+    async def _run_single(self, operation: str, item: ClauseBatchItem, use_cache: bool) -> Dict[str, Any]:
+        service = self.service
+        if operation == "explain":
+            response = await service.explain_clause(item.clause_text, item.explanation_type, use_cache=use_cache)
+            return response.model_dump()
+        if operation == "redline":
+            return await service.suggest_redline(
+                {
+                    "clause_text": item.clause_text,
+                    "risk_profile": item.risk_profile,
+                    "instructions": item.instructions,
+                },
+                use_cache=use_cache,
+            )
+        if operation == "alternatives":
+            return await service.generate_alternatives({"clause_text": item.clause_text})
+        return await service.analyze_risk({"text": item.clause_text}, use_cache=use_cache)
+
+    async def run(
+        self, operation: str, items: List[ClauseBatchItem], use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """Return ``results`` (one per item, in order) and call ``stats``"""
+        spec = OPERATIONS[operation]
+        keys: List[Tuple] = []
+        unique: Dict[Tuple, ClauseBatchItem] = {}
+        for item in items:
+            key = (clause_fingerprint(item.clause_text), *(getattr(item, name) for name in spec["params"]))
+            keys.append(key)
+            unique.setdefault(key, item)
+
+        packs, singles = self._pack(list(unique), unique)
+        outcomes: Dict[Tuple, Dict[str, Any]] = {}
+        stats = {
+            "items": len(items),
+            "unique": len(unique),
+            "packed_calls": len(packs),
+            "packed_items": sum(len(pack) for pack in packs),
+            "single_calls": len(singles),
+            "errors": 0,
+        }
+
+        def record(key: Tuple, call: Callable[[], Any]):
+            async def run_call():
+                try:
+                    outcomes[key] = {"ok": True, "result": await call()}
+                except Exception as e:
+                    outcomes[key] = {"ok": False, "error": str(e) or type(e).__name__}
+            return run_call
+
+        async def run_pack(pack: List[Tuple]):
+            try:
+                answers = await self._run_packed(operation, [unique[key] for key in pack], use_cache)
+            except Exception as e:
+                logger.warning("Packed %s call failed, answering clauses one by one: %s", operation, e)
+                answers = [None] * len(pack)
+            # Clauses the packed reply missed fall back to their own call
+            missed = [key for key, answer in zip(pack, answers) if answer is None]
+            for key, answer in zip(pack, answers):
+                if answer is not None:
+                    outcomes[key] = {"ok": True, "result": answer}
+            stats["single_calls"] += len(missed)
+            for key in missed:
+                await record(key, lambda key=key: self._run_single(operation, unique[key], use_cache))()
+
+        tasks = [lambda pack=pack: run_pack(pack) for pack in packs] + [
+            record(key, lambda key=key: self._run_single(operation, unique[key], use_cache))
+            for key in singles
+        ]
+        await map_concurrently(tasks, lambda index, task: task(), self.concurrency)
+
+        results = []
+        for index, key in enumerate(keys):
+            outcome = outcomes[key]
+            if not outcome["ok"]:
+                stats["errors"] += 1
+            results.append({"index": index, **outcome})
+        return {"results": results, "stats": stats}
+
+
+# Global batch processor instance
+clause_batches = ClauseBatchProcessor()
@@ -0,0 +1,34 @@
+import hashlib
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+# Leading clause labels such as "1.", "4.2", "12.3.4)" or "(a)"; renumbering
+# a clause must not make it look changed
+CLAUSE_LABEL_PATTERN = re.compile(r"^\s*(?:\d+(?:\.\d+)*[.)]?|\([a-z0-9]{1,3}\))\s+", re.IGNORECASE)
+
+
+def clause_fingerprint(text: str) -> str:
+    """Content hash of a clause, stable across renumbering and re-wrapping.
+
+    The leading clause label is dropped and whitespace collapsed before
+    hashing; wording, case and punctuation all still count.
+    """
+    normalized = " ".join(CLAUSE_LABEL_PATTERN.sub("", text, count=1).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def diff_clauses(
+    texts: List[str], previous: Iterable[Optional[str]]
+) -> Dict[str, Any]:
+    """Compare a new clause segmentation with the fingerprints of the old one.
+
+    Returns the new ``hashes`` in order, the indexes of ``unchanged`` and
+    ``changed`` clauses (new or edited; the two are indistinguishable by
+    hash), and the ``removed`` fingerprints no longer present.
+    """
+    known = {fingerprint for fingerprint in previous if fingerprint}
+    hashes = [clause_fingerprint(text) for text in texts]
+    unchanged = [index for index, fingerprint in enumerate(hashes) if fingerprint in known]
+    changed = [index for index, fingerprint in enumerate(hashes) if fingerprint not in known]
+    removed = sorted(known - set(hashes))
+    return {"hashes": hashes, "unchanged": unchanged, "changed": changed, "removed": removed}
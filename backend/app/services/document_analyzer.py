@@ -1,12 +1,23 @@
 import os
+import re
+from datetime import datetime
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.cluster import KMeans
 import numpy as np
-import pandas as pd
 from typing import List, Dict, Any
 import json
 
+# Sentence ends followed by the start of a new sentence; avoids splitting "U.S. law" or "1.2"
+SUMMARY_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+(?=[A-Z(\"'])")
+# Headings, signature blocks and fill-in lines carry nothing for a summary
+SUMMARY_SKIP_PATTERN = re.compile(
+    r"^(?:[\d.()a-z]+\s+)?[A-Z0-9 ,.&'()-]+$|_{3,}|^(?:by|name|title|date|signature)\s*:",
+)
+SUMMARY_MIN_WORDS = 6
+# Longer texts are summarized from an evenly spaced sample of their sentences
+SUMMARY_MAX_SENTENCES = 2000
+
 class DocumentAnalyzer:
     """Non-agentic AI service using scikit-learn for document analysis"""
     
@@ -150,8 +161,10 @@ class DocumentAnalyzer:
     def extract_key_terms(self, text: str, n_terms: int = 10) -> List[str]:
         """Extract key terms from text using TF-IDF"""
         try:
-            tfidf_matrix = self.vectorizer.fit_transform([text])
-            feature_names = self.vectorizer.get_feature_names_out()
+            # A dedicated vectorizer, so concurrent calls in worker threads don't share fitted state
+            vectorizer = TfidfVectorizer(max_features=1000, stop_words='english', ngram_range=(1, 2))
+            tfidf_matrix = vectorizer.fit_transform([text])
+            feature_names = vectorizer.get_feature_names_out()
             tfidf_scores = tfidf_matrix.toarray()[0]
             
             # Get top terms
@@ -163,6 +176,50 @@ class DocumentAnalyzer:
         except Exception as e:
             raise Exception(f"Error extracting key terms: {str(e)}")
     
+    def summarize(self, text: str, n_sentences: int = 3) -> str:
+        """Extractive summary: the ``n_sentences`` most central sentences of ``text``.
+
+        Sentences are ranked by TF-IDF cosine similarity to the whole
+        document, with a penalty for overlapping an already chosen sentence,
+        and returned one per line in document order. Similarities are only
+        computed against the centroid and the chosen sentences, so memory
+        stays linear in the sentence count.
+        """
+        try:
+            sentences = []
+            for line in text.splitlines():
+                for sentence in SUMMARY_SENTENCE_PATTERN.split(line.strip()):
+                    sentence = sentence.strip()
+                    if len(sentence.split()) < SUMMARY_MIN_WORDS or SUMMARY_SKIP_PATTERN.search(sentence):
+                        continue
+                    sentences.append(sentence)
+            if len(sentences) <= n_sentences:
+                return "\n".join(sentences)
+            if len(sentences) > SUMMARY_MAX_SENTENCES:
+                step = len(sentences) / SUMMARY_MAX_SENTENCES
+                sentences = [sentences[int(i * step)] for i in range(SUMMARY_MAX_SENTENCES)]
+
+            # A dedicated vectorizer: the shared one is refitted by other methods
+            vectorizer = TfidfVectorizer(stop_words='english', sublinear_tf=True)
+            tfidf_matrix = vectorizer.fit_transform(sentences)
+            centroid = np.asarray(tfidf_matrix.mean(axis=0))
+            relevance = cosine_similarity(tfidf_matrix, centroid).ravel()
+
+            chosen: List[int] = []
+            overlap = np.zeros(len(sentences))
+            while len(chosen) < n_sentences:
+                scores = relevance - 0.7 * overlap
+                scores[chosen] = -np.inf
+                chosen.append(int(scores.argmax()))
+                # Rows are L2-normalized, so the dot product is the cosine similarity
+                latest = (tfidf_matrix @ tfidf_matrix[chosen[-1]].T).toarray().ravel()
+                overlap = np.maximum(overlap, latest)
+
+            return "\n".join(sentences[i] for i in sorted(chosen))
+
+        except Exception as e:
+            raise Exception(f"Error summarizing document: {str(e)}")
+
     def analyze_contract_completeness(self, clauses: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze if a contract has all necessary clause types"""
         try:
@@ -237,7 +294,7 @@ class DocumentAnalyzer:
                 },
                 'document_length': len(document_text.split()),
                 'clause_count': len(clauses),
-                'generated_at': pd.Timestamp.now().isoformat()
+                'generated_at': datetime.now().isoformat()
             }
             
         except Exception as e:
@@ -1,9 +1,295 @@
 import os
+import asyncio
+import bisect
+import logging
+import multiprocessing
+import signal
+import time
+import weakref
 import aiofiles
-from typing import Dict, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
 import PyPDF2
 import docx
 import io
+from contextlib import contextmanager
+
+from app.config import (
+    EXTRACTION_WORKERS,
+    EXTRACTION_QUEUE_SIZE,
+    EXTRACTION_TIMEOUT_SECONDS,
+    EXTRACTION_MAX_TASKS_PER_CHILD,
+    EXTRACTION_PARALLEL_PAGE_THRESHOLD,
+)
+
+logger = logging.getLogger(__name__)
+
+# Extra time the event loop waits beyond the worker's own alarm before
+# giving up on a worker stuck in native code
+EXTRACTION_TIMEOUT_GRACE_SECONDS = 5.0
+# How often the worker's alarm repeats once a parse is past its timeout
+EXTRACTION_ALARM_INTERVAL_SECONDS = 0.1
+
+
+class ExtractionTimeout(ValueError):
+    """A file took longer than the extraction timeout to parse"""
+
+
+class _PoolBroken(Exception):
+    """The pool a file was running in crashed or was discarded under it"""
+
+
+class ExtractionQueueFull(RuntimeError):
+    """The extraction pool already holds as many files as its queue allows"""
+
+    retry_after = 1.0
+
+
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeout("Text extraction timed out")
+
+
+@contextmanager
+def _worker_timeout(timeout: float):
+    """SIGALRM interrupts a parse that overruns ``timeout``.
+
+    The alarm fires between Python bytecodes, which covers the pure-Python
+    PDF and DOCX parsers and leaves the worker process reusable. Lenient
+    parsers may catch the interruption and carry on with text missing, so
+    the alarm repeats until the parse stops and anything that finished
+    past the deadline counts as timed out.
+    """
+    use_alarm = timeout > 0 and hasattr(signal, "SIGALRM")
+    deadline = time.monotonic() + timeout
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout, EXTRACTION_ALARM_INTERVAL_SECONDS)
+    try:
+        yield
+    except ExtractionTimeout:
+        raise
+    except Exception as e:
+        if use_alarm and time.monotonic() >= deadline:
+            raise ExtractionTimeout("Text extraction timed out") from e
+        raise
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    if use_alarm and time.monotonic() >= deadline:
+        raise ExtractionTimeout("Text extraction timed out")
+
+
+def _extract_in_worker(
+    file_content: bytes,
+    filename: str,
+    timeout: float,
+    with_pages: bool = False,
+    split_threshold: int = 0,
+) -> Union[int, str, Tuple[str, List[Dict[str, int]]]]:
+    """Pool entry point for a whole file.
+
+    A PDF of at least ``split_threshold`` pages is not extracted here; its
+    page count is returned instead so the caller can split it into ranges.
+    """
+    with _worker_timeout(timeout):
+        if split_threshold > 0 and filename.split(".")[-1].lower() == "pdf":
+            page_count = DocumentProcessor.pdf_page_count(file_content)
+            if page_count is not None and page_count >= split_threshold:
+                return page_count
+        if with_pages:
+            return DocumentProcessor.extract_pages_sync(file_content, filename)
+        return DocumentProcessor.extract_text_sync(file_content, filename)
+
+
+def _extract_page_range_in_worker(file_content: bytes, start: int, stop: int, timeout: float) -> List[str]:
+    """Pool entry point for pages ``start`` to ``stop`` of a split PDF"""
+    with _worker_timeout(timeout):
+        return DocumentProcessor._read_pdf_pages(file_content, start, stop)
+
+
+class ExtractionPool:
+    """Process pool that runs CPU-bound document parsing off the event loop.
+
+    At most ``queue_size`` files are pending or running at once; further
+    files are refused with ExtractionQueueFull rather than queued without
+    bound. Each parse is limited to ``timeout`` seconds. A worker is
+    replaced after ``max_tasks_per_child`` files to cap memory growth, and
+    a pool whose worker crashed or hung is discarded and rebuilt on the
+    next file, so one bad document cannot take extraction down. Files
+    that were running in a discarded pool are retried once in a worker of
+    their own, so only the file at fault fails.
+
+    PDFs of ``parallel_page_threshold`` pages or more are split into one
+    page range per worker, extracted in parallel and reassembled in page
+    order; smaller files are not worth the extra round trips. When one
+    range fails, the workers still running the others are stopped.
+    """
+
+    def __init__(
+        self,
+        workers: int = EXTRACTION_WORKERS,
+        queue_size: int = EXTRACTION_QUEUE_SIZE,
+        timeout: float = EXTRACTION_TIMEOUT_SECONDS,
+        max_tasks_per_child: int = EXTRACTION_MAX_TASKS_PER_CHILD,
+        parallel_page_threshold: int = EXTRACTION_PARALLEL_PAGE_THRESHOLD,
+    ):
+        self.workers = workers
+        self.queue_size = max(queue_size, 1)
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self.parallel_page_threshold = parallel_page_threshold
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._discarded: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+        self._in_flight = 0
+        self._counters = {
+            "completed": 0, "failed": 0, "timeouts": 0, "crashes": 0, "retried": 0, "rejected": 0, "split": 0,
+        }
+
+    def _new_executor(self, workers: int) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            # Forking a process that runs an event loop and threads is unsafe
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=self.max_tasks_per_child or None,
+        )
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = self._new_executor(self.workers)
+        return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        """Drop a broken or hung pool, killing its workers; the next file builds a new one"""
+        if self._executor is executor:
+            self._executor = None
+        self._discarded.add(executor)
+        # The executor cannot cancel a running task, so stop its processes directly
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _call(self, filename: str, fn, *args):
+        """Run ``fn`` in a worker, recycling the pool if a worker crashes or hangs.
+
+        A crash breaks every file running in the pool, and a hung file's
+        pool is killed with the others in it, so a file whose pool broke is
+        retried once in a single-use worker. Only a crash there counts.
+        """
+        try:
+            return await self._submit(self._pool(), filename, fn, *args)
+        except _PoolBroken:
+            self._counters["retried"] += 1
+            logger.warning("Extraction pool broke while parsing %s; retrying it in its own worker", filename)
+        executor = self._new_executor(1)
+        try:
+            return await self._submit(executor, filename, fn, *args)
+        except _PoolBroken:
+            self._counters["crashes"] += 1
+            raise ValueError(f"Text extraction crashed on {filename}")
+        finally:
+            # Also stops the worker if this file's caller gave up on it
+            self._discard(executor)
+
+    async def _submit(self, executor: ProcessPoolExecutor, filename: str, fn, *args):
+        """Run ``fn`` on ``executor``; _PoolBroken if that pool breaks or is discarded meanwhile"""
+        try:
+            future = executor.submit(fn, *args)
+        except RuntimeError as e:
+            # Broken or shut down since this file picked it
+            raise _PoolBroken() from e
+        wait = self.timeout + EXTRACTION_TIMEOUT_GRACE_SECONDS if self.timeout > 0 else None
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), wait)
+        except asyncio.TimeoutError:
+            self._counters["timeouts"] += 1
+            logger.warning("Extraction of %s hung past its timeout; recycling the pool", filename)
+            self._discard(executor)
+            raise ExtractionTimeout("Text extraction timed out")
+        except BrokenProcessPool as e:
+            self._discard(executor)
+            raise _PoolBroken() from e
+        except asyncio.CancelledError:
+            # Discarding a pool cancels the files still queued in it; that is
+            # not a cancellation of this caller
+            if future.cancelled() and executor in self._discarded and not asyncio.current_task().cancelling():
+                raise _PoolBroken() from None
+            raise
+        except ExtractionTimeout:
+            self._counters["timeouts"] += 1
+            raise
+        except Exception:
+            self._counters["failed"] += 1
+            raise
+
+    async def _run_page_ranges(
+        self, file_content: bytes, filename: str, page_count: int
+    ) -> Tuple[str, List[Dict[str, int]]]:
+        """Extract a large PDF as one page range per worker, reassembled in order"""
+        size = -(-page_count // self.workers)
+        executor = self._pool()
+        tasks = [
+            asyncio.ensure_future(
+                self._call(
+                    filename,
+                    _extract_page_range_in_worker,
+                    file_content,
+                    start,
+                    min(start + size, page_count),
+                    self.timeout,
+                )
+            )
+            for start in range(0, page_count, size)
+        ]
+        try:
+            ranges = await asyncio.gather(*tasks)
+        except BaseException:
+            # One failed range fails the file. Cancelling only drops ranges
+            # still queued, so recycle the pool to stop those being parsed
+            running = [task for task in tasks if not task.done()]
+            for task in running:
+                task.cancel()
+            if running:
+                self._discard(executor)
+            raise
+        self._counters["split"] += 1
+        return DocumentProcessor._join_pages(page for pages in ranges for page in pages)
+
+    async def run(
+        self, file_content: bytes, filename: str, with_pages: bool = False
+    ) -> Union[str, Tuple[str, List[Dict[str, int]]]]:
+        """Extract the text of one file in a worker process, with page offsets if asked"""
+        if self._in_flight >= self.queue_size:
+            self._counters["rejected"] += 1
+            raise ExtractionQueueFull(
+                f"Text extraction is busy ({self._in_flight} files in progress); retry shortly"
+            )
+        self._in_flight += 1
+        try:
+            split_threshold = self.parallel_page_threshold if self.workers > 1 else 0
+            result = await self._call(
+                filename, _extract_in_worker, file_content, filename, self.timeout, with_pages, split_threshold
+            )
+            if isinstance(result, int):
+                text, offsets = await self._run_page_ranges(file_content, filename, result)
+                result = (text, offsets) if with_pages else text
+            self._counters["completed"] += 1
+            return result
+        finally:
+            self._in_flight -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": self._in_flight,
+            **self._counters,
+        }
 
 
 class DocumentProcessor:
@@ -11,7 +297,39 @@ class DocumentProcessor:
 
     @staticmethod
     async def extract_text(file_content: bytes, filename: str) -> str:
-        """Extract text from document based on file type"""
+        """Extract text from document based on file type.
+
+        PDF and DOCX parsing is CPU-bound and runs in the extraction process
+        pool; plain text is decoded inline.
+        """
+        file_extension = filename.split(".")[-1].lower()
+        if file_extension == "txt" or extraction_pool.workers <= 0:
+            return DocumentProcessor.extract_text_sync(file_content, filename)
+        if file_extension not in ["pdf", "docx", "doc"]:
+            raise ValueError(f"Unsupported file type: {file_extension}")
+        return await extraction_pool.run(file_content, filename)
+
+    @staticmethod
+    async def extract_pages(file_content: bytes, filename: str) -> Tuple[str, List[Dict[str, int]]]:
+        """Extract text plus the ``page_offsets`` of each PDF page in it.
+
+        Other file types have no pages and come back with an empty list.
+        """
+        file_extension = filename.split(".")[-1].lower()
+        if file_extension != "pdf" or extraction_pool.workers <= 0:
+            return DocumentProcessor.extract_pages_sync(file_content, filename)
+        return await extraction_pool.run(file_content, filename, with_pages=True)
+
+    @staticmethod
+    def extract_pages_sync(file_content: bytes, filename: str) -> Tuple[str, List[Dict[str, int]]]:
+        """``extract_pages`` in the calling thread"""
+        if filename.split(".")[-1].lower() == "pdf":
+            return DocumentProcessor._extract_pdf_pages(file_content)
+        return DocumentProcessor.extract_text_sync(file_content, filename), []
+
+    @staticmethod
+    def extract_text_sync(file_content: bytes, filename: str) -> str:
+        """Extract text in the calling thread"""
         file_extension = filename.split(".")[-1].lower()
 
         if file_extension == "pdf":
@@ -24,20 +342,65 @@ class DocumentProcessor:
             raise ValueError(f"Unsupported file type: {file_extension}")
 
     @staticmethod
-    def _extract_from_pdf(file_content: bytes) -> str:
-        """Extract text from PDF file"""
-        try:
-            pdf_file = io.BytesIO(file_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+    def iter_pdf_pages(file_content: bytes, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        """Yield the text of each PDF page (``start`` to ``stop``) as it is parsed"""
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+        for index in range(start, len(pdf_reader.pages) if stop is None else stop):
+            yield pdf_reader.pages[index].extract_text() or ""
 
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+    @staticmethod
+    def pdf_page_count(file_content: bytes) -> Optional[int]:
+        """Number of pages in a PDF, or None if it cannot be read"""
+        try:
+            return len(PyPDF2.PdfReader(io.BytesIO(file_content)).pages)
+        except ExtractionTimeout:
+            raise
+        except Exception:
+            return None
 
-            return text.strip()
+    @staticmethod
+    def _read_pdf_pages(file_content: bytes, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        try:
+            return list(DocumentProcessor.iter_pdf_pages(file_content, start, stop))
+        except ExtractionTimeout:
+            raise
         except Exception as e:
             raise ValueError(f"Error extracting text from PDF: {str(e)}")
 
+    @staticmethod
+    def _join_pages(pages: Iterable[str]) -> Tuple[str, List[Dict[str, int]]]:
+        """Join page texts once and record where each one sits in the result.
+
+        Each offset entry is ``{"page", "start", "end"}`` (1-based page,
+        character offsets into the returned, stripped text).
+        """
+        texts: List[str] = []
+        offsets: List[Dict[str, int]] = []
+        position = 0
+        for number, page_text in enumerate(pages, start=1):
+            texts.append(page_text)
+            offsets.append({"page": number, "start": position, "end": position + len(page_text)})
+            position += len(page_text) + 1
+
+        joined = "\n".join(texts)
+        text = joined.strip()
+        # Shift offsets past the whitespace the strip removed from the front
+        lead = len(joined) - len(joined.lstrip())
+        for offset in offsets:
+            offset["start"] = min(max(offset["start"] - lead, 0), len(text))
+            offset["end"] = min(max(offset["end"] - lead, 0), len(text))
+        return text, offsets
+
+    @staticmethod
+    def _extract_pdf_pages(file_content: bytes) -> Tuple[str, List[Dict[str, int]]]:
+        """Text of a PDF with the offsets of its pages, parsed serially"""
+        return DocumentProcessor._join_pages(DocumentProcessor._read_pdf_pages(file_content))
+
+    @staticmethod
+    def _extract_from_pdf(file_content: bytes) -> str:
+        """Extract text from PDF file"""
+        return DocumentProcessor._extract_pdf_pages(file_content)[0]
+
     @staticmethod
     def _extract_from_docx(file_content: bytes) -> str:
         """Extract text from DOCX file"""
@@ -45,11 +408,9 @@ class DocumentProcessor:
             docx_file = io.BytesIO(file_content)
             doc = docx.Document(docx_file)
 
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-
-            return text.strip()
+            return "\n".join(paragraph.text for paragraph in doc.paragraphs).strip()
+        except ExtractionTimeout:
+            raise
         except Exception as e:
             raise ValueError(f"Error extracting text from DOCX: {str(e)}")
 
@@ -89,5 +450,30 @@ class DocumentProcessor:
         return info
 
 
-# Global processor instance
+def page_for_offset(page_offsets: List[Dict[str, int]], offset: int) -> Optional[int]:
+    """Page number holding character ``offset`` of extracted text, if known"""
+    if not page_offsets:
+        return None
+    index = bisect.bisect_right([page["start"] for page in page_offsets], offset) - 1
+    return page_offsets[max(index, 0)]["page"]
+
+
+def locate_pages(
+    document_text: str, texts: List[str], page_offsets: List[Dict[str, int]]
+) -> List[Optional[int]]:
+    """Page each of ``texts`` starts on, for passages taken from ``document_text`` in order"""
+    pages: List[Optional[int]] = []
+    cursor = 0
+    for text in texts:
+        found = document_text.find(text, cursor) if page_offsets else -1
+        if found < 0:
+            pages.append(None)
+            continue
+        pages.append(page_for_offset(page_offsets, found))
+        cursor = found + len(text)
+    return pages
+
+
+# Global extraction pool and processor instances
+extraction_pool = ExtractionPool()
 document_processor = DocumentProcessor()
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, List, Optional, Set
+
+from app.config import (
+    EXPLANATION_PREFETCH_CONCURRENCY,
+    EXPLANATION_PREFETCH_DAILY_LIMIT,
+    EXPLANATION_PREFETCH_MIN_RISK,
+    EXPLANATION_PREFETCH_TOP_N,
+    EXPLANATION_PREFETCH_TYPES,
+    EXPLANATION_PREFETCH_USER_DAILY_LIMIT,
+)
+from app.services.clause_fingerprints import clause_fingerprint
+from app.services.langgraph_ai_service import LangGraphAIService, ai_service
+from app.services.llm_scheduler import llm_priority
+
+logger = logging.getLogger(__name__)
+
+
+class ExplanationPrefetcher:
+    """Speculatively explain an upload's riskiest clauses before anyone asks.
+
+    Clauses are scored locally with the heuristic risk score; the top N
+    above a minimum risk are explained in the background through the normal
+    ``explain_clause`` path, so the answers land in the LLM response cache
+    and a user's first click on them is a cache hit. Calls run in the
+    "speculative" scheduler lane, which only uses spare provider capacity.
+    Each explanation counts against a per-user and a global daily budget;
+    the counters live in this process and reset at midnight.
+    """
+
+    def __init__(
+        self,
+        service: Optional[LangGraphAIService] = None,
+        top_n: int = EXPLANATION_PREFETCH_TOP_N,
+        min_risk: float = EXPLANATION_PREFETCH_MIN_RISK,
+        explanation_types: str = EXPLANATION_PREFETCH_TYPES,
+        concurrency: int = EXPLANATION_PREFETCH_CONCURRENCY,
+        user_daily_limit: int = EXPLANATION_PREFETCH_USER_DAILY_LIMIT,
+        daily_limit: int = EXPLANATION_PREFETCH_DAILY_LIMIT,
+    ):
+        self.service = service or ai_service
+        self.top_n = top_n
+        self.min_risk = min_risk
+        self.explanation_types = [t.strip() for t in explanation_types.split(",") if t.strip()]
+        self.concurrency = concurrency
+        self.user_daily_limit = user_daily_limit
+        self.daily_limit = daily_limit
+        self._day = date.today()
+        self._used: Dict[str, int] = defaultdict(int)
+        self._used_total = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._counters = {"scheduled": 0, "completed": 0, "failed": 0, "over_budget": 0}
+
+    def _select(self, document_text: str) -> List[str]:
+        """Texts of the riskiest distinct clauses, highest risk first"""
+        clauses = sorted(
+            self.service.extract_clauses(document_text),
+            key=lambda clause: clause["risk_score"],
+            reverse=True,
+        )
+        selected: Dict[str, str] = {}
+        for clause in clauses:
+            if len(selected) >= self.top_n or clause["risk_score"] < self.min_risk:
+                break
+            selected.setdefault(clause_fingerprint(clause["text"]), clause["text"])
+        return list(selected.values())
+
+    def _take_budget(self, user_key: str, wanted: int) -> int:
+        """Reserve up to ``wanted`` explanations from today's budgets"""
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self._used.clear()
+            self._used_total = 0
+        granted = max(
+            0,
+            min(
+                wanted,
+                self.user_daily_limit - self._used[user_key],
+                self.daily_limit - self._used_total,
+            ),
+        )
+        self._used[user_key] += granted
+        self._used_total += granted
+        return granted
+
+    def schedule(self, document_text: str, user_key: str = "anonymous") -> Dict[str, int]:
+        """Queue explanations for the riskiest clauses of ``document_text``.
+
+        Returns immediately with how many were ``scheduled`` and how many
+        were dropped for lack of budget (``over_budget``).
+        """
+        calls = [
+            (text, explanation_type)
+            for text in self._select(document_text)
+            for explanation_type in self.explanation_types
+        ]
+        granted = self._take_budget(user_key, len(calls))
+        dropped = len(calls) - granted
+        self._counters["scheduled"] += granted
+        self._counters["over_budget"] += dropped
+        if dropped:
+            logger.info("Explanation prefetch for %s over budget; dropped %d calls", user_key, dropped)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+        # Spawned tasks copy the context, and with it the speculative lane
+        with llm_priority("speculative"):
+            for text, explanation_type in calls[:granted]:
+                task = asyncio.create_task(self._prefetch(text, explanation_type))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        return {"scheduled": granted, "over_budget": dropped}
+
+    async def _prefetch(self, clause_text: str, explanation_type: str):
+        async with self._semaphore:
+            try:
+                await self.service.explain_clause(clause_text, explanation_type, use_cache=True)
+                self._counters["completed"] += 1
+            except Exception as e:
+                self._counters["failed"] += 1
+                logger.info("Explanation prefetch failed: %s", e)
+
+    async def stop(self):
+        """Cancel prefetches still waiting or running"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._counters,
+            "pending": len(self._tasks),
+            "used_today": self._used_total,
+            "daily_limit": self.daily_limit,
+            "user_daily_limit": self.user_daily_limit,
+        }
+
+
+# Global prefetcher instance
+explanation_prefetcher = ExplanationPrefetcher()
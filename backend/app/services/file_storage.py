@@ -228,13 +228,36 @@ class FileStorage:
 
         return success
 
-    async def update_document_analysis(self, doc_id: str, analysis: Dict[str, Any]):
-        """Update document analysis"""
+    def get_document_analysis(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Stored analysis of a document, or None if it has none yet"""
+        document = self._load_metadata().get(doc_id)
+        if not document:
+            return None
+        return document.get("analysis") or None
+
+    async def update_document_analysis(
+        self, doc_id: str, analysis: Dict[str, Any]
+    ) -> Optional[int]:
+        """Update document analysis and return its new version.
+
+        Each stored analysis bumps ``analysis_version``; ``analysis_tier``
+        records whether it is the instant "preliminary" report or the
+        "deep" LLM analysis. A preliminary report never replaces a deep
+        one. Returns None when nothing was stored.
+        """
         metadata = self._load_metadata()
-        if doc_id in metadata:
-            metadata[doc_id]["analysis"] = analysis
-            metadata[doc_id]["analyzed_at"] = datetime.now().isoformat()
-            self._save_metadata(metadata)
+        if doc_id not in metadata:
+            return None
+        document = metadata[doc_id]
+        tier = analysis.get("analysis_tier", "deep")
+        if tier == "preliminary" and document.get("analysis_tier") == "deep":
+            return None
+        document["analysis"] = analysis
+        document["analysis_tier"] = tier
+        document["analysis_version"] = document.get("analysis_version", 0) + 1
+        document["analyzed_at"] = datetime.now().isoformat()
+        self._save_metadata(metadata)
+        return document["analysis_version"]
 
     async def save_draft(self, content: str, title: Optional[str] = None) -> str:
         """Save draft document"""
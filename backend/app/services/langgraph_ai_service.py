@@ -1,52 +1,177 @@
-from typing import Dict, List, Any, Optional
-from groq import Groq
+from typing import AsyncIterator, Callable, Dict, List, Any, Optional, Tuple, Type, TypeVar
+import asyncio
+import hashlib
 import json
-from app.config import GROQ_API_KEY
-from app.schemas import DraftRequest, ExplainClauseResponse, SimulateClauseResponse
+import re
+from datetime import datetime
+from pydantic import BaseModel, ValidationError
+from app.config import (
+    CHAT_MODEL,
+    ANALYSIS_MODE,
+    ANALYSIS_CHUNK_CHARS,
+    ANALYSIS_MAP_CONCURRENCY,
+    ANALYSIS_REDUCE_CHARS,
+    DRAFT_MODE,
+    DRAFT_SECTION_CONCURRENCY,
+    DRAFT_SUMMARY_MODE,
+    DRAFT_SUMMARY_SENTENCES,
+    INCREMENTAL_ANALYSIS_MAX_CHANGE,
+    LLM_STEP_TIMEOUT_SECONDS,
+    PRELIMINARY_ANALYSIS_MAX_CHARS,
+)
+from app.services.clause_fingerprints import diff_clauses
+from app.services.document_analyzer import DocumentAnalyzer
+from app.services.map_reduce import map_concurrently, reduce_hierarchically
+from app.services.text_segmenter import chunk_text, segment_clauses
+from app.services.llm_client import LLMClient, llm_client
+from app.services.llm_resilience import CircuitOpenError, StructuredOutputError
+from app.services.query_classifier import query_classifier
+from app.services.step_routing import generation_planner
+from app.services.prompt_compression import context_compressor, count_tokens
+from app.services.workflow_graphs import (
+    AnalysisState,
+    ChatState,
+    DraftState,
+    build_analysis_graph,
+    build_chat_graph,
+    build_draft_graph,
+    workflow_checkpointer,
+)
+from app.schemas import (
+    ClauseReview,
+    ContractOutline,
+    DraftRequest,
+    ExplainClauseResponse,
+    SimulateClauseResponse,
+    FusedDocumentAnalysis,
+)
 
+WORKFLOW_SYSTEM_PROMPT = "You are an expert legal AI assistant with advanced workflow capabilities. Provide thorough, accurate, and professional responses."
 
-class LegalWorkflowState:
-    """State for the legal document workflow"""
-    def __init__(self):
-        self.messages: List[Dict[str, Any]] = []
-        self.context: Dict[str, Any] = {}
-        self.analysis_results: Dict[str, Any] = {}
-        self.current_step: str = ""
-        self.user_input: str = ""
-        self.final_output: Dict[str, Any] = {}
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+GRAPH_BUILDERS = {
+    "draft": build_draft_graph,
+    "analysis": build_analysis_graph,
+    "chat": build_chat_graph,
+}
+# Graphs whose runs are checkpointed; chat is a single LLM call with nothing to resume
+CHECKPOINTED_GRAPHS = {"draft", "analysis"}
+
+
+def workflow_thread_id(kind: str, *parts: Any) -> str:
+    """Stable checkpoint thread id for a workflow run over the same inputs"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return f"{kind}-{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]}"
 
 
 class LangGraphAIService:
-    """Enhanced AI Service with workflow-like processing using Groq"""
+    """AI service whose draft, analysis and chat workflows run as LangGraph graphs"""
     
-    def __init__(self):
-        self.client = Groq(api_key=GROQ_API_KEY)
-        self.model = "llama3-8b-8192"
+    def __init__(self, llm: Optional[LLMClient] = None):
+        self.llm = llm or llm_client
+        self.model = CHAT_MODEL
+        self.risk_analyzer = DocumentAnalyzer()
+        self.planner = generation_planner
+        self.compressor = context_compressor
+        self.checkpointer = workflow_checkpointer
+        self._graphs: Dict[str, Any] = {}
+
+    async def _graph(self, name: str):
+        """Compiled graph ``name``, rebuilt if the checkpoint database was reopened"""
+        saver = await self.checkpointer.saver() if name in CHECKPOINTED_GRAPHS else None
+        graph = self._graphs.get(name)
+        if graph is None or graph.checkpointer is not saver:
+            graph = GRAPH_BUILDERS[name](self).compile(checkpointer=saver)
+            self._graphs[name] = graph
+        return graph
+
+    def _fit_prompt(self, step: str, build: Callable[[str], str], context: str) -> str:
+        """Build a step's prompt around ``context`` compressed to the step's input budget"""
+        return self.compressor.fit(
+            step, self.planner.input_budget(step), build, context, WORKFLOW_SYSTEM_PROMPT
+        )
+
+    async def _execute_workflow_step(
+        self,
+        prompt: str,
+        step: str = "general",
+        response_format: str = "text",
+        use_cache: bool = True,
+        validate: Optional[Callable[[str], Any]] = None,
+    ) -> str:
+        """Execute a single workflow step with Groq, bounded by the step deadline.
 
-    def _execute_workflow_step(self, prompt: str, response_format: str = "text") -> str:
-        """Execute a single workflow step with Groq"""
+        The model, temperature and output budget come from the routing
+        table entry for ``step``, sized to the prompt. A reply rejected by
+        ``validate`` is not cached and raises StructuredOutputError.
+        """
+        plan = self.planner.plan(step, prompt, WORKFLOW_SYSTEM_PROMPT)
+        self.compressor.record_call(
+            step,
+            count_tokens(WORKFLOW_SYSTEM_PROMPT, prompt),
+            plan["max_tokens"],
+            self.planner.input_budget(step),
+        )
         try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert legal AI assistant with advanced workflow capabilities. Provide thorough, accurate, and professional responses.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                model=self.model,
-                temperature=0.3,
-                max_tokens=4000,
+            return await self.llm.complete(
+                prompt,
+                system_prompt=WORKFLOW_SYSTEM_PROMPT,
+                timeout=LLM_STEP_TIMEOUT_SECONDS,
+                use_cache=use_cache,
+                json_mode=response_format == "json",
+                validate=validate,
+                **plan,
             )
-            return response.choices[0].message.content
+        except (CircuitOpenError, StructuredOutputError):
+            raise
+        except ValidationError as e:
+            raise StructuredOutputError(f"{step} reply failed validation: {e}") from e
         except Exception as e:
             raise Exception(f"Workflow step failed: {str(e)}")
 
-    async def generate_draft(self, request: DraftRequest) -> Dict[str, Any]:
-        """Generate a contract draft using enhanced workflow"""
+    async def _execute_structured_step(
+        self, prompt: str, step: str, schema: Type[ModelT], use_cache: bool = True
+    ) -> ModelT:
+        """Execute a JSON-mode workflow step and parse the reply into ``schema``.
+
+        Raises StructuredOutputError when the provider refuses the JSON or
+        the reply does not match the schema; callers fall back on that.
+        """
+        raw = await self._execute_workflow_step(
+            prompt,
+            step,
+            response_format="json",
+            use_cache=use_cache,
+            validate=schema.model_validate_json,
+        )
+        return schema.model_validate_json(raw)
+
+    async def _stream_workflow_step(self, prompt: str, step: str = "general") -> AsyncIterator[str]:
+        """Execute a single workflow step, yielding text as it is generated"""
+        plan = self.planner.plan(step, prompt, WORKFLOW_SYSTEM_PROMPT)
+        self.compressor.record_call(
+            step,
+            count_tokens(WORKFLOW_SYSTEM_PROMPT, prompt),
+            plan["max_tokens"],
+            self.planner.input_budget(step),
+        )
         try:
-            # Step 1: Analyze requirements
-            analysis_prompt = f"""
+            async for delta in self.llm.stream(
+                prompt,
+                system_prompt=WORKFLOW_SYSTEM_PROMPT,
+                timeout=LLM_STEP_TIMEOUT_SECONDS,
+                **plan,
+            ):
+                yield delta
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            raise Exception(f"Workflow step failed: {str(e)}")
+
+    def _requirements_prompt(self, request: DraftRequest) -> str:
+        return f"""
             As a legal requirements analyst, analyze these contract requirements:
             
             Contract Type: {request.contract_type}
@@ -62,11 +187,9 @@ class LangGraphAIService:
             3. Risk factors to consider
             4. Legal considerations for this jurisdiction
             """
-            
-            analysis = self._execute_workflow_step(analysis_prompt)
-            
-            # Step 2: Generate structure
-            structure_prompt = f"""
+
+    def _structure_prompt(self, analysis: str) -> str:
+        return f"""
             Based on this analysis, create a detailed contract structure:
             
             {analysis}
@@ -77,11 +200,25 @@ class LangGraphAIService:
             3. Special provisions needed
             4. Order of clauses for optimal flow
             """
+
+    def _outline_prompt(self, analysis: str) -> str:
+        schema = json.dumps(ContractOutline.model_json_schema())
+        return f"""
+            Based on this analysis, plan the sections of the contract and respond with a
+            single JSON object that matches this JSON schema:
             
-            structure = self._execute_workflow_step(structure_prompt)
+            {schema}
             
-            # Step 3: Draft content
-            content_prompt = f"""
+            {analysis}
+            
+            - sections: the contract's own top-level sections, in the order they should
+              appear, each listed once; no title page, preamble or commentary
+            - title: the section heading only, without its number, e.g. "Definitions"
+            - outline: the sub-clauses and special provisions the section must cover
+            """
+
+    def _content_prompt(self, structure: str, request: DraftRequest) -> str:
+        return f"""
             Create a complete professional contract with this structure:
             
             {structure}
@@ -97,45 +234,12 @@ class LangGraphAIService:
             Include proper legal language, defined terms, and comprehensive clauses.
             Make it professional and legally sound.
             """
-            
-            content = self._execute_workflow_step(content_prompt)
-            
-            # Step 4: Generate summary
-            summary_prompt = f"Provide a 3-line executive summary of this contract:\n\n{content[:1000]}..."
-            summary = self._execute_workflow_step(summary_prompt)
-            
-            return {
-                "content": content,
-                "summary": summary,
-                "structure_analysis": structure,
-                "requirements_analysis": analysis
-            }
-            
-        except Exception as e:
-            raise Exception(f"Error generating draft: {str(e)}")
 
-    async def analyze_document(self, document_text: str, filename: str) -> Dict[str, Any]:
-        """Analyze uploaded legal document using enhanced workflow"""
-        try:
-            # Step 1: Extract clauses
-            clause_prompt = f"""
-            As a legal clause extraction expert, analyze this document and extract all clauses:
-            
-            {document_text[:4000]}
-            
-            For each clause, identify:
-            1. Clause type (confidentiality, payment, termination, etc.)
-            2. Risk level (Low/Medium/High)
-            3. Importance to the contract
-            4. Key terms and conditions
-            
-            Provide structured analysis.
-            """
-            
-            clause_analysis = self._execute_workflow_step(clause_prompt)
-            
-            # Step 2: Risk analysis
-            risk_prompt = f"""
+    def _summary_prompt(self, content: str) -> str:
+        return f"Provide a 3-line executive summary of this contract:\n\n{content}"
+
+    def _risk_prompt(self, filename: str, clause_analysis: str) -> str:
+        return f"""
             As a legal risk analyst, analyze the risks in this document:
             
             Document: {filename}
@@ -147,11 +251,9 @@ class LangGraphAIService:
             3. Compliance concerns
             4. Recommendations for risk mitigation
             """
-            
-            risk_analysis = self._execute_workflow_step(risk_prompt)
-            
-            # Step 3: Generate insights
-            insights_prompt = f"""
+
+    def _insights_prompt(self, risk_analysis: str) -> str:
+        return f"""
             As a legal insights expert, provide actionable recommendations:
             
             Risk Analysis: {risk_analysis}
@@ -162,84 +264,790 @@ class LangGraphAIService:
             3. Compliance notes
             4. Negotiation points to consider
             """
+
+    def _section_prompt(
+        self,
+        index: int,
+        section: Dict[str, str],
+        titles: List[str],
+        request: DraftRequest,
+    ) -> str:
+        contents = "\n".join(f"{i + 1}. {title}" for i, title in enumerate(titles))
+        return f"""
+            You are drafting one section of a professional {request.contract_type}.
             
-            insights = self._execute_workflow_step(insights_prompt)
+            Table of contents:
+            {contents}
             
+            Write only section {index + 1}. {section["title"]}, numbered as section {index + 1}.
+            Section outline:
+            {section["outline"] or "Use standard provisions for this section."}
+            
+            Requirements:
+            - Parties: {request.parties}
+            - Scope: {request.scope_short}
+            - Payment Terms: {request.payment_terms}
+            - Jurisdiction: {request.jurisdiction}
+            - Risk Profile: {request.risk_profile}
+            
+            Use proper legal language and refer to terms defined in other sections by name.
+            Do not repeat other sections or add a preamble.
+            """
+
+    @staticmethod
+    def _outline_sections(outline: ContractOutline) -> List[Dict[str, str]]:
+        """Outline sections in order, a repeated title merged into its first occurrence"""
+        sections: Dict[str, Dict[str, Any]] = {}
+        for section in outline.sections:
+            title = section.title.strip().strip("*#: ")
+            key = re.sub(r"[^a-z0-9]+", " ", title.lower()).strip()
+            if not key:
+                continue
+            entry = sections.setdefault(key, {"title": title, "lines": []})
+            entry["lines"].extend(line for line in section.outline if line not in entry["lines"])
+        return [
+            {"title": entry["title"], "outline": "\n".join(f"- {line}" for line in entry["lines"])}
+            for entry in sections.values()
+        ]
+
+    async def _draft_sections_parallel(self, sections: List[Dict[str, str]], request: DraftRequest) -> str:
+        """Write each outline section concurrently and assemble them in order"""
+        titles = [section["title"] for section in sections]
+
+        async def write_section(index: int, section: Dict[str, str]) -> str:
+            return await self._execute_workflow_step(
+                self._section_prompt(index, section, titles, request), "draft_section"
+            )
+
+        written = await map_concurrently(sections, write_section, DRAFT_SECTION_CONCURRENCY)
+        return "\n\n".join(part.strip() for part in written)
+
+    def _llm_summary(self, request: DraftRequest) -> bool:
+        return (request.summary_mode or DRAFT_SUMMARY_MODE) == "llm"
+
+    async def _draft_requirements_node(self, state: DraftState) -> Dict[str, Any]:
+        request = DraftRequest(**state["request"])
+        analysis = await self._execute_workflow_step(
+            self._requirements_prompt(request), "draft_requirements"
+        )
+        return {"requirements_analysis": analysis}
+
+    async def _draft_structure_node(self, state: DraftState) -> Dict[str, Any]:
+        request = DraftRequest(**state["request"])
+        if (request.draft_mode or DRAFT_MODE) == "parallel":
+            # Sections become separate paid calls, so ask for exactly the list of them
+            try:
+                outline = await self._execute_structured_step(
+                    self._fit_prompt(
+                        "draft_structure", self._outline_prompt, state["requirements_analysis"]
+                    ),
+                    "draft_structure",
+                    ContractOutline,
+                )
+                sections = self._outline_sections(outline)
+            except StructuredOutputError:
+                sections = []
+            if len(sections) >= 2:
+                structure = "\n".join(
+                    f"{index}. {section['title']}" + (f"\n{section['outline']}" if section["outline"] else "")
+                    for index, section in enumerate(sections, start=1)
+                )
+                return {"structure_analysis": structure, "sections": sections}
+
+        structure = await self._execute_workflow_step(
+            self._fit_prompt(
+                "draft_structure", self._structure_prompt, state["requirements_analysis"]
+            ),
+            "draft_structure",
+        )
+        return {"structure_analysis": structure, "sections": []}
+
+    async def _draft_content_node(self, state: DraftState) -> Dict[str, Any]:
+        request = DraftRequest(**state["request"])
+        structure = state["structure_analysis"]
+        # Parallel mode got its sections from the JSON outline; without at least
+        # two of them the draft is written in a single call
+        if len(state.get("sections") or []) >= 2:
+            content = await self._draft_sections_parallel(state["sections"], request)
+        else:
+            content = await self._execute_workflow_step(
+                self._fit_prompt(
+                    "draft_content", lambda s: self._content_prompt(s, request), structure
+                ),
+                "draft_content",
+            )
+        return {"content": content}
+
+    async def _draft_summary_node(self, state: DraftState) -> Dict[str, Any]:
+        request = DraftRequest(**state["request"])
+        if self._llm_summary(request):
+            summary = await self._execute_workflow_step(
+                self._fit_prompt("draft_summary", self._summary_prompt, state["content"]),
+                "draft_summary",
+            )
+        else:
+            summary = self.risk_analyzer.summarize(state["content"], DRAFT_SUMMARY_SENTENCES)
+        return {"summary": summary}
+
+    async def generate_draft(self, request: DraftRequest) -> Dict[str, Any]:
+        """Generate a contract draft with the draft graph.
+
+        The executive summary is extracted locally from the full draft
+        unless the request (or DRAFT_SUMMARY_MODE) asks for an LLM summary.
+        A retried request resumes after the last step that succeeded.
+        """
+        try:
+            state = await self.checkpointer.run(
+                await self._graph("draft"),
+                {"request": request.model_dump()},
+                workflow_thread_id("draft", request.model_dump()),
+            )
             return {
+                "content": state["content"],
+                "summary": state["summary"],
+                "structure_analysis": state["structure_analysis"],
+                "requirements_analysis": state["requirements_analysis"]
+            }
+            
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error generating draft: {str(e)}")
+
+    async def stream_draft(self, request: DraftRequest) -> AsyncIterator[Dict[str, Any]]:
+        """Run the draft workflow, yielding step boundaries and tokens as they arrive.
+
+        Events are dicts with an ``event`` name (step_start, token, step_end,
+        done) and a ``data`` payload; ``done`` carries the same result as
+        ``generate_draft``.
+        """
+        outputs: Dict[str, str] = {}
+
+        async def run_step(step: str, prompt: str) -> AsyncIterator[Dict[str, Any]]:
+            yield {"event": "step_start", "data": {"step": step}}
+            parts: List[str] = []
+            async for delta in self._stream_workflow_step(prompt, f"draft_{step}"):
+                parts.append(delta)
+                yield {"event": "token", "data": {"step": step, "text": delta}}
+            outputs[step] = "".join(parts)
+            yield {"event": "step_end", "data": {"step": step}}
+
+        async for event in run_step("requirements", self._requirements_prompt(request)):
+            yield event
+        async for event in run_step(
+            "structure",
+            self._fit_prompt("draft_structure", self._structure_prompt, outputs["requirements"]),
+        ):
+            yield event
+        async for event in run_step(
+            "content",
+            self._fit_prompt(
+                "draft_content", lambda s: self._content_prompt(s, request), outputs["structure"]
+            ),
+        ):
+            yield event
+        if self._llm_summary(request):
+            async for event in run_step(
+                "summary",
+                self._fit_prompt("draft_summary", self._summary_prompt, outputs["content"]),
+            ):
+                yield event
+        else:
+            outputs["summary"] = self.risk_analyzer.summarize(
+                outputs["content"], DRAFT_SUMMARY_SENTENCES
+            )
+            yield {"event": "step_start", "data": {"step": "summary"}}
+            yield {"event": "token", "data": {"step": "summary", "text": outputs["summary"]}}
+            yield {"event": "step_end", "data": {"step": "summary"}}
+
+        yield {
+            "event": "done",
+            "data": {
+                "content": outputs["content"],
+                "summary": outputs["summary"],
+                "structure_analysis": outputs["structure"],
+                "requirements_analysis": outputs["requirements"],
+            },
+        }
+
+    async def _analysis_fused_node(self, state: AnalysisState) -> Dict[str, Any]:
+        try:
+            fused = await self._analyze_fused(state["chunks"])
+        except StructuredOutputError:
+            return {"fused_failed": True}
+        return {
+            "result": self._build_fused_result(
+                fused, state["document_text"], state["filename"], state["chunks"]
+            )
+        }
+
+    async def _analysis_clauses_node(self, state: AnalysisState) -> Dict[str, Any]:
+        # Extract clauses from every clause-aligned chunk (map), then
+        # consolidate the partial analyses (reduce)
+        return {"clause_analysis": await self._extract_clauses_map_reduce(state["chunks"])}
+
+    async def _analysis_risk_node(self, state: AnalysisState) -> Dict[str, Any]:
+        # The map-reduced clause analysis covers every chunk of the document
+        risk_prompt = await asyncio.to_thread(
+            self._fit_prompt,
+            "risk_analysis",
+            lambda analysis: self._risk_prompt(state["filename"], analysis),
+            state["clause_analysis"],
+        )
+        return {"risk_analysis": await self._execute_workflow_step(risk_prompt, "risk_analysis")}
+
+    async def _analysis_heuristics_node(self, state: AnalysisState) -> Dict[str, Any]:
+        return {
+            "heuristics": await asyncio.to_thread(
+                self.preliminary_analysis, state["document_text"], state["filename"]
+            )
+        }
+
+    async def _analysis_insights_node(self, state: AnalysisState) -> Dict[str, Any]:
+        insights_prompt = await asyncio.to_thread(
+            self._fit_prompt, "insights", self._insights_prompt, state["risk_analysis"]
+        )
+        return {"insights": await self._execute_workflow_step(insights_prompt, "insights")}
+
+    async def _analysis_finalize_node(self, state: AnalysisState) -> Dict[str, Any]:
+        if state.get("result") and not state.get("fused_failed"):
+            return {"result": state["result"]}
+        document_text, filename = state["document_text"], state["filename"]
+        heuristics = state["heuristics"]
+        return {
+            "result": {
                 "document_type": self._extract_document_type(document_text),
-                "clause_analysis": clause_analysis,
-                "risk_analysis": risk_analysis,
-                "insights": insights,
+                "clause_analysis": state["clause_analysis"],
+                "risk_analysis": state["risk_analysis"],
+                "insights": state["insights"],
+                "risk_score": heuristics["risk_score"],
+                "risk_level": heuristics["risk_level"],
+                "key_clauses": heuristics["key_clauses"],
+                "key_terms": heuristics["key_terms"],
                 "filename": filename,
                 "word_count": len(document_text.split()),
-                "analyzed_at": "2025-01-21",
+                "chunks_analyzed": len(state["chunks"]),
+                "analysis_mode": "staged",
+                "analysis_tier": "deep",
+                "analyzed_at": datetime.now().isoformat(),
                 "summary": f"Comprehensive analysis completed for {filename}"
             }
+        }
+
+    async def analyze_document(
+        self,
+        document_text: str,
+        filename: str,
+        mode: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        previous: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Analyze uploaded legal document with the analysis graph.
+
+        ``mode`` is "staged" (clause extraction, risk analysis and local
+        heuristics in parallel, then insights) or "fused" (one JSON response
+        per chunk); it defaults to ANALYSIS_MODE. A fused response that fails
+        schema validation falls back to the staged branches. Node outputs
+        are checkpointed under ``thread_id`` (by default derived from the
+        inputs), so a retry resumes where the failed run stopped.
+        When ``previous`` is the analysis of an earlier revision, only new or
+        edited clauses are sent to the LLM (see ``_analyze_revision``).
+        While the provider's circuit breaker is open a keyword-based
+        heuristic analysis is returned instead, marked ``degraded``.
+        """
+        chunks = chunk_text(document_text, ANALYSIS_CHUNK_CHARS)
+        mode = mode or ANALYSIS_MODE
+        try:
+            if previous:
+                revision = await self._analyze_revision(document_text, filename, previous)
+                if revision is not None:
+                    return revision
+
+            state = await self.checkpointer.run(
+                await self._graph("analysis"),
+                {
+                    "document_text": document_text,
+                    "filename": filename,
+                    "mode": mode,
+                    "chunks": chunks,
+                },
+                thread_id or workflow_thread_id("analysis", filename, mode, document_text),
+            )
+            # Fingerprints let the next revision reuse this analysis clause by clause
+            clauses = await self.review_clauses(segment_clauses(document_text), review=False)
+            return {**state["result"], "clauses": clauses}
             
+        except CircuitOpenError:
+            return await asyncio.to_thread(self._heuristic_analysis, document_text, filename, chunks)
         except Exception as e:
             raise Exception(f"Error analyzing document: {str(e)}")
 
-    async def chat_response(self, user_message: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Generate enhanced chatbot response"""
+    def preliminary_analysis(self, document_text: str, filename: str) -> Dict[str, Any]:
+        """Instant keyword and TF-IDF report, computed locally in milliseconds.
+
+        Served as the first answer for uploads while the LLM analysis runs,
+        and on its own while the provider is unavailable. CPU-bound: async
+        callers run it in a thread. Key terms and the summary are taken from
+        the first PRELIMINARY_ANALYSIS_MAX_CHARS characters.
+        """
+        metrics = self.risk_analyzer.calculate_risk_metrics(document_text)
+        clauses = self.extract_clauses(document_text)
+        clause_analysis = "\n".join(
+            f"- {c['type']} (risk {c['risk_score']:.2f}): {c['text'][:160]}" for c in clauses
+        )
+        found_terms = metrics["found_terms"]
+        risk_analysis = f"Overall risk score: {metrics['risk_score']:.2f} ({metrics['risk_level']})\n" + "\n".join(
+            [f"- High-risk term: {term}" for term in found_terms["high_risk"]]
+            + [f"- Protective term: {term}" for term in found_terms["protective"]]
+        )
         try:
-            # Step 1: Understand query
-            understanding_prompt = f"""
-            As a legal query analyzer, categorize this user query:
+            sample = document_text[:PRELIMINARY_ANALYSIS_MAX_CHARS]
+            report = self.risk_analyzer.generate_insights_report(
+                sample, [{"clause_type": c["type"], "text": c["text"]} for c in clauses]
+            )
+            report["document_length"] = len(document_text.split())
+            summary = self.risk_analyzer.summarize(sample)
+        except Exception:
+            # Too little text for TF-IDF; the keyword fields above still stand
+            report, summary = None, ""
+
+        return {
+            "document_type": self._extract_document_type(document_text),
+            "clause_analysis": clause_analysis,
+            "risk_analysis": risk_analysis,
+            "insights": "Automated keyword review; the full AI analysis will replace it when ready.",
+            "risk_score": metrics["risk_score"],
+            "risk_level": metrics["risk_level"],
+            "key_clauses": list(dict.fromkeys(c["type"] for c in clauses)),
+            "key_terms": report["key_terms"] if report else [],
+            "insights_report": report,
+            "filename": filename,
+            "word_count": len(document_text.split()),
+            "analysis_mode": "heuristic",
+            "analysis_tier": "preliminary",
+            "analyzed_at": datetime.now().isoformat(),
+            "summary": summary or f"Preliminary keyword analysis for {filename}"
+        }
+
+    def _heuristic_analysis(
+        self, document_text: str, filename: str, chunks: List[str]
+    ) -> Dict[str, Any]:
+        """Keyword-based analysis used while the LLM provider is unavailable"""
+        return {
+            **self.preliminary_analysis(document_text, filename),
+            "insights": "AI analysis is temporarily unavailable; this is an automated keyword review. Re-run the analysis for full insights.",
+            "chunks_analyzed": len(chunks),
+            "degraded": True,
+        }
+
+    async def review_clause(self, clause_text: str) -> Optional[Dict[str, Any]]:
+        """Review one clause in a single JSON round trip; None if the reply fails validation"""
+        schema = json.dumps(ClauseReview.model_json_schema())
+
+        def build(text: str) -> str:
+            return f"""
+            As a legal analyst, review this contract clause and respond with a single
+            JSON object that matches this JSON schema:
             
-            Query: {user_message}
+            {schema}
             
-            Determine:
-            1. Query type (explanation, drafting, analysis, general)
-            2. User intent and what they need
-            3. Complexity level
-            4. Context needed for best response
+            - clause_type: the kind of clause, e.g. payment, termination, indemnification
+            - risk_level: Low, Medium or High; risk_score: 0 (no risk) to 1 (severe risk)
+            - summary: one sentence on what the clause does
+            - issues: problems or negotiation points, if any
+            
+            Clause:
+            {text}
             """
+
+        try:
+            review = await self._execute_structured_step(
+                self._fit_prompt("clause_review", build, clause_text),
+                "clause_review",
+                ClauseReview,
+            )
+        except StructuredOutputError:
+            return None
+        return review.model_dump()
+
+    async def review_clauses(
+        self,
+        texts: List[str],
+        previous: Optional[Dict[str, Optional[Dict[str, Any]]]] = None,
+        review: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Fingerprint clauses and review the ones not seen in an earlier revision.
+
+        ``previous`` maps the fingerprints of the earlier revision's clauses
+        to their stored review (None for clauses that were only scored
+        locally). Clauses found there keep that review; with ``review`` the
+        rest get one LLM review each, identical clauses sharing a call.
+        Without it clauses are only fingerprinted and scored locally.
+        """
+        previous = previous or {}
+        diff = diff_clauses(texts, previous.keys())
+        reviews: Dict[str, Optional[Dict[str, Any]]] = dict(previous)
+        pending = {diff["hashes"][index]: texts[index] for index in diff["changed"]}
+        if review and pending:
+            fingerprints = list(pending)
+            results = await map_concurrently(
+                fingerprints,
+                lambda index, fingerprint: self.review_clause(pending[fingerprint]),
+                ANALYSIS_MAP_CONCURRENCY,
+            )
+            reviews.update(zip(fingerprints, results))
+
+        entries = []
+        for text, fingerprint in zip(texts, diff["hashes"]):
+            review = reviews.get(fingerprint)
+            entries.append({
+                "hash": fingerprint,
+                "type": review["clause_type"] if review else self._identify_clause_type(text),
+                "risk_score": review["risk_score"] if review else self._calculate_risk_score(text),
+                "review": review,
+                "reused": fingerprint in previous,
+            })
+        return entries
+
+    async def _analyze_revision(
+        self, document_text: str, filename: str, previous: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Update ``previous`` for a revised text, reviewing only changed clauses.
+
+        Unchanged clauses, found by fingerprint, keep their stored review and
+        the document-level narrative of the last full analysis is carried
+        over; new or edited clauses get one LLM review each, listed after it
+        with the clauses edited away or removed since. The carried insights are marked as
+        such, and the fused recommendations and structured analysis, which
+        describe the old clause set, are dropped. Local scores are
+        recomputed. Returns None, meaning a full analysis
+        is needed, when ``previous`` has no fingerprints or is not a deep
+        analysis, or once more than INCREMENTAL_ANALYSIS_MAX_CHANGE of the
+        clauses have been revised since the last full analysis.
+        """
+        stored = previous.get("clauses")
+        if not stored or previous.get("analysis_tier") != "deep" or previous.get("degraded"):
+            return None
+        segments = segment_clauses(document_text)
+        if not segments:
+            return None
+
+        stored_reviews = {clause["hash"]: clause.get("review") for clause in stored}
+        diff = diff_clauses(segments, stored_reviews.keys())
+        carried = sum(1 for index in diff["unchanged"] if stored_reviews[diff["hashes"][index]])
+        if len(diff["changed"]) + carried > INCREMENTAL_ANALYSIS_MAX_CHANGE * len(segments):
+            return None
+
+        clauses = await self.review_clauses(segments, stored_reviews)
+        heuristics = await asyncio.to_thread(self.preliminary_analysis, document_text, filename)
+        base = previous.get("base_analysis") or {
+            "clause_analysis": previous.get("clause_analysis", ""),
+            "risk_analysis": previous.get("risk_analysis", ""),
+            "insights": previous.get("insights", ""),
+            "clauses": [{"hash": clause["hash"], "type": clause["type"]} for clause in stored],
+        }
+        revised = [clause["review"] for clause in clauses if clause["review"]]
+        # Against the full analysis, so a clause gone in an earlier revision stays listed.
+        # An edited clause's old text counts as gone: fingerprints cannot pair the two
+        current = set(diff["hashes"])
+        removed = [
+            clause for clause in base.get("clauses", stored) if clause["hash"] not in current
+        ]
+        clause_analysis, risk_analysis = base["clause_analysis"], base["risk_analysis"]
+        if revised:
+            clause_analysis += "\n\nRevised clauses:\n" + "\n".join(
+                f"- {r['clause_type']} ({r['risk_level']} risk): {r['summary']}" for r in revised
+            )
+            issues = list(dict.fromkeys(issue for r in revised for issue in r["issues"]))
+            if issues:
+                risk_analysis += "\n\nIssues in revised clauses:\n" + "\n".join(f"- {i}" for i in issues)
+        if removed:
+            clause_analysis += "\n\nReplaced or removed clauses:\n" + "\n".join(
+                f"- {c['type']}" for c in removed
+            )
+        insights = base.get("insights", previous.get("insights", ""))
+        if revised or removed:
+            insights = (
+                f"From the last full analysis; since then {len(revised)} clause(s) were revised and "
+                f"{len(removed)} replaced or removed. Re-run a full analysis to refresh these insights.\n\n"
+                + insights
+            )
+
+        result = {
+            **previous,
+            "clause_analysis": clause_analysis,
+            "risk_analysis": risk_analysis,
+            "insights": insights,
+            "base_analysis": base,
+            "risk_score": heuristics["risk_score"],
+            "risk_level": heuristics["risk_level"],
+            "key_clauses": list(dict.fromkeys(clause["type"] for clause in clauses)),
+            "key_terms": heuristics["key_terms"],
+            "clauses": clauses,
+            "revision": {
+                "clauses": len(segments),
+                "reused": len(diff["unchanged"]),
+                "reviewed": len(diff["changed"]),
+                "removed": len(diff["removed"]),
+                "removed_clauses": [clause["type"] for clause in removed],
+            },
+            "filename": filename,
+            "word_count": len(document_text.split()),
+            "analysis_mode": "incremental",
+            "analysis_tier": "deep",
+            "analyzed_at": datetime.now().isoformat(),
+            "summary": f"Incremental analysis of {filename}: {len(diff['changed'])} clauses reviewed",
+        }
+        # Fused findings over the old clause set; the per-clause reviews replace them
+        result.pop("recommendations", None)
+        result.pop("structured_analysis", None)
+        return result
+
+    async def _analyze_fused(self, chunks: List[str]) -> FusedDocumentAnalysis:
+        """Extract clauses, risks and insights in one JSON round trip per chunk"""
+        schema = json.dumps(FusedDocumentAnalysis.model_json_schema())
+        total = len(chunks)
+
+        async def analyze(index: int, chunk: str) -> FusedDocumentAnalysis:
+            part_label = f" (part {index + 1} of {total})" if total > 1 else ""
+            fused_prompt = f"""
+            As a legal analyst, review this document{part_label} and respond with a single
+            JSON object that matches this JSON schema:
             
-            query_analysis = self._execute_workflow_step(understanding_prompt)
+            {schema}
             
-            # Step 2: Generate specialized response
-            if "explanation" in query_analysis.lower():
-                system_context = "You are a legal explanation specialist. Provide clear, comprehensive explanations of legal concepts."
-            elif "drafting" in query_analysis.lower():
-                system_context = "You are a legal drafting assistant. Help with creating legal documents and clauses."
-            elif "analysis" in query_analysis.lower():
-                system_context = "You are a legal analysis expert. Analyze documents and provide actionable insights."
-            else:
-                system_context = "You are a comprehensive legal assistant. Provide helpful, accurate legal guidance."
+            - clauses: every clause with its type, risk level (Low/Medium/High), a one-sentence summary and key terms
+            - risk_score: overall risk from 0 (no risk) to 1 (severe risk)
+            - risks: high-risk findings and compliance concerns
+            - insights: improvement suggestions and negotiation points
             
-            response_prompt = f"""
-            {system_context}
+            Document:
+            {chunk}
+            """
+            return await self._execute_structured_step(
+                fused_prompt, "fused_analysis", FusedDocumentAnalysis
+            )
+
+        partials = await map_concurrently(chunks, analyze, ANALYSIS_MAP_CONCURRENCY)
+        return self._merge_fused_analyses(partials, [len(chunk) for chunk in chunks])
+
+    def _merge_fused_analyses(
+        self, partials: List[FusedDocumentAnalysis], weights: List[int]
+    ) -> FusedDocumentAnalysis:
+        """Combine per-chunk fused analyses; risk is averaged by chunk length"""
+        if len(partials) == 1:
+            return partials[0]
+        total_weight = sum(weights) or 1
+        return FusedDocumentAnalysis(
+            clauses=[clause for partial in partials for clause in partial.clauses],
+            risk_score=sum(p.risk_score * w for p, w in zip(partials, weights)) / total_weight,
+            risks=list(dict.fromkeys(r for partial in partials for r in partial.risks)),
+            insights=list(dict.fromkeys(i for partial in partials for i in partial.insights)),
+        )
+
+    def _build_fused_result(
+        self,
+        fused: FusedDocumentAnalysis,
+        document_text: str,
+        filename: str,
+        chunks: List[str],
+    ) -> Dict[str, Any]:
+        """Shape a fused analysis like the staged result, plus structured fields"""
+        clause_analysis = "\n".join(
+            f"- {c.clause_type} ({c.risk_level} risk): {c.summary}" for c in fused.clauses
+        )
+        risk_analysis = f"Overall risk score: {fused.risk_score:.2f}\n" + "\n".join(
+            f"- {risk}" for risk in fused.risks
+        )
+        if fused.risk_score >= 0.7:
+            risk_level = "High"
+        elif fused.risk_score >= 0.4:
+            risk_level = "Medium"
+        else:
+            risk_level = "Low"
+
+        return {
+            "document_type": self._extract_document_type(document_text),
+            "clause_analysis": clause_analysis,
+            "risk_analysis": risk_analysis,
+            "insights": "\n".join(f"- {insight}" for insight in fused.insights),
+            "risk_score": fused.risk_score,
+            "risk_level": risk_level,
+            "key_clauses": list(dict.fromkeys(c.clause_type for c in fused.clauses)),
+            "recommendations": fused.insights,
+            "structured_analysis": fused.model_dump(),
+            "filename": filename,
+            "word_count": len(document_text.split()),
+            "chunks_analyzed": len(chunks),
+            "analysis_mode": "fused",
+            "analysis_tier": "deep",
+            "analyzed_at": datetime.now().isoformat(),
+            "summary": f"Comprehensive analysis completed for {filename}"
+        }
+
+    async def _extract_clauses_map_reduce(self, chunks: List[str]) -> str:
+        """Run clause extraction over every chunk concurrently and merge the results"""
+        total = len(chunks)
+
+        async def extract(index: int, chunk: str) -> str:
+            part_label = f" (part {index + 1} of {total})" if total > 1 else ""
+            clause_prompt = f"""
+            As a legal clause extraction expert, analyze this document{part_label} and extract all clauses:
             
-            User Query: {user_message}
-            Query Analysis: {query_analysis}
-            Context: {json.dumps(context) if context else 'None'}
+            {chunk}
             
-            Provide a helpful, accurate response. Always recommend consulting qualified legal counsel for specific advice.
+            For each clause, identify:
+            1. Clause type (confidentiality, payment, termination, etc.)
+            2. Risk level (Low/Medium/High)
+            3. Importance to the contract
+            4. Key terms and conditions
+            
+            Provide structured analysis.
             """
+            return await self._execute_workflow_step(clause_prompt, "clause_extraction")
+
+        async def consolidate(partials: List[str]) -> str:
+            sections = "\n\n".join(
+                f"--- Partial analysis {i + 1} ---\n{partial}"
+                for i, partial in enumerate(partials)
+            )
+            consolidate_prompt = self._fit_prompt(
+                "clause_consolidation",
+                lambda s: f"""
+            As a legal clause extraction expert, merge these partial clause analyses
+            of consecutive parts of one document into a single structured analysis.
+            Keep every distinct clause with its type, risk level, importance and key terms;
+            merge duplicates and keep high-risk findings.
             
-            response = self._execute_workflow_step(response_prompt)
+            {s}
+            """,
+                sections,
+            )
+            return await self._execute_workflow_step(consolidate_prompt, "clause_consolidation")
+
+        partials = await map_concurrently(chunks, extract, ANALYSIS_MAP_CONCURRENCY)
+        return await reduce_hierarchically(
+            partials, consolidate, ANALYSIS_REDUCE_CHARS, ANALYSIS_MAP_CONCURRENCY
+        )
+
+    def _chat_prompt(
+        self,
+        user_message: str,
+        context: Optional[Dict[str, Any]],
+        query_type: Optional[str],
+    ) -> Tuple[str, str]:
+        """Classify the query and build the specialized response prompt"""
+        # Step 1: Understand query
+        query_type = query_type or query_classifier.classify(user_message)
+        
+        # Step 2: Generate specialized response
+        if query_type == "explanation":
+            system_context = "You are a legal explanation specialist. Provide clear, comprehensive explanations of legal concepts."
+        elif query_type == "drafting":
+            system_context = "You are a legal drafting assistant. Help with creating legal documents and clauses."
+        elif query_type == "analysis":
+            system_context = "You are a legal analysis expert. Analyze documents and provide actionable insights."
+        else:
+            system_context = "You are a comprehensive legal assistant. Provide helpful, accurate legal guidance."
+        
+        def build(context_json: str) -> str:
+            return f"""
+            {system_context}
             
-            # Extract query type for frontend
-            query_type = "general"
-            if "explanation" in query_analysis.lower():
-                query_type = "explanation"
-            elif "drafting" in query_analysis.lower():
-                query_type = "drafting"
-            elif "analysis" in query_analysis.lower():
-                query_type = "analysis"
+            User Query: {user_message}
+            Query Type: {query_type}
+            Context: {context_json or 'None'}
             
-            recommendations = self._generate_followup_questions(query_type, user_message)
+            Provide a helpful, accurate response. Always recommend consulting qualified legal counsel for specific advice.
+            """
+
+        if not context:
+            return query_type, build("")
+        response_prompt = self.compressor.fit_json(
+            "chat", self.planner.input_budget("chat"), build, context, WORKFLOW_SYSTEM_PROMPT
+        )
+        return query_type, response_prompt
+
+    async def _chat_classify_node(self, state: ChatState) -> Dict[str, Any]:
+        query_type, response_prompt = self._chat_prompt(
+            state["user_message"], state.get("context"), state.get("query_type")
+        )
+        return {"query_type": query_type, "response_prompt": response_prompt}
+
+    async def _chat_respond_node(self, state: ChatState) -> Dict[str, Any]:
+        response = await self._execute_workflow_step(
+            state["response_prompt"], "chat", use_cache=state.get("use_cache", True)
+        )
+        return {"response": response}
+
+    async def _chat_followups_node(self, state: ChatState) -> Dict[str, Any]:
+        return {
+            "recommendations": self._generate_followup_questions(
+                state["query_type"], state["user_message"]
+            )
+        }
+
+    async def chat_response(
+        self,
+        user_message: str,
+        context: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True,
+        query_type: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Generate enhanced chatbot response with the chat graph.
+
+        The query type is decided locally by the query classifier unless the
+        caller already knows it, so each response costs one LLM round trip.
+        """
+        try:
+            state = await self.checkpointer.run(
+                await self._graph("chat"),
+                {
+                    "user_message": user_message,
+                    "context": context,
+                    "query_type": query_type,
+                    "use_cache": use_cache,
+                },
+                None,
+            )
             
             return {
-                "response": response,
-                "query_type": query_type,
+                "response": state["response"],
+                "query_type": state["query_type"],
                 "intent": "Legal assistance",
-                "recommendations": recommendations
+                "recommendations": state["recommendations"]
             }
             
+        except CircuitOpenError:
+            raise
         except Exception as e:
             raise Exception(f"Error generating chat response: {str(e)}")
 
+    async def stream_chat_response(
+        self,
+        user_message: str,
+        context: Optional[Dict[str, Any]] = None,
+        query_type: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a chatbot response as meta, token and done events"""
+        query_type, response_prompt = self._chat_prompt(user_message, context, query_type)
+        yield {"event": "meta", "data": {"query_type": query_type}}
+
+        parts: List[str] = []
+        async for delta in self._stream_workflow_step(response_prompt, "chat"):
+            parts.append(delta)
+            yield {"event": "token", "data": {"text": delta}}
+
+        yield {
+            "event": "done",
+            "data": {
+                "response": "".join(parts),
+                "query_type": query_type,
+                "intent": "Legal assistance",
+                "recommendations": self._generate_followup_questions(query_type, user_message),
+            },
+        }
+
     def _generate_followup_questions(self, query_type: str, user_input: str) -> List[str]:
         """Generate helpful follow-up questions"""
         base_questions = [
@@ -281,7 +1089,9 @@ class LangGraphAIService:
         return "General Legal Document"
 
     # Public API methods for compatibility
-    async def explain_clause(self, clause_text: str, explanation_type: str) -> ExplainClauseResponse:
+    async def explain_clause(
+        self, clause_text: str, explanation_type: str, use_cache: bool = True
+    ) -> ExplainClauseResponse:
         """Explain a clause using enhanced workflow"""
         try:
             if explanation_type == "eli5":
@@ -291,7 +1101,9 @@ class LangGraphAIService:
             else:
                 user_input = f"Explain this legal clause using precise legal terminology: {clause_text}"
             
-            result = await self.chat_response(user_input)
+            result = await self.chat_response(
+                user_input, use_cache=use_cache, query_type="explanation"
+            )
             
             return ExplainClauseResponse(
                 explanation=result.get('response', ''),
@@ -299,6 +1111,8 @@ class LangGraphAIService:
                 citations=[]
             )
             
+        except CircuitOpenError:
+            raise
         except Exception as e:
             raise Exception(f"Error explaining clause: {str(e)}")
 
@@ -313,7 +1127,7 @@ class LangGraphAIService:
             
             Provide impact analysis, risk assessment, and recommendations."""
             
-            result = await self.chat_response(user_input)
+            result = await self.chat_response(user_input, query_type="analysis")
             response_text = result.get('response', '')
             
             return SimulateClauseResponse(
@@ -322,6 +1136,8 @@ class LangGraphAIService:
                 recommendations=["Review with legal counsel", "Consider stakeholder impact"]
             )
             
+        except CircuitOpenError:
+            raise
         except Exception as e:
             raise Exception(f"Error simulating clause change: {str(e)}")
 
@@ -381,7 +1197,9 @@ class LangGraphAIService:
         return min(risk_score, 1.0)
 
     # Legacy method implementations for existing API compatibility
-    async def suggest_redline(self, redline_request: Dict[str, Any]) -> Dict[str, Any]:
+    async def suggest_redline(
+        self, redline_request: Dict[str, Any], use_cache: bool = True
+    ) -> Dict[str, Any]:
         """Suggest redline changes using enhanced workflow"""
         user_message = f"""Suggest redline changes for this clause:
         
@@ -389,7 +1207,9 @@ class LangGraphAIService:
         RISK PROFILE: {redline_request.get('risk_profile', 'balanced')}
         INSTRUCTIONS: {redline_request.get('instructions', '')}"""
         
-        result = await self.chat_response(user_message)
+        result = await self.chat_response(
+            user_message, use_cache=use_cache, query_type="drafting"
+        )
         
         return {
             "redline_text": result.get('response', ''),
@@ -403,20 +1223,34 @@ class LangGraphAIService:
         
         ORIGINAL CLAUSE: {alternatives_request.get('clause_text', '')}"""
         
-        result = await self.chat_response(user_message)
+        result = await self.chat_response(user_message, query_type="drafting")
         
         return {
             "alternatives": result.get('response', ''),
             "variants": ["safe", "balanced", "aggressive"],
         }
 
-    async def analyze_risk(self, risk_request: Dict[str, Any]) -> Dict[str, Any]:
+    async def analyze_risk(
+        self, risk_request: Dict[str, Any], use_cache: bool = True
+    ) -> Dict[str, Any]:
         """Analyze risk using enhanced workflow"""
         user_message = f"""Analyze the legal and business risks in this text:
         
         {risk_request.get('text', '')}"""
         
-        result = await self.chat_response(user_message)
+        try:
+            result = await self.chat_response(
+                user_message, use_cache=use_cache, query_type="analysis"
+            )
+        except CircuitOpenError:
+            metrics = self.risk_analyzer.calculate_risk_metrics(risk_request.get('text', ''))
+            return {
+                "analysis": "AI analysis is temporarily unavailable; scores come from an automated keyword review.",
+                "risk_score": metrics["risk_score"],
+                "risk_level": metrics["risk_level"],
+                "recommendations": ["Review with legal counsel", "Re-run the analysis when the AI service recovers"],
+                "degraded": True,
+            }
         
         return {
             "analysis": result.get('response', ''),
@@ -432,7 +1266,7 @@ class LangGraphAIService:
         {simulation_request.get('description', '')}
         Changes: {simulation_request.get('changes', '')}"""
         
-        result = await self.chat_response(user_message)
+        result = await self.chat_response(user_message, query_type="analysis")
         
         return {
             "impact_summary": result.get('response', ''),
@@ -445,4 +1279,13 @@ class LangGraphAIService:
                 "status": "Compliant",
                 "notes": "No compliance issues identified",
             },
-        }
\ No newline at end of file
+        }
+
+
+# Global service instance shared by all routers
+ai_service = LangGraphAIService()
+
+
+def get_ai_service() -> LangGraphAIService:
+    """FastAPI dependency returning the shared AI service"""
+    return ai_service
@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_DB_PATH,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MEMORY_ENTRIES,
+    LLM_CACHE_DISK_ENTRIES,
+)
+
+
+class LLMResponseCache:
+    """Content-addressed cache for LLM completions.
+
+    Entries live in an in-memory LRU tier backed by a SQLite tier that
+    survives restarts. Both tiers honour the same TTL and are bounded by
+    entry count; the SQLite tier evicts least recently used rows.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = LLM_CACHE_DB_PATH,
+        ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+        memory_max_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+        disk_max_entries: int = LLM_CACHE_DISK_ENTRIES,
+        enabled: bool = LLM_CACHE_ENABLED,
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_entries = disk_max_entries
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "writes": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "bypassed": 0,
+        }
+
+    @staticmethod
+    def make_key(
+        model: str,
+        system_prompt: Optional[str],
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        json_mode: bool = False,
+        provider: str = "groq",
+    ) -> str:
+        """Hash every input that influences the completion into a cache key"""
+        fields = [model, system_prompt or "", prompt, temperature, max_tokens]
+        if json_mode:
+            fields.append("json")
+        if provider != "groq":
+            # Keep responses from other backends (e.g. the fake) out of Groq's keyspace
+            fields.append(provider)
+        payload = json.dumps(fields, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)"
+            )
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _is_fresh(self, created_at: float) -> bool:
+        return time.time() - created_at < self.ttl_seconds
+
+    def _remember(self, key: str, created_at: float, value: str):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+            self._counters["memory_evictions"] += 1
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, str]]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT created_at, response FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if not self._is_fresh(row[0]):
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            conn.commit()
+            return row[0], row[1]
+
+    def _disk_set(self, key: str, created_at: float, value: str) -> int:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, created_at, created_at),
+            )
+            evicted = conn.execute(
+                """
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.disk_max_entries,),
+            ).rowcount
+            conn.commit()
+            return evicted
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return a fresh cached response, checking memory before SQLite"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            if self._is_fresh(entry[0]):
+                self._memory.move_to_end(key)
+                self._counters["hits"] += 1
+                self._counters["memory_hits"] += 1
+                return entry[1]
+            del self._memory[key]
+
+        entry = None
+        if self.db_path:
+            entry = await asyncio.to_thread(self._disk_get, key)
+        if entry is None:
+            self._counters["misses"] += 1
+            return None
+
+        self._remember(key, entry[0], entry[1])
+        self._counters["hits"] += 1
+        self._counters["disk_hits"] += 1
+        return entry[1]
+
+    async def set(self, key: str, value: str):
+        """Store a response in both tiers"""
+        created_at = time.time()
+        self._remember(key, created_at, value)
+        if self.db_path:
+            evicted = await asyncio.to_thread(self._disk_set, key, created_at, value)
+            self._counters["disk_evictions"] += evicted
+        self._counters["writes"] += 1
+
+    def record_bypass(self):
+        self._counters["bypassed"] += 1
+
+    def clear(self):
+        """Drop every cached response from both tiers"""
+        self._memory.clear()
+        if self.db_path:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM llm_cache")
+                conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._counters["hits"] + self._counters["misses"]
+        return {
+            "enabled": self.enabled,
+            **self._counters,
+            "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_max_entries": self.memory_max_entries,
+            "disk_max_entries": self.disk_max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Global cache instance shared by all LLM clients
+llm_cache = LLMResponseCache()
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List
+
+from app.config import LLM_CASSETTE_PATH, LLM_REPLAY_TIMING, LLM_REPLAY_SPEED
+from app.services.llm_providers import Completion, LLMProvider, Messages
+
+
+class CassetteMissError(Exception):
+    """Raised on replay when a request was never recorded in the cassette"""
+
+
+def interaction_key(
+    messages: Messages, model: str, temperature: float, max_tokens: int, json_mode: bool
+) -> str:
+    payload = json.dumps(
+        [messages, model, temperature, max_tokens, json_mode], ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RecordingProvider(LLMProvider):
+    """Pass calls through to another provider and append each exchange to a cassette.
+
+    A cassette is a JSON-lines file with one interaction per line: the
+    request, the exact response text, token usage and timings (total
+    latency, plus the offset of every chunk for streams). Failed calls are
+    not recorded.
+    """
+
+    def __init__(self, inner: LLMProvider, path: str = LLM_CASSETTE_PATH):
+        self.inner = inner
+        self.path = path
+        self.name = inner.name
+
+    def _append(self, entry: Dict[str, Any]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    async def complete(
+        self,
+        messages: Messages,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+        json_mode: bool = False,
+    ) -> Completion:
+        started = time.monotonic()
+        completion = await self.inner.complete(
+            messages, model, temperature, max_tokens, timeout, json_mode
+        )
+        self._append({
+            "key": interaction_key(messages, model, temperature, max_tokens, json_mode),
+            "kind": "complete",
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "json_mode": json_mode,
+            "messages": messages,
+            "response": completion.text,
+            "total_tokens": completion.total_tokens,
+            "latency_seconds": round(time.monotonic() - started, 4),
+        })
+        return completion
+
+    async def stream(
+        self,
+        messages: Messages,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+    ) -> AsyncIterator[str]:
+        started = time.monotonic()
+        chunks: List[List[Any]] = []
+        async for delta in self.inner.stream(messages, model, temperature, max_tokens, timeout):
+            chunks.append([round(time.monotonic() - started, 4), delta])
+            yield delta
+        self._append({
+            "key": interaction_key(messages, model, temperature, max_tokens, False),
+            "kind": "stream",
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "json_mode": False,
+            "messages": messages,
+            "response": "".join(delta for _, delta in chunks),
+            "chunks": chunks,
+            "latency_seconds": round(time.monotonic() - started, 4),
+        })
+
+    async def start(self, warm_connections: int):
+        await self.inner.start(warm_connections)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class ReplayProvider(LLMProvider):
+    """Serve recorded responses byte for byte without touching the network.
+
+    ``timing`` is "real" (reproduce recorded latencies), "scaled" (divide
+    them by ``speed``) or "instant". Requests recorded more than once are
+    replayed in recording order, wrapping around; an unrecorded request
+    raises CassetteMissError.
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        path: str = LLM_CASSETTE_PATH,
+        timing: str = LLM_REPLAY_TIMING,
+        speed: float = LLM_REPLAY_SPEED,
+    ):
+        if timing not in ("real", "scaled", "instant"):
+            raise ValueError(f"Unknown replay timing: {timing}")
+        self.path = path
+        self.timing = timing
+        self.speed = speed if timing == "scaled" else 1.0
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self.misses = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]].append(entry)
+
+    def _next(self, key: str) -> Dict[str, Any]:
+        entries = self._entries.get(key)
+        if not entries:
+            self.misses += 1
+            raise CassetteMissError(f"No recorded response for request {key[:12]} in {self.path}")
+        entry = entries[self._cursor[key] % len(entries)]
+        self._cursor[key] += 1
+        return entry
+
+    async def _wait(self, seconds: float):
+        if self.timing != "instant" and seconds > 0:
+            await asyncio.sleep(seconds / self.speed)
+
+    async def complete(
+        self,
+        messages: Messages,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+        json_mode: bool = False,
+    ) -> Completion:
+        entry = self._next(interaction_key(messages, model, temperature, max_tokens, json_mode))
+        await self._wait(entry.get("latency_seconds", 0.0))
+        return Completion(entry["response"], entry.get("total_tokens"))
+
+    async def stream(
+        self,
+        messages: Messages,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+    ) -> AsyncIterator[str]:
+        entry = self._next(interaction_key(messages, model, temperature, max_tokens, False))
+        chunks = entry.get("chunks") or [[entry.get("latency_seconds", 0.0), entry["response"]]]
+        previous = 0.0
+        for offset, delta in chunks:
+            await self._wait(offset - previous)
+            previous = offset
+            yield delta
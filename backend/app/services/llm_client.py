@@ -0,0 +1,298 @@
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from groq import RateLimitError
+
+from app.config import (
+    CHAT_MODEL,
+    LLM_TIMEOUT_SECONDS,
+    LLM_WARM_CONNECTIONS,
+    LLM_RATE_LIMIT_RETRIES,
+)
+from app.services.llm_cache import LLMResponseCache, llm_cache
+from app.services.llm_providers import LLMProvider, build_provider
+from app.services.llm_resilience import (
+    CircuitBreaker,
+    Hedger,
+    StructuredOutputError,
+    is_json_mode_rejection,
+    is_provider_failure,
+)
+from app.services.llm_scheduler import RateScheduler, estimate_tokens
+from app.services.llm_singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClient:
+    """Async chat-completion client in front of a pluggable LLM provider"""
+
+    def __init__(
+        self,
+        provider: Optional[LLMProvider] = None,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        cache: Optional[LLMResponseCache] = llm_cache,
+        scheduler: Optional[RateScheduler] = None,
+        rate_limit_retries: int = LLM_RATE_LIMIT_RETRIES,
+        breaker: Optional[CircuitBreaker] = None,
+        hedger: Optional[Hedger] = None,
+    ):
+        self.provider = provider or build_provider()
+        self.timeout = timeout
+        self.cache = cache
+        self.singleflight = SingleFlight()
+        self.scheduler = scheduler or RateScheduler()
+        self.rate_limit_retries = rate_limit_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.hedger = hedger or Hedger()
+
+    def _build_messages(self, prompt: str, system_prompt: Optional[str]) -> List[Dict[str, Any]]:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    async def complete(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        model: str = CHAT_MODEL,
+        temperature: float = 0.3,
+        max_tokens: int = 4000,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        json_mode: bool = False,
+        validate: Optional[Callable[[str], Any]] = None,
+    ) -> str:
+        """Run a single chat completion and return the message text.
+
+        The call is bounded by ``timeout`` seconds end to end (including the
+        SDK's own retries) and is cancelled cleanly if the awaiting task is
+        cancelled, e.g. when the HTTP client disconnects. Responses are
+        served from and stored in the response cache unless ``use_cache``
+        is False, and concurrent identical calls share one provider request.
+        With ``json_mode`` the provider is constrained to emit a JSON object;
+        a reply the provider refuses as invalid JSON raises
+        StructuredOutputError. ``validate`` is called on every reply before
+        it is cached or served from the cache, so a reply it rejects (by
+        raising) is never cached.
+
+        Provider calls are admitted by the rate scheduler in the caller's
+        priority lane (see ``llm_priority``); time spent queued there is not
+        counted against ``timeout``. While the circuit breaker is open,
+        uncached calls raise CircuitOpenError without reaching the provider,
+        and a slow call may be hedged with a duplicate request.
+        """
+        fingerprint = LLMResponseCache.make_key(
+            model, system_prompt, prompt, temperature, max_tokens, json_mode,
+            provider=self.provider.name,
+        )
+        cache_enabled = self.cache is not None and self.cache.enabled
+        if cache_enabled:
+            if use_cache:
+                cached = await self.cache.get(fingerprint)
+                if cached is not None and self._valid(cached, validate):
+                    return cached
+            else:
+                self.cache.record_bypass()
+
+        async def call_provider() -> str:
+            content = await self._create(
+                prompt, system_prompt, model, temperature, max_tokens, timeout, json_mode
+            )
+            if validate is not None:
+                validate(content)
+            if cache_enabled and use_cache and content:
+                await self.cache.set(fingerprint, content)
+            return content
+
+        return await self.singleflight.do(fingerprint, call_provider)
+
+    @staticmethod
+    def _valid(content: str, validate: Optional[Callable[[str], Any]]) -> bool:
+        if validate is None:
+            return True
+        try:
+            validate(content)
+            return True
+        except Exception:
+            return False
+
+    async def _create(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: Optional[float],
+        json_mode: bool = False,
+    ) -> str:
+        timeout = timeout or self.timeout
+        messages = self._build_messages(prompt, system_prompt)
+        # Reserve the prompt plus the full completion budget; the unused part is refunded
+        tokens = estimate_tokens(system_prompt, prompt) + max_tokens
+
+        async def attempt():
+            reserved = await self.scheduler.acquire(tokens)
+            used: Optional[int] = None
+            try:
+                completion = await asyncio.wait_for(
+                    self.provider.complete(
+                        messages, model, temperature, max_tokens, timeout, json_mode
+                    ),
+                    timeout=timeout,
+                )
+                used = completion.total_tokens
+                return completion
+            except RateLimitError:
+                used = 0
+                raise
+            finally:
+                self.scheduler.release(reserved, used)
+
+        for retry in range(self.rate_limit_retries + 1):
+            self.breaker.before_call()
+            healthy: Optional[bool] = None
+            try:
+                completion = await self.hedger.run(attempt)
+                healthy = True
+            except RateLimitError as e:
+                delay = self.scheduler.record_rate_limit(self._retry_after(e))
+                if retry == self.rate_limit_retries:
+                    raise
+                logger.warning("LLM provider rate limited; retrying in %.1fs", delay)
+                continue
+            except Exception as e:
+                healthy = False if is_provider_failure(e) else None
+                if json_mode and is_json_mode_rejection(e):
+                    raise StructuredOutputError(f"Provider rejected the JSON reply: {e}") from e
+                raise
+            finally:
+                self._record_health(healthy)
+
+            self.scheduler.record_success()
+            return completion.text
+
+    def _record_health(self, healthy: Optional[bool]):
+        if healthy is True:
+            self.breaker.record_success()
+        elif healthy is False:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_ignored()
+
+    @staticmethod
+    def _retry_after(error: RateLimitError) -> Optional[float]:
+        try:
+            return float(error.response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    async def stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        model: str = CHAT_MODEL,
+        temperature: float = 0.3,
+        max_tokens: int = 4000,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+    ) -> AsyncIterator[str]:
+        """Yield completion text deltas as the provider produces them.
+
+        A cached response is replayed as a single delta; a completed stream
+        is stored in the cache under the same key ``complete`` would use.
+        ``timeout`` bounds the time spent waiting on the provider, not the
+        time the caller takes between deltas.
+        """
+        fingerprint = LLMResponseCache.make_key(
+            model, system_prompt, prompt, temperature, max_tokens,
+            provider=self.provider.name,
+        )
+        cache_enabled = self.cache is not None and self.cache.enabled
+        if cache_enabled and use_cache:
+            cached = await self.cache.get(fingerprint)
+            if cached is not None:
+                yield cached
+                return
+
+        timeout = timeout or self.timeout
+        parts: List[str] = []
+        prompt_tokens = estimate_tokens(system_prompt, prompt)
+        self.breaker.before_call()
+        healthy: Optional[bool] = None
+        reserved = 0
+        used: Optional[int] = None
+        try:
+            reserved = await self.scheduler.acquire(prompt_tokens + max_tokens)
+            loop = asyncio.get_running_loop()
+            remaining = timeout
+            async with aclosing(
+                self.provider.stream(
+                    self._build_messages(prompt, system_prompt),
+                    model,
+                    temperature,
+                    max_tokens,
+                    timeout,
+                )
+            ) as deltas:
+                while True:
+                    # Only the wait for the next delta is timed; a deadline around
+                    # the yield would also cancel whatever the caller is doing
+                    started = loop.time()
+                    try:
+                        async with asyncio.timeout(remaining):
+                            delta = await anext(deltas)
+                    except StopAsyncIteration:
+                        break
+                    if remaining is not None:
+                        remaining -= loop.time() - started
+                    parts.append(delta)
+                    yield delta
+            healthy = True
+            self.scheduler.record_success()
+        except RateLimitError as e:
+            # Streams are not retried: tokens may already have reached the client
+            if not parts:
+                used = 0
+            self.scheduler.record_rate_limit(self._retry_after(e))
+            raise
+        except Exception as e:
+            if is_provider_failure(e):
+                healthy = False
+            raise
+        finally:
+            self._record_health(healthy)
+            if used is None:
+                used = prompt_tokens + estimate_tokens(*parts)
+            self.scheduler.release(reserved, used)
+
+        content = "".join(parts)
+        if cache_enabled and use_cache and content:
+            await self.cache.set(fingerprint, content)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider.name,
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "singleflight": self.singleflight.stats(),
+            "scheduler": self.scheduler.stats(),
+            "breaker": self.breaker.stats(),
+            "hedging": self.hedger.stats(),
+        }
+
+    async def start(self, warm_connections: int = LLM_WARM_CONNECTIONS):
+        """Prepare the provider (e.g. warm its connection pool) before serving traffic"""
+        await self.provider.start(warm_connections)
+
+    async def aclose(self):
+        """Release the provider's connections"""
+        await self.provider.aclose()
+
+
+# Global client instance shared by all AI services
+llm_client = LLMClient()
@@ -0,0 +1,333 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from groq import AsyncGroq
+
+from app.config import (
+    GROQ_API_KEY,
+    LLM_PROVIDER,
+    LLM_CASSETTE_MODE,
+    LLM_TIMEOUT_SECONDS,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_FAKE_LATENCY_MEDIAN_MS,
+    LLM_FAKE_LATENCY_SIGMA,
+    LLM_FAKE_TOKENS_PER_SECOND,
+    LLM_FAKE_RESPONSES_PATH,
+    LLM_FAKE_SEED,
+)
+
+logger = logging.getLogger(__name__)
+
+Messages = List[Dict[str, Any]]
+
+
+class Completion:
+    """Text of a finished completion and the tokens it consumed, if known"""
+
+    def __init__(self, text: str, total_tokens: Optional[int] = None):
+        self.text = text
+        self.total_tokens = total_tokens
+
+
+class LLMProvider:
+    """Interface for chat-completion backends used by LLMClient"""
+
+    name = "base"
+
+    async def complete(
+        self,
+        messages: Messages,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+        json_mode: bool = False,
+    ) -> Completion:
+        raise NotImplementedError
+
+    def stream(
+        self,
+        messages: Messages,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+    ) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+    async def start(self, warm_connections: int):
+        """Prepare the backend before the first request"""
+
+    async def aclose(self):
+        """Release connections and other resources"""
+
+
+class GroqProvider(LLMProvider):
+    """Groq chat completions over a shared HTTP connection pool"""
+
+    name = "groq"
+
+    def __init__(
+        self,
+        api_key: Optional[str] = GROQ_API_KEY,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_keepalive_connections: int = LLM_MAX_KEEPALIVE_CONNECTIONS,
+    ):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._client: Optional[AsyncGroq] = None
+
+    @property
+    def client(self) -> AsyncGroq:
+        """Lazily create the provider client so it binds to the running event loop"""
+        if self._client is None:
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+            )
+            self._client = AsyncGroq(
+                api_key=self.api_key,
+                http_client=self._http_client,
+                timeout=self.timeout,
+            )
+        return self._client
+
+    async def complete(
+        self,
+        messages: Messages,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+        json_mode: bool = False,
+    ) -> Completion:
+        extra: Dict[str, Any] = {}
+        if json_mode:
+            extra["response_format"] = {"type": "json_object"}
+        response = await self.client.chat.completions.create(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            **extra,
+        )
+        usage = response.usage.total_tokens if response.usage is not None else None
+        return Completion(response.choices[0].message.content, usage)
+
+    async def stream(
+        self,
+        messages: Messages,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+    ) -> AsyncIterator[str]:
+        response = await self.client.chat.completions.create(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            stream=True,
+        )
+        try:
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            await response.close()
+
+    async def start(self, warm_connections: int):
+        """Open the connection pool and pre-establish provider connections.
+
+        Warm-up is best effort: a failure is logged and the pool is still
+        usable, it just pays connection setup on the first real call.
+        """
+        if not self.api_key:
+            return
+        client = self.client
+        if warm_connections <= 0:
+            return
+        results = await asyncio.gather(
+            *(client.models.list() for _ in range(warm_connections)),
+            return_exceptions=True,
+        )
+        failures = [r for r in results if isinstance(r, Exception)]
+        if failures:
+            logger.warning("LLM connection warm-up failed: %s", failures[0])
+
+    async def aclose(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._http_client = None
+        self._client = None
+
+
+FAKE_SECTION_TITLES = ["Overview", "Key Terms", "Obligations", "Risks", "Recommendations"]
+FAKE_WORDS = (
+    "the parties agree that each party shall perform its obligations under this agreement "
+    "in good faith including payment confidentiality termination liability indemnification "
+    "notice governing law and any amendment must be made in writing"
+).split()
+
+
+class FakeProvider(LLMProvider):
+    """Deterministic offline backend for load tests and profiling.
+
+    The same prompt always yields the same text, token count and latency
+    (for a given ``seed``), so benchmark runs are reproducible. Latency is
+    drawn from a log-normal distribution around ``latency_median_ms``; the
+    completion is then paced at ``tokens_per_second`` (0 means instant).
+    Responses come from the first canned entry whose ``match`` substring
+    occurs in the prompt, otherwise from a numbered-section template.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency_median_ms: float = LLM_FAKE_LATENCY_MEDIAN_MS,
+        latency_sigma: float = LLM_FAKE_LATENCY_SIGMA,
+        tokens_per_second: float = LLM_FAKE_TOKENS_PER_SECOND,
+        responses_path: Optional[str] = LLM_FAKE_RESPONSES_PATH,
+        seed: int = LLM_FAKE_SEED,
+    ):
+        self.latency_median_ms = latency_median_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.seed = seed
+        self.canned: List[Dict[str, str]] = []
+        if responses_path:
+            with open(responses_path, "r", encoding="utf-8") as f:
+                self.canned = json.load(f)
+
+    def _rng(self, messages: Messages) -> random.Random:
+        digest = hashlib.sha256(
+            json.dumps([self.seed, messages], sort_keys=True).encode("utf-8")
+        ).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def _latency(self, rng: random.Random) -> float:
+        if self.latency_median_ms <= 0:
+            return 0.0
+        return rng.lognormvariate(math.log(self.latency_median_ms / 1000.0), self.latency_sigma)
+
+    def _respond(self, messages: Messages, rng: random.Random, max_tokens: int, json_mode: bool) -> str:
+        prompt = messages[-1]["content"]
+        for entry in self.canned:
+            if entry.get("match", "") in prompt:
+                return entry["response"]
+
+        if json_mode:
+            # Satisfies both the document-level and the single-clause schema
+            risk_score = round(rng.random(), 2)
+            return json.dumps({
+                "clause_type": rng.choice(FAKE_SECTION_TITLES).lower().replace(" ", "_"),
+                "risk_level": "High" if risk_score >= 0.7 else "Medium" if risk_score >= 0.4 else "Low",
+                "summary": self._sentence(rng),
+                "issues": [self._sentence(rng)],
+                "clauses": [
+                    {
+                        "clause_type": title.lower().replace(" ", "_"),
+                        "risk_level": rng.choice(["Low", "Medium", "High"]),
+                        "summary": self._sentence(rng),
+                        "key_terms": rng.sample(FAKE_WORDS, 3),
+                    }
+                    for title in FAKE_SECTION_TITLES[:3]
+                ],
+                "risk_score": risk_score,
+                "risks": [self._sentence(rng)],
+                "insights": [self._sentence(rng), self._sentence(rng)],
+            })
+
+        budget = min(max_tokens, rng.randint(120, 400))
+        sections, used = [], 0
+        for index, title in enumerate(FAKE_SECTION_TITLES, start=1):
+            if used >= budget:
+                break
+            sentences = [self._sentence(rng) for _ in range(rng.randint(2, 4))]
+            used += sum(len(s.split()) for s in sentences)
+            sections.append(f"{index}. {title}\n" + " ".join(sentences))
+        return "\n\n".join(sections)
+
+    @staticmethod
+    def _sentence(rng: random.Random) -> str:
+        words = [rng.choice(FAKE_WORDS) for _ in range(rng.randint(8, 16))]
+        return " ".join(words).capitalize() + "."
+
+    @staticmethod
+    def _count_tokens(messages: Messages, text: str) -> int:
+        prompt_chars = sum(len(m["content"]) for m in messages)
+        return (prompt_chars + len(text)) // 4 + 1
+
+    async def complete(
+        self,
+        messages: Messages,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+        json_mode: bool = False,
+    ) -> Completion:
+        rng = self._rng(messages)
+        latency = self._latency(rng)
+        text = self._respond(messages, rng, max_tokens, json_mode)
+        if self.tokens_per_second > 0:
+            latency += (len(text) // 4) / self.tokens_per_second
+        await asyncio.sleep(latency)
+        return Completion(text, self._count_tokens(messages, text))
+
+    async def stream(
+        self,
+        messages: Messages,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+    ) -> AsyncIterator[str]:
+        rng = self._rng(messages)
+        await asyncio.sleep(self._latency(rng))
+        text = self._respond(messages, rng, max_tokens, json_mode=False)
+        words = text.split(" ")
+        for index, word in enumerate(words):
+            if self.tokens_per_second > 0:
+                await asyncio.sleep(1.0 / self.tokens_per_second)
+            yield word if index == len(words) - 1 else word + " "
+
+
+def build_provider(name: str = LLM_PROVIDER, cassette_mode: str = LLM_CASSETTE_MODE) -> LLMProvider:
+    """Create the provider selected by the LLM_PROVIDER and LLM_CASSETTE_MODE settings"""
+    # Imported here because the cassette providers build on this module
+    from app.services.llm_cassette import RecordingProvider, ReplayProvider
+
+    if cassette_mode == "replay":
+        return ReplayProvider()
+    if name == "groq":
+        provider: LLMProvider = GroqProvider()
+    elif name == "fake":
+        provider = FakeProvider()
+    else:
+        raise ValueError(f"Unknown LLM provider: {name}")
+    if cassette_mode == "record":
+        return RecordingProvider(provider)
+    if cassette_mode != "off":
+        raise ValueError(f"Unknown cassette mode: {cassette_mode}")
+    return provider
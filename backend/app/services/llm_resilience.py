@@ -0,0 +1,154 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from groq import APIConnectionError, APIStatusError, APITimeoutError
+
+from app.config import (
+    LLM_BREAKER_FAILURE_THRESHOLD,
+    LLM_BREAKER_RESET_SECONDS,
+    LLM_HEDGE_AFTER_SECONDS,
+)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit breaker is open"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            f"AI provider is temporarily unavailable; retry in {retry_after:.0f}s"
+        )
+        self.retry_after = retry_after
+
+
+class StructuredOutputError(Exception):
+    """A JSON-mode reply was refused by the provider or failed schema validation"""
+
+
+def is_json_mode_rejection(error: BaseException) -> bool:
+    """Whether the provider refused to return the JSON it generated (Groq's json_validate_failed)"""
+    return (
+        isinstance(error, APIStatusError)
+        and error.status_code == 400
+        and "json_validate_failed" in f"{error} {getattr(error, 'body', '')}"
+    )
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Whether an error says the provider is unhealthy (not that the request was bad)"""
+    if isinstance(error, (asyncio.TimeoutError, APITimeoutError, APIConnectionError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+class CircuitBreaker:
+    """Fail fast after consecutive provider failures.
+
+    After ``failure_threshold`` failures in a row the breaker opens and
+    every call is rejected for ``reset_seconds``. It then lets a single
+    probe call through: success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = LLM_BREAKER_RESET_SECONDS,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._counters = {"opened": 0, "rejected": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go to the provider now"""
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        self._counters["rejected"] += 1
+        retry_after = self.reset_seconds - (time.monotonic() - self._opened_at)
+        raise CircuitOpenError(max(retry_after, 1.0))
+
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self.enabled and (self._probing or self._failures >= self.failure_threshold):
+            if self._opened_at is None:
+                self._counters["opened"] += 1
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+    def record_ignored(self):
+        """The call ended without saying anything about provider health"""
+        self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self._failures, **self._counters}
+
+
+class Hedger:
+    """Race a duplicate request against a slow one.
+
+    If the first attempt has not finished after ``hedge_after`` seconds a
+    second identical attempt starts; whichever succeeds first wins and the
+    other is cancelled. A non-positive ``hedge_after`` disables hedging.
+    """
+
+    def __init__(self, hedge_after: float = LLM_HEDGE_AFTER_SECONDS):
+        self.hedge_after = hedge_after
+        self._counters = {"launched": 0, "won": 0}
+
+    async def run(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        if self.hedge_after <= 0:
+            return await attempt()
+
+        primary = asyncio.ensure_future(attempt())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if done:
+                return primary.result()
+
+            hedge = asyncio.ensure_future(attempt())
+            tasks.add(hedge)
+            self._counters["launched"] += 1
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._counters["won"] += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hedge_after_seconds": self.hedge_after, **self._counters}
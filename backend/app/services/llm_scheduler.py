@@ -0,0 +1,230 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, Optional
+
+from app.config import (
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_BATCH_RESERVE,
+    LLM_SPECULATIVE_RESERVE,
+    LLM_RATE_LIMIT_BACKOFF_SECONDS,
+    LLM_RATE_LIMIT_BACKOFF_MAX_SECONDS,
+)
+
+# Lanes in dispatch order; a waiting interactive call always goes first
+PRIORITY_LANES = ("interactive", "batch", "speculative")
+
+current_priority: ContextVar[str] = ContextVar("llm_priority", default="interactive")
+
+
+@contextmanager
+def llm_priority(lane: str) -> Iterator[None]:
+    """Run the enclosed LLM calls (and tasks spawned inside) in ``lane``"""
+    if lane not in PRIORITY_LANES:
+        raise ValueError(f"Unknown priority lane: {lane}")
+    token = current_priority.set(lane)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+def estimate_tokens(*texts: Optional[str]) -> int:
+    """Rough token count (about four characters per token)"""
+    return sum(len(text) for text in texts if text) // 4 + 1
+
+
+class TokenBucket:
+    """Continuously refilling bucket sized to a per-minute budget; 0 disables it"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost: float, reserve: float = 0.0) -> float:
+        """Seconds until ``cost`` can be taken while leaving ``reserve`` behind"""
+        if not self.enabled:
+            return 0.0
+        needed = min(cost + reserve, self.capacity) - self.level
+        return max(needed, 0.0) / self.rate
+
+    def take(self, cost: float):
+        if self.enabled:
+            self.level -= cost
+
+    def give(self, amount: float):
+        if self.enabled:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class _Waiter:
+    def __init__(self, lane: str, cost: int):
+        self.lane = lane
+        self.cost = cost
+        self.future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+
+
+class RateScheduler:
+    """Admission control for provider calls.
+
+    Calls wait in per-priority FIFO lanes until both the requests-per-minute
+    and tokens-per-minute buckets can cover them. Batch calls must also leave
+    ``batch_reserve`` of each bucket untouched, so bulk work only consumes
+    spare capacity and interactive calls rarely queue behind it. Speculative
+    calls (prefetch) run last and only while ``speculative_reserve`` of each
+    bucket is still free. A provider
+    429 pauses all dispatch with exponential backoff (or the provider's
+    Retry-After), which resets after the next successful call.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+        batch_reserve: float = LLM_BATCH_RESERVE,
+        speculative_reserve: float = LLM_SPECULATIVE_RESERVE,
+        backoff_seconds: float = LLM_RATE_LIMIT_BACKOFF_SECONDS,
+        backoff_max_seconds: float = LLM_RATE_LIMIT_BACKOFF_MAX_SECONDS,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.batch_reserve = batch_reserve
+        self.speculative_reserve = speculative_reserve
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._lanes: Dict[str, Deque[_Waiter]] = {lane: deque() for lane in PRIORITY_LANES}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._paused_until = 0.0
+        self._consecutive_limits = 0
+        self._counters: Dict[str, Dict[str, float]] = {
+            lane: {"granted": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+            for lane in PRIORITY_LANES
+        }
+        self._rate_limited = 0
+
+    async def acquire(self, tokens: int, lane: Optional[str] = None) -> int:
+        """Wait for capacity for one call of about ``tokens`` tokens.
+
+        Returns the number of tokens reserved, which must be handed back
+        to ``release`` once the call finishes.
+        """
+        lane = lane or current_priority.get()
+        cost = int(min(tokens, self.tokens.capacity)) if self.tokens.enabled else tokens
+        waiter = _Waiter(lane, cost)
+        self._lanes[lane].append(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the caller went away; return the capacity
+                self.release(cost, 0)
+            else:
+                self._remove(waiter)
+            raise
+
+        waited = time.monotonic() - waiter.enqueued_at
+        counters = self._counters[lane]
+        counters["granted"] += 1
+        counters["wait_seconds_total"] += waited
+        counters["wait_seconds_max"] = max(counters["wait_seconds_max"], waited)
+        return cost
+
+    def release(self, reserved: int, used: Optional[int] = None):
+        """Refund the part of a reservation the call did not actually use"""
+        if used is not None and used < reserved:
+            self.tokens.give(reserved - used)
+            self._dispatch()
+
+    def record_success(self):
+        self._consecutive_limits = 0
+
+    def record_rate_limit(self, retry_after: Optional[float] = None) -> float:
+        """Pause dispatch after a provider 429 and return the pause length"""
+        self._rate_limited += 1
+        self._consecutive_limits += 1
+        delay = min(
+            self.backoff_seconds * 2 ** (self._consecutive_limits - 1),
+            self.backoff_max_seconds,
+        )
+        if retry_after:
+            delay = max(delay, retry_after)
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self._dispatch()
+        return delay
+
+    def _remove(self, waiter: _Waiter):
+        try:
+            self._lanes[waiter.lane].remove(waiter)
+        except ValueError:
+            pass
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant queued calls in priority order while the buckets allow"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        now = time.monotonic()
+        if now < self._paused_until:
+            if any(self._lanes.values()):
+                self._schedule(self._paused_until - now)
+            return
+
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        for lane in PRIORITY_LANES:
+            queue = self._lanes[lane]
+            reserve = {"batch": self.batch_reserve, "speculative": self.speculative_reserve}.get(lane, 0.0)
+            while queue:
+                waiter = queue[0]
+                if waiter.future.done():
+                    queue.popleft()
+                    continue
+                wait = max(
+                    self.requests.wait_time(1, reserve * self.requests.capacity),
+                    self.tokens.wait_time(waiter.cost, reserve * self.tokens.capacity),
+                )
+                if wait > 0:
+                    # Lower lanes never overtake a blocked higher lane
+                    self._schedule(wait)
+                    return
+                self.requests.take(1)
+                self.tokens.take(waiter.cost)
+                queue.popleft()
+                waiter.future.set_result(None)
+
+    def _schedule(self, delay: float):
+        loop = asyncio.get_running_loop()
+        self._timer = loop.call_later(delay, self._dispatch)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        return {
+            "queue_depth": {lane: len(queue) for lane, queue in self._lanes.items()},
+            "lanes": {
+                lane: {name: round(value, 3) for name, value in counters.items()}
+                for lane, counters in self._counters.items()
+            },
+            "rate_limited": self._rate_limited,
+            "paused_seconds": round(max(self._paused_until - now, 0.0), 3),
+            "requests_available": round(self.requests.level, 2) if self.requests.enabled else None,
+            "tokens_available": round(self.tokens.level, 2) if self.tokens.enabled else None,
+        }
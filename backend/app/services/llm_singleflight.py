@@ -0,0 +1,49 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Call:
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight task.
+
+    The first caller for a key starts the task; later callers await the
+    same result. The task is reference counted: a cancelled caller only
+    detaches itself, and the task is cancelled once no caller is left.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._counters = {"started": 0, "coalesced": 0, "abandoned": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self._counters["started"] += 1
+        else:
+            self._counters["coalesced"] += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # The last interested caller went away; stop paying for the call
+                call.task.cancel()
+                self._forget(key, call)
+                self._counters["abandoned"] += 1
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._counters, "in_flight": len(self._calls)}
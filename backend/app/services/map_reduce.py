@@ -0,0 +1,65 @@
+import asyncio
+from typing import Awaitable, Callable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def map_concurrently(
+    items: Sequence[T], fn: Callable[[int, T], Awaitable[R]], limit: int
+) -> List[R]:
+    """Apply an async function to every item with at most ``limit`` in flight.
+
+    Results are returned in the order of ``items``.
+    """
+    semaphore = asyncio.Semaphore(max(limit, 1))
+
+    async def run(index: int, item: T) -> R:
+        async with semaphore:
+            return await fn(index, item)
+
+    return await asyncio.gather(*(run(i, item) for i, item in enumerate(items)))
+
+
+def _group_by_size(parts: List[str], max_chars: int) -> List[List[str]]:
+    groups: List[List[str]] = []
+    current: List[str] = []
+    current_len = 0
+    for part in parts:
+        if current and current_len + len(part) > max_chars:
+            groups.append(current)
+            current, current_len = [], 0
+        current.append(part)
+        current_len += len(part)
+    if current:
+        groups.append(current)
+    return groups
+
+
+async def reduce_hierarchically(
+    parts: List[str],
+    fn: Callable[[List[str]], Awaitable[str]],
+    max_chars: int,
+    limit: int,
+) -> str:
+    """Combine partial results level by level until one remains.
+
+    Each level packs neighbouring parts into groups of at most ``max_chars``
+    and reduces the groups concurrently, so the number of sequential rounds
+    grows with the logarithm of the number of parts.
+    """
+    if not parts:
+        return ""
+
+    while len(parts) > 1:
+        groups = _group_by_size(parts, max_chars)
+        if len(groups) == len(parts):
+            # Every part is already at the budget; pair them to keep making progress
+            groups = [parts[i : i + 2] for i in range(0, len(parts), 2)]
+
+        async def reduce_group(_: int, group: List[str]) -> str:
+            return group[0] if len(group) == 1 else await fn(group)
+
+        parts = await map_concurrently(groups, reduce_group, limit)
+
+    return parts[0]
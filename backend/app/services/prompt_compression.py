@@ -0,0 +1,263 @@
+import json
+import logging
+import math
+import re
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.text_segmenter import CLAUSE_HEADING_PATTERN, SENTENCE_BOUNDARY_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# Word pieces and single punctuation marks, the units BPE tokenizers split on
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Characters per sub-word token for long words
+CHARS_PER_TOKEN = 4
+
+# Model chatter that carries nothing into the next step
+BOILERPLATE_PATTERNS = [
+    re.compile(p, re.IGNORECASE)
+    for p in (
+        r"^(?:sure|certainly|of course|absolutely)[,!.]",
+        r"^(?:here is|here's|below is|the following is)\b.*:\s*$",
+        r"^(?:i hope this helps|let me know if|feel free to|please let me know)\b",
+        r"^(?:note|disclaimer):.*(?:not legal advice|consult|qualified)",
+        r"^(?:this|the above) (?:analysis|summary|response) (?:is|was) (?:provided|intended)\b",
+    )
+]
+DECORATION_PATTERN = re.compile(r"^[\s\-=*_#~`|]+$")
+MARKDOWN_PATTERN = re.compile(r"(\*\*|__|`{1,3}|^#{1,6}\s*)", re.MULTILINE)
+# "Risk level: Medium" style lines legitimately repeat under every clause
+FIELD_LINE_PATTERN = re.compile(r"^(?:[-*\u2022]\s*)?\w[\w\s/()&'-]{0,40}:\s*\S")
+# Lines at least this long that recur anywhere in the context are dropped;
+# shorter ones only when repeated back to back
+REPEATED_LINE_MIN_CHARS = 80
+
+# Sentences carrying these are the ones later steps depend on
+SIGNAL_TERMS = (
+    "risk", "high", "liab", "indemn", "terminat", "breach", "penalt", "confidential",
+    "payment", "fee", "warrant", "govern", "jurisdiction", "must", "shall", "exclusive",
+    "unlimited", "damages", "recommend", "compliance", "notice", "renew",
+)
+NUMBER_PATTERN = re.compile(r"\d")
+
+
+def count_tokens(*texts: Optional[str]) -> int:
+    """Estimate the tokens in ``texts`` as a BPE tokenizer would count them.
+
+    Every word piece or punctuation mark is at least one token and long
+    words cost one token per four characters. Accurate to roughly ten
+    percent on English prose, which is enough to size budgets.
+    """
+    total = 0
+    for text in texts:
+        if not text:
+            continue
+        for piece in TOKEN_PATTERN.findall(text):
+            total += max(1, math.ceil(len(piece) / CHARS_PER_TOKEN))
+    return total
+
+
+def strip_boilerplate(text: str) -> str:
+    """Drop model pleasantries, disclaimers, decoration and repeated lines.
+
+    Long lines are dropped when they recur anywhere, short ones only when
+    repeated back to back; short field lines are always kept.
+    """
+    kept: List[str] = []
+    seen = set()
+    for line in MARKDOWN_PATTERN.sub("", text).splitlines():
+        stripped = line.strip()
+        if not stripped:
+            if kept and kept[-1]:
+                kept.append("")
+            continue
+        if DECORATION_PATTERN.match(stripped):
+            continue
+        if any(pattern.search(stripped) for pattern in BOILERPLATE_PATTERNS):
+            continue
+        normalized = " ".join(stripped.lower().split())
+        is_field = len(normalized) < REPEATED_LINE_MIN_CHARS and FIELD_LINE_PATTERN.match(normalized)
+        if not is_field:
+            if kept and normalized == " ".join(kept[-1].lower().split()):
+                continue
+            if len(normalized) >= REPEATED_LINE_MIN_CHARS:
+                if normalized in seen:
+                    continue
+                seen.add(normalized)
+        kept.append(stripped)
+    return "\n".join(kept).strip()
+
+
+def _score_sentence(sentence: str, position: int, total: int) -> float:
+    lowered = sentence.lower()
+    score = sum(1.0 for term in SIGNAL_TERMS if term in lowered)
+    if NUMBER_PATTERN.search(sentence):
+        score += 1.0
+    if CLAUSE_HEADING_PATTERN.match(sentence):
+        score += 2.0
+    # Earlier sentences set context for the rest; favour them slightly
+    return score + (total - position) / total
+
+
+def extractive_trim(text: str, budget: int) -> str:
+    """Keep the most informative sentences of ``text`` within ``budget`` tokens.
+
+    Sentences are scored by legal signal terms, figures and headings, picked
+    best-first while they fit, and emitted in their original order with
+    line structure preserved. The result never exceeds ``budget``.
+    """
+    if budget <= 0:
+        return ""
+    if count_tokens(text) <= budget:
+        return text
+
+    units: List[Dict[str, Any]] = []
+    for line_number, line in enumerate(text.splitlines()):
+        pending = ""
+        for sentence in SENTENCE_BOUNDARY_PATTERN.split(line.strip()):
+            # Keep clause numbers such as "1." or "(a)" with the sentence they open
+            sentence = f"{pending} {sentence}" if pending else sentence
+            if count_tokens(sentence) <= 2:
+                pending = sentence
+                continue
+            pending = ""
+            units.append({"line": line_number, "text": sentence, "tokens": count_tokens(sentence)})
+        if pending:
+            units.append({"line": line_number, "text": pending, "tokens": count_tokens(pending)})
+    total = len(units)
+    ranked = sorted(
+        range(total),
+        key=lambda i: _score_sentence(units[i]["text"], i, total),
+        reverse=True,
+    )
+
+    chosen, used = set(), 0
+    for index in ranked:
+        cost = units[index]["tokens"] + 1
+        if used + cost <= budget:
+            chosen.add(index)
+            used += cost
+
+    if not chosen:
+        # A single sentence is larger than the whole budget: cut it by words
+        words = units[ranked[0]]["text"].split()
+        kept: List[str] = []
+        for word in words:
+            if count_tokens(*kept, word) + 1 > budget:
+                break
+            kept.append(word)
+        return " ".join(kept)
+
+    lines: Dict[int, List[str]] = defaultdict(list)
+    for index in sorted(chosen):
+        lines[units[index]["line"]].append(units[index]["text"])
+    return "\n".join(" ".join(parts) for _, parts in sorted(lines.items()))
+
+
+def _shrink_json(value: Any, ratio: float) -> Any:
+    if isinstance(value, str):
+        tokens = count_tokens(value)
+        return extractive_trim(value, max(8, int(tokens * ratio))) if tokens > 16 else value
+    if isinstance(value, list):
+        keep = max(1, math.ceil(len(value) * ratio)) if value else 0
+        return [_shrink_json(item, ratio) for item in value[:keep]]
+    if isinstance(value, dict):
+        return {key: _shrink_json(item, ratio) for key, item in value.items()}
+    return value
+
+
+def compress_json(value: Any, budget: int) -> str:
+    """Serialize ``value`` compactly, shrinking long strings and lists to fit ``budget``"""
+    text = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+    for _ in range(3):
+        tokens = count_tokens(text)
+        if tokens <= budget:
+            return text
+        value = _shrink_json(value, budget / tokens * 0.9)
+        text = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+    # Still too large (deep nesting, many keys): trim the serialized text itself
+    return extractive_trim(text, budget)
+
+
+class ContextCompressor:
+    """Fit the text carried between workflow steps into each step's input budget.
+
+    A step's budget covers its whole prompt (system prompt included), so the
+    context passed in gets whatever the rest of the prompt leaves over.
+    Context first loses boilerplate, then low-signal sentences. Input and
+    context token counts are logged and totalled per step.
+    """
+
+    def __init__(self):
+        self._steps: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {
+                "calls": 0,
+                "input_tokens": 0,
+                "over_budget": 0,
+                "context_tokens_in": 0,
+                "context_tokens_out": 0,
+            }
+        )
+
+    def fit(
+        self,
+        step: str,
+        budget: int,
+        build: Callable[[str], str],
+        context: str,
+        system_prompt: Optional[str] = None,
+    ) -> str:
+        """Return ``build(compressed_context)`` with the prompt held to ``budget`` tokens"""
+        overhead = count_tokens(system_prompt, build(""))
+        if count_tokens(context) + overhead <= budget:
+            compressed = context
+        else:
+            compressed = extractive_trim(strip_boilerplate(context), budget - overhead)
+        self._record_context(step, budget, count_tokens(context), count_tokens(compressed))
+        return build(compressed)
+
+    def fit_json(
+        self,
+        step: str,
+        budget: int,
+        build: Callable[[str], str],
+        value: Any,
+        system_prompt: Optional[str] = None,
+    ) -> str:
+        """Like ``fit`` for a JSON-serializable context such as chat metadata"""
+        overhead = count_tokens(system_prompt, build(""))
+        original = count_tokens(json.dumps(value, ensure_ascii=False, default=str))
+        compressed = compress_json(value, budget - overhead)
+        self._record_context(step, budget, original, count_tokens(compressed))
+        return build(compressed)
+
+    def _record_context(self, step: str, budget: int, before: int, after: int):
+        totals = self._steps[step]
+        totals["context_tokens_in"] += before
+        totals["context_tokens_out"] += after
+        if after < before:
+            logger.info(
+                "Compressed %s context from %d to %d tokens (step budget %d)",
+                step, before, after, budget,
+            )
+
+    def record_call(self, step: str, input_tokens: int, max_tokens: int, budget: int):
+        """Log and total the input size of one LLM call made by ``step``"""
+        totals = self._steps[step]
+        totals["calls"] += 1
+        totals["input_tokens"] += input_tokens
+        logger.info("Workflow step %s: %d input tokens, max_tokens %d", step, input_tokens, max_tokens)
+        if input_tokens > budget:
+            totals["over_budget"] += 1
+            logger.warning(
+                "Workflow step %s prompt is %d tokens, over its %d token budget",
+                step, input_tokens, budget,
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {step: dict(totals) for step, totals in self._steps.items()}
+
+
+# Global compressor instance
+context_compressor = ContextCompressor()
@@ -0,0 +1,101 @@
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+except ImportError:  # scikit-learn is optional; keyword rules still work without it
+    make_pipeline = None
+
+EXAMPLES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "query_intents.json"
+)
+
+# Strong lexical cues; a query matching cues of exactly one type skips the model
+KEYWORD_RULES: Dict[str, List[str]] = {
+    "explanation": [
+        r"\bexplain\w*", r"\bwhat (does|is|are)\b", r"\bmean(s|ing)?\b",
+        r"\bdefin(e|ition)\b", r"\bunderstand\b", r"\bplain english\b", r"\bclarify\b",
+    ],
+    "drafting": [
+        r"\bdraft\w*", r"\bwrite\b", r"\brewrite\b", r"\bredline\w*", r"\breword\b",
+        r"\bcompose\b", r"\btemplate\b", r"\bvariants?\b", r"\balternative (language|clauses?)\b",
+    ],
+    "analysis": [
+        r"\brisks?\b", r"\banaly[sz]\w*", r"\bassess\w*", r"\bimpact\b", r"\bsimulat\w*",
+        r"\bcomplian\w*", r"\bnegotiat\w*", r"\breview\b", r"\bevaluate\b",
+    ],
+}
+
+
+class QueryClassifier:
+    """In-process classifier for chat query types.
+
+    Keyword rules decide unambiguous queries; the rest go to a TF-IDF +
+    logistic regression model trained on the bundled labelled examples.
+    Without scikit-learn, ambiguous queries fall back to "general".
+    """
+
+    LABELS = ("explanation", "drafting", "analysis", "general")
+
+    def __init__(self, examples_path: str = EXAMPLES_PATH, min_confidence: float = 0.4):
+        self.examples_path = examples_path
+        self.min_confidence = min_confidence
+        self._rules = {
+            label: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for label, patterns in KEYWORD_RULES.items()
+        }
+        self._model = None
+
+    def _load_examples(self) -> Dict[str, List[str]]:
+        with open(self.examples_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def train(self):
+        """Fit the fallback model on the bundled examples"""
+        if make_pipeline is None:
+            return
+        examples = self._load_examples()
+        texts = [text for label in examples for text in examples[label]]
+        labels = [label for label in examples for _ in examples[label]]
+        model = make_pipeline(
+            TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True),
+            LogisticRegression(max_iter=1000),
+        )
+        model.fit(texts, labels)
+        self._model = model
+
+    def _rule_based(self, text: str) -> Optional[str]:
+        scores = {
+            label: sum(1 for pattern in patterns if pattern.search(text))
+            for label, patterns in self._rules.items()
+        }
+        best = max(scores.values())
+        if best == 0:
+            return None
+        winners = [label for label, score in scores.items() if score == best]
+        return winners[0] if len(winners) == 1 else None
+
+    def classify(self, text: str) -> str:
+        """Return one of LABELS for a user query"""
+        label = self._rule_based(text)
+        if label:
+            return label
+
+        if self._model is None:
+            self.train()
+        if self._model is None:
+            return "general"
+
+        probabilities = self._model.predict_proba([text])[0]
+        best_index = probabilities.argmax()
+        if probabilities[best_index] < self.min_confidence:
+            return "general"
+        return str(self._model.classes_[best_index])
+
+
+# Global classifier instance
+query_classifier = QueryClassifier()
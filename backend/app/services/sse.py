@@ -0,0 +1,30 @@
+import json
+from typing import Any, AsyncIterator, Dict
+
+from fastapi.responses import StreamingResponse
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_response(events: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """Stream ``{"event": ..., "data": ...}`` dicts as a text/event-stream.
+
+    Errors raised mid-stream are reported as a final ``error`` event, since
+    the status code has already been sent by then.
+    """
+
+    async def body() -> AsyncIterator[str]:
+        try:
+            async for event in events:
+                yield format_sse(event["event"], event["data"])
+        except Exception as e:
+            yield format_sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,78 @@
+import json
+from typing import Any, Dict, Optional
+
+from app.config import CHAT_MODEL, LLM_FAST_MODEL, LLM_STEP_ROUTES
+from app.services.prompt_compression import count_tokens
+
+# Per-step generation settings. The output budget is ``output_ratio`` times
+# the input size, clamped to [min_tokens, max_tokens]; steps that produce a
+# fixed amount of text use a ratio of 0 and get ``min_tokens``.
+# ``max_input_tokens`` caps the whole prompt; context carried over from
+# earlier steps is compressed to fit it.
+STEP_ROUTES: Dict[str, Dict[str, Any]] = {
+    "draft_requirements": {"model": CHAT_MODEL, "temperature": 0.3, "min_tokens": 600, "max_tokens": 1000, "output_ratio": 0.0, "max_input_tokens": 1000},
+    "draft_structure": {"model": CHAT_MODEL, "temperature": 0.3, "min_tokens": 600, "max_tokens": 1200, "output_ratio": 1.0, "max_input_tokens": 1500},
+    "draft_content": {"model": CHAT_MODEL, "temperature": 0.3, "min_tokens": 3000, "max_tokens": 4000, "output_ratio": 3.0, "max_input_tokens": 2500},
+    "draft_section": {"model": CHAT_MODEL, "temperature": 0.3, "min_tokens": 500, "max_tokens": 1500, "output_ratio": 2.0, "max_input_tokens": 1500},
+    "draft_summary": {"model": LLM_FAST_MODEL, "temperature": 0.2, "min_tokens": 150, "max_tokens": 150, "output_ratio": 0.0, "max_input_tokens": 1500},
+    "clause_extraction": {"model": CHAT_MODEL, "temperature": 0.2, "min_tokens": 400, "max_tokens": 2000, "output_ratio": 0.8, "max_input_tokens": 3000},
+    "clause_consolidation": {"model": CHAT_MODEL, "temperature": 0.2, "min_tokens": 600, "max_tokens": 2500, "output_ratio": 0.6, "max_input_tokens": 4000},
+    "risk_analysis": {"model": CHAT_MODEL, "temperature": 0.2, "min_tokens": 800, "max_tokens": 1200, "output_ratio": 0.5, "max_input_tokens": 2500},
+    "insights": {"model": CHAT_MODEL, "temperature": 0.3, "min_tokens": 600, "max_tokens": 1000, "output_ratio": 0.5, "max_input_tokens": 1500},
+    "clause_review": {"model": CHAT_MODEL, "temperature": 0.1, "min_tokens": 200, "max_tokens": 500, "output_ratio": 0.5, "max_input_tokens": 1500},
+    "clause_batch": {"model": CHAT_MODEL, "temperature": 0.3, "min_tokens": 800, "max_tokens": 3000, "output_ratio": 2.0, "max_input_tokens": 1800},
+    "fused_analysis": {"model": CHAT_MODEL, "temperature": 0.1, "min_tokens": 800, "max_tokens": 2500, "output_ratio": 0.8, "max_input_tokens": 4000},
+    "chat": {"model": CHAT_MODEL, "temperature": 0.3, "min_tokens": 1000, "max_tokens": 1500, "output_ratio": 1.0, "max_input_tokens": 2000},
+    "general": {"model": CHAT_MODEL, "temperature": 0.3, "min_tokens": 4000, "max_tokens": 4000, "output_ratio": 0.0, "max_input_tokens": 4000},
+}
+
+# Context windows (prompt + completion) of the models we route to
+MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+    "llama3-8b-8192": 8192,
+    "llama3-70b-8192": 8192,
+    "llama-3.1-8b-instant": 131072,
+    "llama-3.1-70b-versatile": 131072,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+# Headroom for the chat template and estimation error
+CONTEXT_SAFETY_TOKENS = 256
+MIN_COMPLETION_TOKENS = 64
+
+
+class GenerationPlanner:
+    """Pick the model, temperature and output budget for each workflow step.
+
+    Routes default to STEP_ROUTES; LLM_STEP_ROUTES may override fields per
+    step as JSON, e.g. ``{"draft_summary": {"model": "llama-3.1-8b-instant"}}``.
+    """
+
+    def __init__(self, overrides: Optional[str] = LLM_STEP_ROUTES):
+        self.routes = {step: dict(route) for step, route in STEP_ROUTES.items()}
+        if overrides:
+            for step, fields in json.loads(overrides).items():
+                self.routes.setdefault(step, dict(STEP_ROUTES["general"])).update(fields)
+
+    def input_budget(self, step: str) -> int:
+        """Most prompt tokens (system prompt included) a step may send"""
+        return self.routes.get(step, self.routes["general"])["max_input_tokens"]
+
+    def plan(self, step: str, prompt: str, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        """Return ``model``, ``temperature`` and ``max_tokens`` for one call"""
+        route = self.routes.get(step, self.routes["general"])
+        input_tokens = count_tokens(system_prompt, prompt)
+
+        budget = int(route["output_ratio"] * input_tokens)
+        budget = max(route["min_tokens"], min(budget, route["max_tokens"]))
+        # Never ask for more than the context window can hold after the prompt
+        window = MODEL_CONTEXT_WINDOWS.get(route["model"], DEFAULT_CONTEXT_WINDOW)
+        budget = min(budget, window - input_tokens - CONTEXT_SAFETY_TOKENS)
+
+        return {
+            "model": route["model"],
+            "temperature": route["temperature"],
+            "max_tokens": max(budget, MIN_COMPLETION_TOKENS),
+        }
+
+
+# Global planner instance
+generation_planner = GenerationPlanner()
@@ -0,0 +1,75 @@
+import re
+from typing import List
+
+# Lines that open a new clause: "1.", "1.2", "12.3.4", "Section 5", "ARTICLE IV", "(a)"
+CLAUSE_HEADING_PATTERN = re.compile(
+    r"^\s*(?:(?:\d+[.)]|\d+(?:\.\d+)+[.)]?)\s+\S|(?:section|article|clause|schedule)\s+[\dIVXLC]+\b|\([a-z0-9]{1,3}\)\s+\S)",
+    re.IGNORECASE,
+)
+SENTENCE_BOUNDARY_PATTERN = re.compile(r"(?<=[.;:!?])\s+")
+
+
+def segment_clauses(text: str) -> List[str]:
+    """Split document text into clause-sized segments.
+
+    Segments break on blank lines and on lines that look like numbered
+    clause or section headings, so a segment never straddles two clauses.
+    """
+    segments: List[str] = []
+    current: List[str] = []
+
+    for line in text.splitlines():
+        if not line.strip() or CLAUSE_HEADING_PATTERN.match(line):
+            if current:
+                segments.append("\n".join(current).strip())
+                current = []
+            if not line.strip():
+                continue
+        current.append(line)
+
+    if current:
+        segments.append("\n".join(current).strip())
+
+    return [segment for segment in segments if segment]
+
+
+def _split_oversized(segment: str, max_chars: int) -> List[str]:
+    """Split a single segment that exceeds max_chars at sentence boundaries"""
+    pieces: List[str] = []
+    current = ""
+    for sentence in SENTENCE_BOUNDARY_PATTERN.split(segment):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(text: str, max_chars: int) -> List[str]:
+    """Pack consecutive clause segments into chunks of at most max_chars"""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_len = 0
+
+    for segment in segment_clauses(text):
+        parts = [segment] if len(segment) <= max_chars else _split_oversized(segment, max_chars)
+        for part in parts:
+            if current and current_len + len(part) + 2 > max_chars:
+                chunks.append("\n\n".join(current))
+                current, current_len = [], 0
+            current.append(part)
+            current_len += len(part) + 2
+
+    if current:
+        chunks.append("\n\n".join(current))
+
+    return chunks
@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, TypedDict
+
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.graph import END, START, StateGraph
+
+from app.config import (
+    WORKFLOW_CHECKPOINTS_ENABLED,
+    WORKFLOW_CHECKPOINT_PATH,
+    WORKFLOW_CHECKPOINT_SWEEP_INTERVAL_SECONDS,
+    WORKFLOW_CHECKPOINT_TTL_HOURS,
+)
+
+if TYPE_CHECKING:
+    from app.services.langgraph_ai_service import LangGraphAIService
+
+logger = logging.getLogger(__name__)
+
+
+class DraftState(TypedDict, total=False):
+    """State for the contract drafting workflow"""
+    request: Dict[str, Any]
+    requirements_analysis: str
+    structure_analysis: str
+    sections: List[Dict[str, str]]
+    content: str
+    summary: str
+
+
+class AnalysisState(TypedDict, total=False):
+    """State for the document analysis workflow"""
+    document_text: str
+    filename: str
+    mode: str
+    chunks: List[str]
+    fused_failed: bool
+    clause_analysis: str
+    risk_analysis: str
+    insights: str
+    heuristics: Dict[str, Any]
+    result: Dict[str, Any]
+
+
+class ChatState(TypedDict, total=False):
+    """State for the chatbot workflow"""
+    user_message: str
+    context: Optional[Dict[str, Any]]
+    query_type: Optional[str]
+    use_cache: bool
+    response_prompt: str
+    response: str
+    recommendations: List[str]
+
+
+# Node names must not clash with state keys
+STAGED_BRANCHES = ["extract_clauses", "run_heuristics"]
+
+
+def build_draft_graph(service: "LangGraphAIService") -> StateGraph:
+    """requirements -> structure -> content -> summary"""
+    graph = StateGraph(DraftState)
+    graph.add_node("analyze_requirements", service._draft_requirements_node)
+    graph.add_node("plan_structure", service._draft_structure_node)
+    graph.add_node("write_content", service._draft_content_node)
+    graph.add_node("summarize", service._draft_summary_node)
+    graph.add_edge(START, "analyze_requirements")
+    graph.add_edge("analyze_requirements", "plan_structure")
+    graph.add_edge("plan_structure", "write_content")
+    graph.add_edge("write_content", "summarize")
+    graph.add_edge("summarize", END)
+    return graph
+
+
+def build_analysis_graph(service: "LangGraphAIService") -> StateGraph:
+    """Staged mode runs clause extraction and the local heuristics in
+    parallel; risk analysis reads the map-reduced clause analysis, insights
+    follow it and ``finalize`` joins both branches. Fused mode is a single node that falls
+    back to the staged branches when its JSON fails validation.
+    """
+    graph = StateGraph(AnalysisState)
+    graph.add_node("fused", service._analysis_fused_node)
+    graph.add_node("extract_clauses", service._analysis_clauses_node)
+    graph.add_node("assess_risk", service._analysis_risk_node)
+    graph.add_node("run_heuristics", service._analysis_heuristics_node)
+    graph.add_node("derive_insights", service._analysis_insights_node)
+    graph.add_node("finalize", service._analysis_finalize_node)
+
+    graph.add_conditional_edges(
+        START,
+        lambda state: "fused" if state["mode"] == "fused" else STAGED_BRANCHES,
+        ["fused", *STAGED_BRANCHES],
+    )
+    graph.add_conditional_edges(
+        "fused",
+        lambda state: STAGED_BRANCHES if state.get("fused_failed") else "finalize",
+        [*STAGED_BRANCHES, "finalize"],
+    )
+    graph.add_edge("extract_clauses", "assess_risk")
+    graph.add_edge("assess_risk", "derive_insights")
+    graph.add_edge(["derive_insights", "run_heuristics"], "finalize")
+    graph.add_edge("finalize", END)
+    return graph
+
+
+def build_chat_graph(service: "LangGraphAIService") -> StateGraph:
+    """classify -> (respond, follow-ups) in parallel"""
+    graph = StateGraph(ChatState)
+    graph.add_node("classify", service._chat_classify_node)
+    graph.add_node("respond", service._chat_respond_node)
+    graph.add_node("suggest_followups", service._chat_followups_node)
+    graph.add_edge(START, "classify")
+    graph.add_edge("classify", "respond")
+    graph.add_edge("classify", "suggest_followups")
+    graph.add_edge(["respond", "suggest_followups"], END)
+    return graph
+
+
+class WorkflowCheckpointer:
+    """SQLite checkpoints for workflow graphs, keyed by thread id.
+
+    Every completed node is saved, so re-running a thread that failed
+    part-way resumes at the failed node instead of repeating (and paying
+    for) the LLM calls before it. A thread's checkpoints are deleted once
+    it completes; threads nobody resumes are swept after ``ttl_hours``
+    without a run. Runs on the same thread are serialized.
+    """
+
+    def __init__(
+        self,
+        path: str = WORKFLOW_CHECKPOINT_PATH,
+        enabled: bool = WORKFLOW_CHECKPOINTS_ENABLED,
+        ttl_hours: float = WORKFLOW_CHECKPOINT_TTL_HOURS,
+        sweep_interval_seconds: int = WORKFLOW_CHECKPOINT_SWEEP_INTERVAL_SECONDS,
+    ):
+        self.path = path
+        self.enabled = enabled
+        self.ttl_hours = ttl_hours
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._saver: Optional[AsyncSqliteSaver] = None
+        self._open_lock: Optional[asyncio.Lock] = None
+        self._thread_locks: Dict[str, List[Any]] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self.resumed = 0
+        self.swept = 0
+
+    async def start(self):
+        """Sweep expired threads now and then every ``sweep_interval_seconds``"""
+        if self.enabled and self.ttl_hours > 0:
+            self._sweeper = asyncio.create_task(self._sweep_periodically(), name="checkpoint-sweeper")
+
+    async def _sweep_periodically(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning("Workflow checkpoint sweep failed: %s", e)
+            await asyncio.sleep(self.sweep_interval_seconds)
+
+    async def saver(self) -> Optional[AsyncSqliteSaver]:
+        """Open the checkpoint database on first use, inside the running event loop"""
+        if not self.enabled:
+            return None
+        if self._open_lock is None:
+            self._open_lock = asyncio.Lock()
+        async with self._open_lock:
+            if self._saver is None:
+                self._conn = aiosqlite.connect(self.path)
+                # A connection left open (no aclose) must not block interpreter exit
+                self._conn.daemon = True
+                await self._conn
+                self._saver = AsyncSqliteSaver(self._conn)
+                await self._saver.setup()
+                # When each thread last ran; the sweep expires threads by it
+                await self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS thread_activity "
+                    "(thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)"
+                )
+                await self._conn.commit()
+        return self._saver
+
+    async def run(self, graph, state: Dict[str, Any], thread_id: Optional[str]) -> Dict[str, Any]:
+        """Invoke a compiled graph, resuming ``thread_id`` if it stopped part-way"""
+        if thread_id is None or graph.checkpointer is None:
+            return await graph.ainvoke(state)
+
+        # One run per thread at a time; the entry is dropped with its last user
+        entry = self._thread_locks.setdefault(thread_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await self._touch(thread_id)
+                config = {"configurable": {"thread_id": thread_id}}
+                snapshot = await graph.aget_state(config)
+                if snapshot.next:
+                    self.resumed += 1
+                    logger.info("Resuming workflow %s at %s", thread_id, ", ".join(snapshot.next))
+                    result = await graph.ainvoke(None, config)
+                else:
+                    result = await graph.ainvoke(state, config)
+                await self.forget(thread_id)
+                return result
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._thread_locks.pop(thread_id, None)
+
+    async def forget(self, thread_id: str):
+        """Delete every checkpoint of a finished thread"""
+        saver = await self.saver()
+        if saver is None:
+            return
+        async with saver.lock:
+            await self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            await self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            await self._conn.execute("DELETE FROM thread_activity WHERE thread_id = ?", (thread_id,))
+            await self._conn.commit()
+
+    async def _touch(self, thread_id: str):
+        saver = await self.saver()
+        async with saver.lock:
+            await self._conn.execute(
+                "INSERT OR REPLACE INTO thread_activity (thread_id, updated_at) VALUES (?, ?)",
+                (thread_id, time.time()),
+            )
+            await self._conn.commit()
+
+    async def sweep(self) -> int:
+        """Delete threads that have not run for ``ttl_hours``; returns how many"""
+        saver = await self.saver()
+        if saver is None or self.ttl_hours <= 0:
+            return 0
+        now = time.time()
+        async with saver.lock:
+            # Threads checkpointed before activity was tracked start their clock now
+            await self._conn.execute(
+                "INSERT OR IGNORE INTO thread_activity (thread_id, updated_at) "
+                "SELECT DISTINCT thread_id, ? FROM checkpoints",
+                (now,),
+            )
+            await self._conn.commit()
+            async with self._conn.execute(
+                "SELECT thread_id FROM thread_activity WHERE updated_at < ?",
+                (now - self.ttl_hours * 3600,),
+            ) as cursor:
+                expired = [row[0] for row in await cursor.fetchall()]
+        swept = 0
+        for thread_id in expired:
+            # A run that started since the query keeps its thread
+            if thread_id not in self._thread_locks:
+                await self.forget(thread_id)
+                swept += 1
+        if swept:
+            self.swept += swept
+            logger.info("Swept %d expired workflow checkpoint threads", swept)
+        return swept
+
+    async def aclose(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        if self._conn is not None:
+            await self._conn.close()
+        self._conn = None
+        self._saver = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "active_threads": len(self._thread_locks),
+            "resumed": self.resumed,
+            "ttl_hours": self.ttl_hours,
+            "swept": self.swept,
+        }
+
+
+# Global checkpointer instance
+workflow_checkpointer = WorkflowCheckpointer()
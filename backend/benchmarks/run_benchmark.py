@@ -0,0 +1,221 @@
+"""End-to-end latency benchmark for the AI endpoints.
+
+Runs the FastAPI app in-process and drives /api/ai/*, /api/drafts/ and
+/api/chatbot/chat with the payloads in payloads.json. LLM traffic is served
+from a recorded cassette, so runs need no network and are repeatable.
+
+Record a cassette once against the real provider, then replay it:
+
+    cd backend
+    LLM_CASSETTE_MODE=record python benchmarks/run_benchmark.py --requests 1
+    python benchmarks/run_benchmark.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmark.py --baseline benchmarks/baseline.json
+
+With ``--baseline`` the run exits with status 1 when any scenario's p50 or
+p95 latency regresses by more than ``--max-regression``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+DEFAULT_CASSETTE = os.path.join(BENCHMARK_DIR, "cassette.jsonl")
+
+
+def configure_environment(args: argparse.Namespace):
+    """Point the app at the cassette and an isolated database before it is imported"""
+    work_dir = tempfile.mkdtemp(prefix="clausecraft-bench-")
+    os.environ.setdefault("LLM_CASSETTE_MODE", "replay")
+    os.environ.setdefault("LLM_CASSETTE_PATH", os.path.abspath(args.cassette))
+    os.environ.setdefault("LLM_REPLAY_TIMING", args.timing)
+    os.environ.setdefault("LLM_REPLAY_SPEED", str(args.speed))
+    # Every request must reach the (replayed) provider; no cache hits or throttling
+    os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+    os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "0")
+    os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "0")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(work_dir, 'bench.db')}")
+    sys.path.insert(0, BACKEND_DIR)
+    # The app creates its storage directories relative to the working directory
+    os.chdir(work_dir)
+
+
+def build_scenarios(payloads: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    clauses, drafts, chat = payloads["clauses"], payloads["drafts"], payloads["chat"]
+    return {
+        "ai_explain": [
+            {"url": "/api/ai/explain", "json": {"clause_text": clause, "explanation_type": kind}}
+            for clause in clauses
+            for kind in ("eli5", "technical")
+        ],
+        "ai_risk_analysis": [
+            {"url": "/api/ai/risk-analysis", "json": {"text": clause}} for clause in clauses
+        ],
+        "ai_redline": [
+            {
+                "url": "/api/ai/redline",
+                "json": {"clause_text": clause, "risk_profile": "balanced", "instructions": ""},
+            }
+            for clause in clauses
+        ],
+        "drafts_create": [{"url": "/api/drafts/", "json": draft} for draft in drafts],
+        "chatbot_chat": [
+            {"url": "/api/chatbot/chat", "json": {"message": message}} for message in chat
+        ],
+    }
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> Optional[float]:
+        if not ordered:
+            return None
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else None,
+        "mean_ms": round(statistics.mean(ordered) * 1000, 2) if ordered else None,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+async def run_scenario(client, headers, calls, requests: int, concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(call: Dict[str, Any]):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(call["url"], json=call["json"], headers=headers)
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+                print(f"  {call['url']} -> {response.status_code}: {response.text[:200]}", file=sys.stderr)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(call) for call in calls * requests))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    import main
+    from app.database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    with open(os.path.join(BENCHMARK_DIR, "payloads.json"), "r", encoding="utf-8") as f:
+        scenarios = build_scenarios(json.load(f))
+    if args.only:
+        scenarios = {name: calls for name, calls in scenarios.items() if name in args.only}
+
+    report: Dict[str, Any] = {
+        "config": {
+            "cassette_mode": os.environ["LLM_CASSETTE_MODE"],
+            "timing": os.environ["LLM_REPLAY_TIMING"],
+            "speed": float(os.environ["LLM_REPLAY_SPEED"]),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": {},
+    }
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            await client.post(
+                "/api/auth/register",
+                json={"name": "Bench", "email": "bench@example.com", "password": "bench-password"},
+            )
+            login = await client.post(
+                "/api/auth/login",
+                data={"username": "bench@example.com", "password": "bench-password"},
+            )
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+            for name, calls in scenarios.items():
+                print(f"Running {name} ({len(calls) * args.requests} requests)", file=sys.stderr)
+                report["scenarios"][name] = await run_scenario(
+                    client, headers, calls, args.requests, args.concurrency
+                )
+
+    return report
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> bool:
+    """Print a per-scenario diff against the baseline; return True if nothing regressed"""
+    ok = True
+    print(f"{'scenario':<20} {'metric':<8} {'baseline':>10} {'current':>10} {'change':>9}")
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            print(f"{name:<20} (not in baseline)")
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            flag = ""
+            if change > max_regression:
+                flag = "  REGRESSION"
+                ok = False
+            print(f"{name:<20} {metric:<8} {before:>10.1f} {after:>10.1f} {change:>+8.1%}{flag}")
+        if current["errors"] > previous.get("errors", 0):
+            print(f"{name:<20} errors   {previous.get('errors', 0):>10} {current['errors']:>10}  REGRESSION")
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    parser.add_argument("--timing", choices=["real", "scaled", "instant"], default="real")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed-up for --timing scaled")
+    parser.add_argument("--requests", type=int, default=3, help="passes over each scenario's payloads")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--only", nargs="*", help="scenario names to run")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="compare against this stored report")
+    parser.add_argument("--save-baseline", help="store this run as the new baseline")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    for attr in ("cassette", "output", "baseline", "save_baseline"):
+        if getattr(args, attr):
+            setattr(args, attr, os.path.abspath(getattr(args, attr)))
+    configure_environment(args)
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
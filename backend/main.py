@@ -1,16 +1,25 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.orm import Session
 import uvicorn
 import os
 from dotenv import load_dotenv
 
 from app.routers import documents, drafts, clauses, workflows, ai, auth, chatbot
-from app.database import Base, engine, get_db
+from app.database import Base, add_missing_columns, engine, get_db
 from app import models
 from app.services.file_storage import file_storage
+from app.services.llm_client import llm_client
+from app.services.llm_cache import llm_cache
+from app.services.query_classifier import query_classifier
+from app.services.analysis_jobs import analysis_jobs
+from app.services.llm_resilience import CircuitOpenError
+from app.services.workflow_graphs import workflow_checkpointer
+from app.services.explanation_prefetch import explanation_prefetcher
+from app.services.document_processor import ExtractionQueueFull, extraction_pool
 
 load_dotenv()
 
@@ -19,12 +28,53 @@ os.makedirs("documents", exist_ok=True)
 os.makedirs("uploads", exist_ok=True)
 os.makedirs("drafts", exist_ok=True)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open and warm the shared LLM connection pool before serving traffic
+    await llm_client.start()
+    # Clause fingerprint columns postdate existing databases
+    add_missing_columns(models.Clause.__table__)
+    query_classifier.train()
+    await workflow_checkpointer.start()
+    await analysis_jobs.start()
+    yield
+    await analysis_jobs.stop()
+    await explanation_prefetcher.stop()
+    extraction_pool.shutdown()
+    await llm_client.aclose()
+    await workflow_checkpointer.aclose()
+    llm_cache.close()
+
+
 app = FastAPI(
     title="ClauseCraft API",
     description="AI-Powered Legal Document Platform",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request, exc: CircuitOpenError):
+    """The AI provider is failing; tell clients to back off instead of returning a 500"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after) + 1)},
+    )
+
+
+@app.exception_handler(ExtractionQueueFull)
+async def extraction_queue_full_handler(request, exc: ExtractionQueueFull):
+    """Too many files are being parsed; ask the client to retry instead of queueing unboundedly"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
+
 # CORS middleware
 # Configure CORS for dev and deployment via env var ALLOW_ORIGINS (comma-separated)
 allow_origins_env = os.getenv(
@@ -103,6 +103,29 @@ const Documents = () => {
     }
   };
 
+  const pollAnalysisJob = async (documentId, jobId) => {
+    for (let attempt = 0; attempt < 150; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      try {
+        const { data: job } = await documentsAPI.getJob(jobId);
+        // The preliminary report shows up as the result of a running job
+        if (job.result) {
+          setDocuments((prev) =>
+            prev.map((doc) =>
+              doc.id === documentId
+                ? { ...doc, analysis: job.result, analysis_tier: job.result.analysis_tier }
+                : doc
+            )
+          );
+        }
+        if (job.status === "completed") return;
+        if (job.status === "failed") return;
+      } catch (err) {
+        return;
+      }
+    }
+  };
+
   const handleFileUpload = async (event) => {
     const file = event.target.files[0];
     if (!file) return;
@@ -135,7 +158,16 @@ const Documents = () => {
         setDocuments((prev) => [newDoc, ...prev]);
       } else {
         const { data } = await documentsAPI.upload(formData);
-        setDocuments((prev) => [data, ...prev]);
+        // The background job posts a preliminary report, then the deep analysis
+        const newDoc = {
+          id: data.document_id,
+          filename: data.filename,
+          uploaded_at: new Date().toISOString(),
+          analysis: data.analysis,
+          analysis_tier: data.analysis_tier,
+        };
+        setDocuments((prev) => [newDoc, ...prev]);
+        if (data.job_id) pollAnalysisJob(data.document_id, data.job_id);
       }
 
       setShowUploadModal(false);
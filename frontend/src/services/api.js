@@ -47,6 +47,8 @@ export const documentsAPI = {
     api.post("/documents/files/upload", formData, {
       headers: { "Content-Type": "multipart/form-data" },
     }),
+  // Uploads with analyze=true return 202 and a job id; poll for the result
+  getJob: (jobId) => api.get(`/documents/jobs/${jobId}`),
 };
 
 // Drafts API
@@ -77,6 +79,11 @@ export const aiAPI = {
   suggestRedline: (data) => api.post("/ai/redline", data),
   generateAlternatives: (data) => api.post("/ai/alternatives", data),
   analyzeRisk: (data) => api.post("/ai/risk-analysis", data),
+  // Batch variants take { items: [{ clause_text, ... }] } and answer in order
+  explainClauses: (items) => api.post("/ai/explain/batch", { items }),
+  suggestRedlines: (items) => api.post("/ai/redline/batch", { items }),
+  generateAlternativesBatch: (items) => api.post("/ai/alternatives/batch", { items }),
+  analyzeRiskBatch: (items) => api.post("/ai/risk-analysis/batch", { items }),
 };
 
 // Workflows API